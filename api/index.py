@@ -5,7 +5,8 @@ from django.core.wsgi import get_wsgi_application
 # Ensure Django settings are configured for the serverless environment
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-# Expose WSGI application as `app` for Vercel Python runtime
+# Expose WSGI application as `app` for Vercel Python runtime. WSGI has no way to
+# flush an async iterator, so streamed (NDJSON) responses are delivered whole here.
 app = get_wsgi_application()
 
 
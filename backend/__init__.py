@@ -1,3 +1,8 @@
-from .celery import app as celery_app
+import os
 
-__all__ = ("celery_app",)
+# Broker-free deployments (TRIP_BROKER_FREE, e.g. on Vercel) never enqueue
+# tasks, so skip importing Celery and its transport stack at startup.
+if os.getenv("TRIP_BROKER_FREE", "false").lower() not in ("1", "true", "yes"):
+    from .celery import app as celery_app
+
+    __all__ = ("celery_app",)
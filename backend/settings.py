@@ -99,6 +99,22 @@ else:
 
 
 
+# Cache
+# Without CACHE_URL every process uses its own local-memory cache. Point it at
+# Redis so ELD artifacts rendered by Celery workers (ELD_CACHE_SHARED=true) are
+# visible to the web processes, and geocode/route results are shared as the L2
+# behind each process's in-memory geo cache (trips/utils/geo_cache.py).
+
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -149,3 +165,15 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+
+# Run with `celery -A backend beat` (or `worker -B`) so buffered trips get written.
+CELERY_BEAT_SCHEDULE = {
+    "flush-trip-buffer": {
+        "task": "trips.tasks.trip_persistence.flush_trip_buffer",
+        "schedule": float(os.getenv("TRIP_FLUSH_INTERVAL", 5)),
+    },
+    "rollup-lane-stats": {
+        "task": "trips.tasks.lane_stats.rollup_lane_stats",
+        "schedule": float(os.getenv("LANE_ROLLUP_INTERVAL", 60)),
+    },
+}
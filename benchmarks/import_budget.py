@@ -0,0 +1,113 @@
+"""
+Cold-start import budget: how long a fresh process takes to become ready to
+serve, and which heavy modules it loaded before handling any request.
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 600 --broker-free
+
+Runs `django.setup()` plus the URLconf import in a clean interpreter with
+`-X importtime`, then exits non-zero if the time exceeds the budget or a
+module from FORBIDDEN was imported eagerly. Those are only needed by specific
+stages (ELD rendering, routing calls, Celery) and should load on first use.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN = ("PIL", "openrouteservice", "requests", "redis")
+# Celery is expected unless the broker-free profile is on.
+BROKER_MODULES = ("celery", "kombu")
+
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+print("READY_MS", (time.perf_counter() - start) * 1000)
+print("MODULES", ",".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+def _parse_importtime(stderr: str):
+    """Cumulative microseconds per top-level package from -X importtime output."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented; top-level entries already include their cost.
+        if not cumulative.strip().isdigit() or name[1:2] == " ":
+            continue
+        totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative)
+    return totals
+
+
+def measure(broker_free: bool):
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    if broker_free:
+        env["TRIP_BROKER_FREE"] = "true"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"Startup failed with exit code {proc.returncode}")
+
+    ready_ms = modules = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("READY_MS "):
+            ready_ms = float(line.split()[1])
+        elif line.startswith("MODULES "):
+            modules = set(line.split()[1].split(","))
+    return ready_ms, modules, _parse_importtime(proc.stderr)
+
+
+def check(ready_ms: float, modules, budget_ms: float, broker_free: bool):
+    """Failure messages for a measured startup; empty when it is within budget."""
+    forbidden = FORBIDDEN + (BROKER_MODULES if broker_free else ())
+    eager = sorted(name for name in forbidden if name in modules)
+
+    failures = []
+    if ready_ms > budget_ms:
+        failures.append(f"startup {ready_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=800.0)
+    parser.add_argument("--broker-free", action="store_true", help="measure with TRIP_BROKER_FREE=true")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="best of N fresh processes")
+    args = parser.parse_args()
+
+    runs = [measure(args.broker_free) for _ in range(args.runs)]
+    ready_ms, modules, importtime = min(runs, key=lambda run: run[0])
+
+    print(f"startup: {ready_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports:")
+    for name, micros in sorted(importtime.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = check(ready_ms, modules, args.budget_ms, args.broker_free)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
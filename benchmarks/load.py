@@ -0,0 +1,192 @@
+"""
+Closed-loop load driver for POST /api/trip/calculate/.
+
+    # 1. upstream stand-ins
+    python -m benchmarks.stub_server --latency-ms 80
+    # 2. backend pointed at them (plus the usual Redis broker)
+    GEOCODE_URL=http://127.0.0.1:8090/geocode/search \\
+    REVERSE_GEOCODE_URL=http://127.0.0.1:8090/geocode/reverse \\
+    ROUTE_URL=http://127.0.0.1:8090/v2/directions/driving-car \\
+    NOMINATIM_URL=http://127.0.0.1:8090/search \\
+    gunicorn backend.wsgi -w 4
+    # 3. load
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 16 --duration 60
+
+Each worker sends the next lane from fixtures/lanes.json as soon as its
+previous request finishes. Reports p50/p95/p99 latency, requests/s, status
+counts and per-stage Server-Timing percentiles, and writes them to --out.
+--cold varies current_cycle_used per request so the trip result cache never
+hits (geocode/route caches still do, as they would in production).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.results import compare, summarize, write_results  # noqa: E402
+from benchmarks.stub_server import FIXTURES_DIR, serve  # noqa: E402
+
+
+def _parse_server_timing(header):
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                timings[name.strip()] = float(value) / 1000
+    return timings
+
+
+class LoadRun:
+    def __init__(self, url, lanes, extra, cold, timeout):
+        self.url = url.rstrip("/") + "/api/trip/calculate/"
+        self.lanes = lanes
+        self.extra = extra
+        self.cold = cold
+        self.timeout = timeout
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.latencies = []
+        self.statuses = Counter()
+        self.stages = defaultdict(list)
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def one(self):
+        n = next(self._counter)
+        payload = {**self.lanes[n % len(self.lanes)], **self.extra}
+        if self.cold:
+            payload["current_cycle_used"] = round(payload.get("current_cycle_used", 0) + (n % 1000) * 0.01, 2)
+
+        start = time.perf_counter()
+        try:
+            response = self._session().post(self.url, json=payload, timeout=self.timeout)
+            status = response.status_code
+            timing = _parse_server_timing(response.headers.get("Server-Timing", ""))
+        except requests.RequestException as e:
+            status, timing = type(e).__name__, {}
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.statuses[str(status)] += 1
+            if status == 200:
+                self.latencies.append(elapsed)
+                for stage, seconds in timing.items():
+                    self.stages[stage].append(seconds)
+
+    def worker(self, deadline, remaining):
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            self.one()
+
+
+def run_load(url, lanes, concurrency, duration, total, extra, cold, warmup, timeout):
+    run = LoadRun(url, lanes, extra, cold, timeout)
+    for _ in range(warmup):
+        run.one()
+    run.latencies.clear()
+    run.statuses.clear()
+    run.stages.clear()
+
+    deadline = time.perf_counter() + duration if duration else float("inf")
+    remaining = [total if total else float("inf")]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(run.worker, deadline, remaining)
+    wall = time.perf_counter() - started
+
+    completed = sum(run.statuses.values())
+    return {
+        "calculate": {
+            **summarize(run.latencies),
+            "rps": round(len(run.latencies) / wall, 2) if wall else 0.0,
+            "attempted": completed,
+            "wall_s": round(wall, 2),
+            "statuses": dict(run.statuses),
+            "error_rate": round(1 - len(run.latencies) / completed, 4) if completed else 0.0,
+        },
+        **{f"stage.{name}": summarize(samples) for name, samples in sorted(run.stages.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (0 = use --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--lanes", default=os.path.join(FIXTURES_DIR, "lanes.json"))
+    parser.add_argument("--include", help='Passed through as "include" (e.g. "stops,eld")')
+    parser.add_argument("--eld-compact", action="store_true")
+    parser.add_argument("--cold", action="store_true", help="Defeat the trip result cache")
+    parser.add_argument("--start-stub", type=int, metavar="PORT", help="Also run the stub upstream on PORT")
+    parser.add_argument("--out", default="benchmarks/results/load.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore smaller latency changes")
+    args = parser.parse_args()
+
+    if not args.duration and not args.requests:
+        parser.error("set --duration or --requests")
+
+    if args.start_stub:
+        stub = serve(port=args.start_stub)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    with open(args.lanes) as fh:
+        lanes = json.load(fh)
+    extra = {}
+    if args.include:
+        extra["include"] = args.include
+    if args.eld_compact:
+        extra["eld_compact"] = True
+
+    results = run_load(
+        args.url, lanes, args.concurrency, args.duration, args.requests,
+        extra, args.cold, args.warmup, args.timeout,
+    )
+
+    summary = results["calculate"]
+    print(
+        f"{summary['attempted']} requests in {summary['wall_s']}s: {summary['rps']} req/s, "
+        f"p50={summary.get('p50_ms')} ms p95={summary.get('p95_ms')} ms p99={summary.get('p99_ms')} ms, "
+        f"statuses={summary['statuses']}"
+    )
+    for name, stage in results.items():
+        if name.startswith("stage.") and stage["count"]:
+            print(f"  {name:22} p50={stage['p50_ms']:>9.3f} ms  p95={stage['p95_ms']:>9.3f} ms")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("baseline", "out", "tolerance", "min_delta_ms")}
+    write_results(args.out, "load", results, config)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        regressions = compare(args.baseline, results, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Microbenchmarks for the CPU-bound parts of a trip calculation.
+
+    python -m benchmarks.micro --out benchmarks/results/micro.json
+    python -m benchmarks.micro --baseline benchmarks/results/micro.json
+
+Times generate_duty_blocks, generate_eld_sheet (per page, full colour and
+compact) and merge_eld_sheets across short, medium and long trips. The ELD
+cache is pointed at a throwaway directory and the merged-PDF entries are
+dropped before every merge so each iteration does the full work.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ELD_CACHE_DIR"] = tempfile.mkdtemp(prefix="trip-bench-eld-")
+os.environ["ELD_CACHE_SHARED"] = "false"
+
+from benchmarks.results import compare, summarize, write_results  # noqa: E402
+from trips.utils.duty_scheduler import generate_duty_blocks  # noqa: E402
+from trips.utils.eld_cache import eld_cache  # noqa: E402
+from trips.utils.generate_eld import (  # noqa: E402
+    generate_eld_sheet,
+    generate_multiple_eld_sheets,
+    merge_eld_sheets,
+)
+
+# name -> (current_to_pickup_miles, pickup_to_dropoff_miles, current_cycle_used)
+TRIPS = {
+    "short": (40, 250, 0),
+    "medium": (150, 1200, 20),
+    "long": (300, 2800, 45),
+}
+
+
+def bench(func, iterations, warmup=1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def _days(duty_blocks):
+    days = defaultdict(list)
+    for block in duty_blocks:
+        days[int(block["day"])].append(block)
+    return days
+
+
+def _drop_merged_pdfs():
+    for path in glob.glob(os.path.join(eld_cache.root, "*.pdf")):
+        os.remove(path)
+
+
+def run(iterations, trips):
+    results = {}
+    for name in trips:
+        to_pickup, to_dropoff, cycle_used = TRIPS[name]
+        duty_blocks, _ = generate_duty_blocks(to_pickup, to_dropoff, cycle_used)
+        days = _days(duty_blocks)
+        first_day = min(days)
+        info = {"date": "01/01/2025"}
+
+        results[f"duty_blocks.{name}"] = bench(
+            lambda: generate_duty_blocks(to_pickup, to_dropoff, cycle_used), iterations * 10
+        )
+        for compact in (False, True):
+            label = "compact" if compact else "rgb"
+            results[f"eld_sheet.{label}.{name}"] = bench(
+                lambda: generate_eld_sheet(
+                    days[first_day], first_day, len(days), info, compact=compact
+                ),
+                iterations,
+            )
+            sheet_paths = generate_multiple_eld_sheets(duty_blocks, compact=compact)
+
+            def merge():
+                _drop_merged_pdfs()
+                merge_eld_sheets(sheet_paths)
+
+            results[f"merge_pdf.{label}.{name}"] = {
+                **bench(merge, iterations),
+                "pages": len(sheet_paths),
+            }
+
+        print(f"  {name}: {len(duty_blocks)} blocks over {len(days)} days")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--trips", nargs="+", choices=sorted(TRIPS), default=list(TRIPS))
+    parser.add_argument("--out", default="benchmarks/results/micro.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore smaller latency changes")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.trips)
+    for name, summary in results.items():
+        print(f"{name:32} p50={summary['p50_ms']:>9.3f} ms  p95={summary['p95_ms']:>9.3f} ms")
+
+    write_results(args.out, "micro", results, {"iterations": args.iterations, "trips": args.trips})
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        regressions = compare(args.baseline, results, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Shared helpers: percentile summaries, result files and baseline comparison."""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+
+def summarize(samples_s):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ordered = sorted(samples_s)
+    if not ordered:
+        return {"count": 0}
+
+    def pct(p):
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, suite, results, config=None):
+    payload = {
+        "suite": suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "config": config or {},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(payload, fh, indent=2)
+    return payload
+
+
+def compare(baseline_path, results, tolerance, min_delta_ms=1.0):
+    """
+    Return a list of regressions against a previous results file.
+
+    Latencies (*_ms) regress when they grow by more than `tolerance` (0.10 =
+    10%) and by at least `min_delta_ms`, so sub-millisecond noise on cheap
+    stages is ignored; throughput (rps) regresses when it drops by more than
+    `tolerance`.
+    """
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)["results"]
+
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            if metric not in current or not previous.get(metric):
+                continue
+            old, new = previous[metric], current[metric]
+            change = (new - old) / old
+            if metric == "rps":
+                worse = change < -tolerance
+            else:
+                worse = change > tolerance and new - old >= min_delta_ms
+            if worse:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
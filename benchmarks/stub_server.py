@@ -0,0 +1,259 @@
+"""
+Local stand-in for OpenRouteService and Nominatim.
+
+Serves the three upstream calls the trip pipeline makes, in the same response
+shapes, with configurable latency:
+
+    GET  /geocode/search?text=...                 (ORS geocode)
+    GET  /geocode/reverse?point.lat=..&point.lon=.. (ORS reverse geocode, nearest fixture place)
+    POST /v2/directions/driving-car               (ORS directions, encoded polyline)
+    POST /v2/matrix/driving-car                   (ORS matrix, km + seconds)
+    GET  /search?q=restaurant&lat=..&lon=..       (Nominatim search)
+
+Geocode answers come from fixtures/geocode.json; unknown places get a stable
+pseudo-random point in the continental US so load runs can use arbitrary
+lanes. Any response saved as fixtures/recorded/<kind>-<sha1 of request>.json
+is replayed verbatim instead of being synthesized.
+
+Point the backend at it with:
+
+    GEOCODE_URL=http://127.0.0.1:8090/geocode/search
+    REVERSE_GEOCODE_URL=http://127.0.0.1:8090/geocode/reverse
+    ROUTE_URL=http://127.0.0.1:8090/v2/directions/driving-car
+    MATRIX_URL=http://127.0.0.1:8090/v2/matrix/driving-car
+    NOMINATIM_URL=http://127.0.0.1:8090/search
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EARTH_RADIUS_KM = 6371.0
+ROUTE_SPEED_KMH = 85.0
+ROUTE_DETOUR = 1.2  # road distance vs. great-circle distance
+ROUTE_POINT_SPACING_KM = 0.5  # roughly the density of real ORS geometries
+
+
+def haversine_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def encode_polyline(coords, precision=5):
+    """Google polyline encoding of (lat, lon) pairs, as returned by ORS."""
+    factor = 10**precision
+    output = []
+    prev_lat = prev_lon = 0
+    for lat, lon in coords:
+        lat_i, lon_i = round(lat * factor), round(lon * factor)
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+    return "".join(output)
+
+
+class StubData:
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        with open(os.path.join(fixtures_dir, "geocode.json")) as fh:
+            self.places = json.load(fh)
+        self.recorded_dir = os.path.join(fixtures_dir, "recorded")
+
+    def recorded(self, kind, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        path = os.path.join(self.recorded_dir, f"{kind}-{digest}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as fh:
+                return fh.read()
+        return None
+
+    def geocode(self, text):
+        name = text.strip().lower()
+        if name in self.places:
+            lon, lat = self.places[name]
+        else:
+            rng = random.Random(name)
+            lat, lon = rng.uniform(30.0, 47.0), rng.uniform(-120.0, -75.0)
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                    "properties": {"label": text, "confidence": 1},
+                }
+            ],
+        }
+
+    def reverse(self, lat, lon):
+        name, (place_lon, place_lat) = min(
+            self.places.items(), key=lambda item: haversine_km((lat, lon), (item[1][1], item[1][0]))
+        )
+        city, _, region = name.partition(", ")
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [place_lon, place_lat]},
+                    "properties": {
+                        "locality": city.title(),
+                        "region_a": region.upper(),
+                        "label": f"{city.title()}, {region.upper()}, USA",
+                    },
+                }
+            ],
+        }
+
+    def route(self, body):
+        (lon1, lat1), (lon2, lat2) = body["coordinates"][:2]
+        distance_km = max(haversine_km((lat1, lon1), (lat2, lon2)) * ROUTE_DETOUR, 0.1)
+        points = max(2, int(distance_km / ROUTE_POINT_SPACING_KM))
+        rng = random.Random(f"{lat1},{lon1},{lat2},{lon2}")
+        coords = []
+        for i in range(points + 1):
+            t = i / points
+            wobble = 0.0 if i in (0, points) else rng.uniform(-0.01, 0.01)
+            coords.append((lat1 + (lat2 - lat1) * t + wobble, lon1 + (lon2 - lon1) * t + wobble))
+        return {
+            "routes": [
+                {
+                    "summary": {
+                        "distance": distance_km * 1000,
+                        "duration": distance_km / ROUTE_SPEED_KMH * 3600,
+                    },
+                    "geometry": encode_polyline(coords),
+                }
+            ]
+        }
+
+    def matrix(self, body):
+        locations = [(lat, lon) for lon, lat in body["locations"]]
+        sources = body.get("sources") or range(len(locations))
+        destinations = body.get("destinations") or range(len(locations))
+        distances = [
+            [round(haversine_km(locations[s], locations[d]) * ROUTE_DETOUR, 2) for d in destinations]
+            for s in sources
+        ]
+        return {
+            "distances": distances,
+            "durations": [[round(km / ROUTE_SPEED_KMH * 3600, 1) for km in row] for row in distances],
+        }
+
+    def search(self, lat, lon, limit=10):
+        rng = random.Random(f"{lat:.3f},{lon:.3f}")
+        return [
+            {
+                "place_id": rng.randrange(10**8),
+                "lat": f"{lat + rng.uniform(-0.02, 0.02):.7f}",
+                "lon": f"{lon + rng.uniform(-0.02, 0.02):.7f}",
+                "display_name": f"Stub Diner {i}, Exit {rng.randrange(1, 300)}, United States",
+                "type": "restaurant",
+            }
+            for i in range(limit)
+        ]
+
+
+def make_handler(data, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _delay(self, kind):
+            mean, jitter = latency[kind]
+            if mean or jitter:
+                time.sleep(max(0.0, random.gauss(mean, jitter)) / 1000)
+
+        def _send(self, payload, status=200):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.endswith("/geocode/search"):
+                self._delay("geocode")
+                text = query.get("text", "")
+                self._send(data.recorded("geocode", text.lower()) or data.geocode(text))
+            elif url.path.endswith("/geocode/reverse"):
+                self._delay("geocode")
+                lat, lon = float(query.get("point.lat", 0)), float(query.get("point.lon", 0))
+                self._send(data.recorded("reverse", f"{lat:.5f},{lon:.5f}") or data.reverse(lat, lon))
+            elif url.path.endswith("/search"):
+                self._delay("search")
+                lat, lon = float(query.get("lat", 0)), float(query.get("lon", 0))
+                key = f"{lat:.3f},{lon:.3f}"
+                self._send(
+                    data.recorded("search", key)
+                    or data.search(lat, lon, int(query.get("limit", 10)))
+                )
+            else:
+                self._send({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if "/directions/" in url.path:
+                self._delay("route")
+                key = json.dumps(body.get("coordinates"), separators=(",", ":"))
+                self._send(data.recorded("route", key) or data.route(body))
+            elif "/matrix/" in url.path:
+                self._delay("route")
+                self._send(data.matrix(body))
+            else:
+                self._send({"error": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8090, latency=None, fixtures_dir=FIXTURES_DIR):
+    latency = latency or {"geocode": (0, 0), "route": (0, 0), "search": (0, 0)}
+    server = ThreadingHTTPServer((host, port), make_handler(StubData(fixtures_dir), latency))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mean upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Std-dev of upstream latency")
+    parser.add_argument("--route-latency-ms", type=float, help="Override mean latency for directions")
+    parser.add_argument("--search-latency-ms", type=float, help="Override mean latency for Nominatim")
+    args = parser.parse_args()
+
+    latency = {
+        "geocode": (args.latency_ms, args.jitter_ms),
+        "route": (args.route_latency_ms if args.route_latency_ms is not None else args.latency_ms, args.jitter_ms),
+        "search": (args.search_latency_ms if args.search_latency_ms is not None else args.latency_ms, args.jitter_ms),
+    }
+    server = serve(args.host, args.port, latency, args.fixtures)
+    print(f"Stub ORS/Nominatim listening on http://{args.host}:{args.port} latency={latency}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
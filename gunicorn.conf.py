@@ -0,0 +1,29 @@
+import os
+
+# The trip views are async and /calculate/ streams NDJSON from async
+# generators; that only streams under ASGI. Under WSGI Django collects the
+# whole iterator before sending, so serve backend.asgi with uvicorn workers.
+wsgi_app = "backend.asgi:application"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 3))
+# Streamed and long-running trip calculations outlive the 30 s default.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+
+def on_starting(server):
+    # Metric files left by a previous run would be added to this one's.
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges from the /metrics sums.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
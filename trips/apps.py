@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class TripsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "trips"
+
+    def ready(self):
+        from .utils.eld_cache import ELD_CACHE_SHARED
+
+        # A per-process cache would make "shared" ELD artifacts invisible to
+        # every other process, so refuse to start instead of serving 404s.
+        backend = settings.CACHES["default"]["BACKEND"]
+        if ELD_CACHE_SHARED and backend.endswith(("LocMemCache", "DummyCache")):
+            raise ImproperlyConfigured(
+                "ELD_CACHE_SHARED=true needs a cache all processes can reach; set CACHE_URL."
+            )
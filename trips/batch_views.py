@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import re
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .utils.admission import admission_rejection, busy_response, gather_limited
+from .utils.route import geocode_place_cached, route_with_cache
+from .views import (
+    ELD_FORMATS,
+    _assemble_trip_response,
+    _combine_legs,
+    _encoded_response,
+    _ndjson_line,
+    _normalize_eld_compact,
+    _parse_include,
+    _trip_sections,
+    _wants_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ITEMS = 100
+BATCH_CONCURRENCY = 8  # outbound geocode/route calls and per-trip pipelines in flight
+
+
+def _validate_trip_item(item):
+    if not isinstance(item, dict):
+        return "Each trip must be an object."
+    if not item.get("pickup_location") or not item.get("dropoff_location"):
+        return "pickup_location and dropoff_location are required."
+    if item.get("eld_format", "png") not in ELD_FORMATS:
+        return f"eld_format must be one of: {', '.join(ELD_FORMATS)}."
+    error = _normalize_eld_compact(item)
+    if error:
+        return error
+    try:
+        float(item.get("current_cycle_used", 0))
+    except (TypeError, ValueError):
+        return "current_cycle_used must be a number."
+    return None
+
+
+def _place_key(place_name):
+    return re.sub(r"\s+", " ", str(place_name)).strip().lower()
+
+
+async def _run_batch(request, items, include):
+    """
+    Evaluate a batch of trips, yielding one result/error dict per item as it completes.
+
+    Every distinct place name is geocoded once and every distinct leg routed
+    once across the whole batch; the remaining per-trip stages then run with
+    those results injected.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    errors = {}
+    valid = {}
+    for index, item in enumerate(items):
+        error = _validate_trip_item(item)
+        if error:
+            errors[index] = error
+        else:
+            valid[index] = item
+
+    def item_places(item):
+        return (
+            item.get("current_location") or item["pickup_location"],
+            item["pickup_location"],
+            item["dropoff_location"],
+        )
+
+    places = {}
+    for item in valid.values():
+        for place_name in item_places(item):
+            places.setdefault(_place_key(place_name), place_name)
+
+    # A saturated stage fails the whole batch with 503 rather than every item.
+    geocoded = await gather_limited(
+        "geocode", geocode_place_cached, [(name,) for name in places.values()], semaphore
+    )
+    coords_by_place = dict(zip(places.keys(), geocoded))
+
+    item_coords = {}
+    legs = {}
+    for index, item in valid.items():
+        current, pickup, dropoff = (coords_by_place[_place_key(p)] for p in item_places(item))
+        failed = next((c for c in (current, pickup, dropoff) if isinstance(c, Exception)), None)
+        if failed is not None:
+            errors[index] = str(failed)
+            continue
+        item_coords[index] = {"current": current, "pickup": pickup, "dropoff": dropoff}
+        legs.setdefault((tuple(current), tuple(pickup)), None)
+        legs.setdefault((tuple(pickup), tuple(dropoff)), None)
+
+    routed = await gather_limited("route", route_with_cache, list(legs), semaphore)
+    route_by_leg = dict(zip(legs.keys(), routed))
+
+    for index in sorted(errors):
+        yield {"index": index, "id": _item_id(items[index]), "error": errors[index]}
+
+    async def finish(index, initial):
+        item = valid[index]
+        try:
+            async with semaphore:
+                sections = {}
+                async for section, payload in _trip_sections(
+                    request, item, include, initial=initial
+                ):
+                    sections[section] = payload
+            return {"index": index, "id": _item_id(item), "result": _assemble_trip_response(item, sections)}
+        except Exception as e:
+            rejection = admission_rejection(e)
+            if rejection is not None:
+                raise rejection
+            logger.warning(f"[BATCH] Trip {index} failed: {e}")
+            return {"index": index, "id": _item_id(item), "error": str(e)}
+
+    tasks = []
+    for index, coords in item_coords.items():
+        first_leg = route_by_leg[(tuple(coords["current"]), tuple(coords["pickup"]))]
+        second_leg = route_by_leg[(tuple(coords["pickup"]), tuple(coords["dropoff"]))]
+        failed = next((leg for leg in (first_leg, second_leg) if isinstance(leg, Exception)), None)
+        if failed is not None:
+            yield {"index": index, "id": _item_id(valid[index]), "error": str(failed)}
+            continue
+        initial = {"geocode": coords, "route": _combine_legs(first_leg, second_leg)}
+        tasks.append(asyncio.ensure_future(finish(index, initial)))
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _item_id(item):
+    return item.get("id") if isinstance(item, dict) else None
+
+
+async def _stream_batch(results, first, total):
+    try:
+        if first is not None:
+            yield _ndjson_line(first)
+        async for item_result in results:
+            yield _ndjson_line(item_result)
+        yield _ndjson_line({"done": True, "total": total})
+    except Exception as e:
+        # Headers are already sent, so errors are reported in-band.
+        rejection = admission_rejection(e)
+        if rejection is not None:
+            yield _ndjson_line({"error": str(rejection), "retry_after": rejection.retry_after})
+            return
+        logger.exception(f"[ERROR] Streamed batch calculation failed: {e}")
+        yield _ndjson_line({"error": str(e)})
+
+
+@csrf_exempt
+async def calculate_trip_batch(request):
+    """
+    Batch trip calculation: {"trips": [<calculate_trip body>, ...], "include": ...}.
+
+    Returns per-item results or errors in request order, or one NDJSON line per
+    item in completion order with "stream": true.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        items = data.get("trips")
+        if not isinstance(items, list) or not items:
+            return JsonResponse({"error": "trips must be a non-empty list."}, status=400)
+        if len(items) > BATCH_MAX_ITEMS:
+            return JsonResponse(
+                {"error": f"At most {BATCH_MAX_ITEMS} trips per batch."}, status=400
+            )
+
+        try:
+            include = _parse_include(request, data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        if _wants_stream(request, data):
+            results = _run_batch(request, items, include)
+            # The shared geocoding and routing finish before the first line, so
+            # pulling it here still lets a rejection there become a plain 503.
+            try:
+                first = await results.__anext__()
+            except StopAsyncIteration:
+                first = None
+            response = StreamingHttpResponse(
+                _stream_batch(results, first, len(items)), content_type="application/x-ndjson"
+            )
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"
+            return response
+
+        results = [item_result async for item_result in _run_batch(request, items, include)]
+        results.sort(key=lambda r: r["index"])
+        failed = sum(1 for r in results if "error" in r)
+        return _encoded_response(
+            request,
+            {
+                "results": results,
+                "summary": {
+                    "total": len(items),
+                    "succeeded": len(items) - failed,
+                    "failed": failed,
+                },
+            },
+        )
+
+    except Exception as e:
+        rejection = admission_rejection(e)
+        if rejection is not None:
+            return busy_response(rejection)
+        logger.exception(f"[ERROR] Batch trip calculation failed: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
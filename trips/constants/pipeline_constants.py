@@ -0,0 +1,16 @@
+# Per-stage timeouts (seconds) for the calculate_trip pipeline.
+GEOCODE_TIMEOUT = 15
+ROUTE_TIMEOUT = 20
+STOPS_TIMEOUT = 25
+DAILY_INFO_TIMEOUT = 15
+ELD_TIMEOUT = 30
+PERSIST_TIMEOUT = 10
+
+__all__ = [
+	"GEOCODE_TIMEOUT",
+	"ROUTE_TIMEOUT",
+	"STOPS_TIMEOUT",
+	"DAILY_INFO_TIMEOUT",
+	"ELD_TIMEOUT",
+	"PERSIST_TIMEOUT",
+]
@@ -0,0 +1,124 @@
+import logging
+import time
+from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .utils.trip_history import HISTORY_DEFAULT_LIMIT, query_trips
+from .utils.lane_rollup import lane_summary, top_lanes
+from .utils.route_index import ROUTE_NEARBY_MAX_RADIUS_KM, routes_nearby
+
+logger = logging.getLogger(__name__)
+
+
+def trip_history(request):
+    """
+    Past trips, newest first, with keyset pagination.
+
+    Filters: created_after / created_before (ISO 8601), status, pickup_location,
+    dropoff_location. Pass the returned next_cursor as ?cursor= for the next
+    page; ?include=geometry adds each trip's decoded route.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    try:
+        limit = int(request.GET.get("limit", HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    try:
+        trips, next_cursor = query_trips(
+            request.GET,
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+            include_geometry="geometry" in request.GET.get("include", "").split(","),
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return JsonResponse(
+        {"results": trips, "next_cursor": next_cursor, "next": next_url},
+        encoder=DjangoJSONEncoder,
+        status=200,
+    )
+
+
+LANE_STATS_MAX_LIMIT = 200
+LANE_STATS_MAX_DAYS = 366
+
+
+def lane_stats(request):
+    """
+    Per-lane averages read from the rollup tables only.
+
+    With pickup_location and dropoff_location: that lane plus a daily series
+    for the last `days` days. Otherwise: the busiest lanes by trip count.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    try:
+        limit = min(int(request.GET.get("limit", 50)), LANE_STATS_MAX_LIMIT)
+        days = min(int(request.GET.get("days", 30)), LANE_STATS_MAX_DAYS)
+    except ValueError:
+        return JsonResponse({"error": "limit and days must be integers."}, status=400)
+
+    pickup = request.GET.get("pickup_location")
+    dropoff = request.GET.get("dropoff_location")
+    if pickup or dropoff:
+        if not (pickup and dropoff):
+            return JsonResponse(
+                {"error": "pickup_location and dropoff_location are required together."}, status=400
+            )
+        summary = lane_summary(pickup, dropoff, max(days, 1))
+        if summary is None:
+            return JsonResponse({"error": "No trips recorded for this lane yet."}, status=404)
+        return JsonResponse(summary, encoder=DjangoJSONEncoder, status=200)
+
+    return JsonResponse({"lanes": top_lanes(max(limit, 1))}, encoder=DjangoJSONEncoder, status=200)
+
+
+NEARBY_MAX_LIMIT = 200
+
+
+def _query_coords(params, lat_name, lon_name):
+    lat, lon = params.get(lat_name), params.get(lon_name)
+    if lat is None and lon is None:
+        return None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError(f"{lat_name} and {lon_name} must be numbers.")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"{lat_name}/{lon_name} out of range.")
+    return lat, lon
+
+
+def nearby_routes(request):
+    """
+    Stored routes passing within radius_km of lat/lon, for backhaul matching.
+
+    With toward_lat/toward_lon, only routes that end closer to that point are
+    returned, ordered by progress toward it. Answered from the RouteCell index.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    try:
+        point = _query_coords(request.GET, "lat", "lon")
+        toward = _query_coords(request.GET, "toward_lat", "toward_lon")
+        if point is None:
+            raise ValueError("lat and lon are required.")
+        radius_km = float(request.GET.get("radius_km", 25))
+        limit = min(int(request.GET.get("limit", 50)), NEARBY_MAX_LIMIT)
+        if not 0 < radius_km <= ROUTE_NEARBY_MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be between 0 and {ROUTE_NEARBY_MAX_RADIUS_KM:g}.")
+        started = time.perf_counter()
+        routes = routes_nearby(*point, radius_km, toward=toward, limit=max(limit, 1))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"[NEARBY] {len(routes)} routes within {radius_km:g} km of {point} in {elapsed_ms:.1f} ms")
+    return JsonResponse({"routes": routes, "count": len(routes)}, encoder=DjangoJSONEncoder, status=200)
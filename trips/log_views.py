@@ -0,0 +1,105 @@
+import hashlib
+from django.http import JsonResponse, HttpResponse, FileResponse
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date_safe
+
+from .utils.eld_timeline import build_day_timeline, compute_daily_totals
+from .utils.result_cache import etag_matches
+from .models import LogSheet
+
+
+def _not_modified(request, etag, last_modified):
+    """RFC 9110 precedence: If-None-Match wins; If-Modified-Since only without it."""
+    if "If-None-Match" in request.headers:
+        return etag_matches(request, etag)
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def _with_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    # A stored log never changes, but clients should still revalidate now and then.
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+def trip_logs(request, trip_id):
+    """The stored daily log sheets of a past trip."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    sheets = list(
+        LogSheet.objects.filter(trip_id=trip_id).only(
+            "day_number", "hours_driven", "rest_time", "artifact_key", "created_at"
+        )
+    )
+    if not sheets:
+        return JsonResponse({"error": "No log sheets stored for this trip."}, status=404)
+
+    etag = '"' + hashlib.sha256(",".join(s.artifact_key for s in sheets).encode()).hexdigest()[:32] + '"'
+    last_modified = max(sheet.created_at for sheet in sheets)
+    if _not_modified(request, etag, last_modified):
+        return _with_validators(HttpResponse(status=304), etag, last_modified)
+
+    logs = [
+        {
+            "day_number": sheet.day_number,
+            "hours_driven": sheet.hours_driven,
+            "rest_time": sheet.rest_time,
+            "sheet_url": request.build_absolute_uri(
+                reverse("trip_log_sheet", args=[trip_id, sheet.day_number])
+            ),
+        }
+        for sheet in sheets
+    ]
+    return _with_validators(
+        JsonResponse({"trip_id": trip_id, "logs": logs}, status=200), etag, last_modified
+    )
+
+
+def trip_log_sheet(request, trip_id, day_number):
+    """
+    One stored day of a trip's log: the PNG page by default, or ?format=json
+    for its timeline. Served from the ELD artifact cache by content key; an
+    evicted page is re-rendered from the stored duty blocks to the same key.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    sheet = LogSheet.objects.filter(trip_id=trip_id, day_number=day_number).first()
+    if sheet is None:
+        return JsonResponse({"error": "Log sheet not found."}, status=404)
+
+    as_json = request.GET.get("format") == "json"
+    etag = f'"{sheet.artifact_key}{"-json" if as_json else ""}"'
+    if _not_modified(request, etag, sheet.created_at):
+        return _with_validators(HttpResponse(status=304), etag, sheet.created_at)
+
+    if as_json:
+        totals = compute_daily_totals(sheet.duty_blocks)
+        response = JsonResponse(
+            {
+                "trip_id": trip_id,
+                "day": sheet.day_number,
+                "total_sheets": sheet.total_sheets,
+                **sheet.daily_info,
+                "segments": build_day_timeline(sheet.duty_blocks),
+                "totals": {act: round(hours, 2) for act, hours in totals.items()},
+            },
+            status=200,
+        )
+        return _with_validators(response, etag, sheet.created_at)
+
+    from .utils.generate_eld import eld_sheet_path
+
+    path = eld_sheet_path(
+        {
+            "key": sheet.artifact_key,
+            "day_number": sheet.day_number,
+            "blocks": sheet.duty_blocks,
+            "total_sheets": sheet.total_sheets,
+            "info": sheet.daily_info,
+            "compact": sheet.compact,
+        }
+    )
+    response = FileResponse(open(path, "rb"), content_type="image/png")
+    return _with_validators(response, etag, sheet.created_at)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from trips.utils.trip_buffer import buffer_stats, flush_buffer, requeue_dead_letters
+
+
+class Command(BaseCommand):
+    help = "Inspect the buffered trip writer: queue sizes, manual flush, dead-letter requeue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flush", action="store_true", help="Write buffered trips now")
+        parser.add_argument(
+            "--requeue-dead", action="store_true", help="Move dead-lettered trips back onto the buffer"
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            self.stdout.write(f"Requeued {requeue_dead_letters()} dead-lettered trips")
+        if options["flush"]:
+            self.stdout.write(f"Flush: {flush_buffer()}")
+        stats = buffer_stats()
+        self.stdout.write(
+            f"Buffered: {stats['buffered']}  Processing: {stats['processing']}  "
+            f"Dead letter: {stats['dead_letter']}"
+        )
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.utils.profiling import PROFILE_DIR, delete_profile, list_profiles, profile_path
+
+
+class Command(BaseCommand):
+    help = "List, show or delete request profiles captured by the trip profiling hook."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show", metavar="PROFILE_ID", help="Print the hottest stacks of a profile")
+        parser.add_argument("--top", type=int, default=20, help="Number of stacks shown with --show")
+        parser.add_argument("--delete", metavar="PROFILE_ID", help="Delete a profile")
+
+    def handle(self, *args, **options):
+        if options["delete"]:
+            delete_profile(options["delete"])
+            self.stdout.write(f"Deleted {options['delete']}")
+            return
+
+        if options["show"]:
+            path = profile_path(options["show"])
+            if path is None:
+                raise CommandError(f"No profile '{options['show']}' in {PROFILE_DIR}")
+            with open(path) as fh:
+                for line in fh.readlines()[: options["top"]]:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    frames = stack.split(";")
+                    self.stdout.write(f"{count:>6}  {' <- '.join(reversed(frames[-4:]))}")
+            self.stdout.write(f"\nFull collapsed stacks: {path}")
+            return
+
+        profiles = list_profiles()
+        if not profiles:
+            self.stdout.write(f"No profiles in {PROFILE_DIR}")
+            return
+        for meta in profiles:
+            started = datetime.fromtimestamp(meta.get("started_at", 0)).isoformat(timespec="seconds")
+            self.stdout.write(
+                f"{meta['id']}  {started}  {meta.get('duration_ms')} ms  "
+                f"{meta.get('samples')} samples  status={meta.get('status')}  ({meta.get('trigger')})"
+            )
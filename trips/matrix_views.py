@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .utils.admission import AdmissionRejected, busy_response, gather_limited, limited
+from .utils.route import geocode_place_cached
+from .utils.route_matrix import arrival_at_pickup, matrix_with_cache
+from .batch_views import BATCH_CONCURRENCY, _place_key
+from .views import _encoded_response
+
+logger = logging.getLogger(__name__)
+
+MATRIX_MAX_ORIGINS = 200
+MATRIX_MAX_DESTINATIONS = 200
+
+
+def _matrix_points(name, entries, limit):
+    """Normalize origins/destinations: a place name, or {"id", "location" | "coords", ...}."""
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{name} must be a non-empty list.")
+    if len(entries) > limit:
+        raise ValueError(f"At most {limit} {name} per matrix.")
+    points = []
+    for entry in entries:
+        point = {"location": entry} if isinstance(entry, str) else entry
+        if not isinstance(point, dict) or not (point.get("location") or point.get("coords")):
+            raise ValueError(f"Each of {name} needs a location or coords.")
+        if point.get("coords") is not None:
+            try:
+                lat, lon = (float(value) for value in point["coords"])
+            except (TypeError, ValueError):
+                raise ValueError(f"coords in {name} must be [lat, lon].")
+            point = {**point, "coords": (lat, lon)}
+        points.append(point)
+    return points
+
+
+@csrf_exempt
+async def route_matrix(request):
+    """
+    Distance/duration from every origin (truck) to every destination (load pickup).
+
+    Body: {"origins": [...], "destinations": [...], "arrival": true}. Places are
+    geocoded once each and the ORS matrix service is called in chunks; with
+    "arrival" each cell also carries the HOS-compliant day the truck reaches the
+    pickup, using the origin's current_cycle_used.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+    try:
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+            origins = _matrix_points("origins", data.get("origins"), MATRIX_MAX_ORIGINS)
+            destinations = _matrix_points(
+                "destinations", data.get("destinations"), MATRIX_MAX_DESTINATIONS
+            )
+            cycles = [float(origin.get("current_cycle_used", 0)) for origin in origins]
+        except (TypeError, ValueError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        places = {}
+        for point in origins + destinations:
+            if point.get("coords") is None:
+                places.setdefault(_place_key(point["location"]), point["location"])
+        geocoded = await gather_limited(
+            "geocode",
+            geocode_place_cached,
+            [(name,) for name in places.values()],
+            asyncio.Semaphore(BATCH_CONCURRENCY),
+        )
+        coords_by_place = dict(zip(places.keys(), geocoded))
+
+        def resolve(points):
+            resolved = []
+            for point in points:
+                coords = point.get("coords") or coords_by_place[_place_key(point["location"])]
+                entry = {"id": point.get("id"), "location": point.get("location")}
+                if isinstance(coords, Exception):
+                    entry["error"] = str(coords)
+                else:
+                    entry["coords"] = tuple(coords)
+                resolved.append(entry)
+            return resolved
+
+        origin_rows = resolve(origins)
+        destination_cols = resolve(destinations)
+        routable_origins = [i for i, o in enumerate(origin_rows) if "coords" in o]
+        routable_destinations = [j for j, d in enumerate(destination_cols) if "coords" in d]
+
+        matrix = {"distances_km": [], "durations_hr": [], "cells": 0, "cached": 0, "upstream_calls": 0}
+        if routable_origins and routable_destinations:
+            matrix = await limited(
+                "matrix",
+                matrix_with_cache,
+                [origin_rows[i]["coords"] for i in routable_origins],
+                [destination_cols[j]["coords"] for j in routable_destinations],
+            )
+
+        # Spread the routable sub-matrix back over the full grid; unresolved rows/columns stay None.
+        size = (len(origins), len(destinations))
+        distances = [[None] * size[1] for _ in range(size[0])]
+        durations = [[None] * size[1] for _ in range(size[0])]
+        for r, i in enumerate(routable_origins):
+            for c, j in enumerate(routable_destinations):
+                distances[i][j] = matrix["distances_km"][r][c]
+                durations[i][j] = matrix["durations_hr"][r][c]
+
+        body = {
+            "origins": origin_rows,
+            "destinations": destination_cols,
+            "distances_km": distances,
+            "durations_hr": durations,
+            "summary": {
+                "cells": size[0] * size[1],
+                "unique_cells": matrix["cells"],
+                "cached": matrix["cached"],
+                "upstream_calls": matrix["upstream_calls"],
+            },
+        }
+        if data.get("arrival"):
+            body["arrival"] = [
+                [arrival_at_pickup(distance, cycles[i]) for distance in row]
+                for i, row in enumerate(distances)
+            ]
+        return _encoded_response(request, body)
+
+    except AdmissionRejected as rejection:
+        return busy_response(rejection)
+    except ValueError as e:
+        logger.warning(f"[MATRIX] Upstream matrix failed: {e}")
+        return JsonResponse({"error": str(e)}, status=502)
+    except Exception as e:
+        logger.exception(f"[ERROR] Matrix calculation failed: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
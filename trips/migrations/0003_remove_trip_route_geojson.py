@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Separate from the backfill in 0003_route_trip_route so each runs in its own transaction."""
+
+    dependencies = [
+        ('trips', '0003_route_trip_route'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='trip',
+            name='route_geojson',
+        ),
+    ]
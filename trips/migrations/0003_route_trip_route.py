@@ -0,0 +1,153 @@
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of trips.utils.polyline and trips.utils.route_store as of this
+# migration, so later changes to the app code cannot change what it does.
+def lane_waypoints(waypoints):
+    return ";".join(f"{float(lat):.5f},{float(lon):.5f}" for lat, lon in waypoints)
+
+
+def lane_key(waypoints):
+    return hashlib.sha256(lane_waypoints(waypoints).encode("utf-8")).hexdigest()
+
+
+def encode_polyline(coordinates, precision=5):
+    factor = 10**precision
+    output = []
+    prev_lat = prev_lon = 0
+    for point in coordinates:
+        lat = int(round(point[1] * factor))
+        lon = int(round(point[0] * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = lat, lon
+    return "".join(output)
+
+
+def decode_polyline(encoded, precision=5):
+    factor = 10**precision
+    coordinates = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coordinates.append([lon / factor, lat / factor])
+    return coordinates
+
+
+def _waypoints(trip):
+    return [
+        tuple(map(float, coords.split(",")))
+        for coords in (trip.current_location_coords, trip.pickup_coords, trip.dropoff_coords)
+    ]
+
+
+def move_geometry_to_routes(apps, schema_editor):
+    Trip = apps.get_model("trips", "Trip")
+    Route = apps.get_model("trips", "Route")
+    route_ids = {}
+
+    trips = Trip.objects.exclude(route_geojson=None).only(
+        "id", "current_location_coords", "pickup_coords", "dropoff_coords",
+        "total_distance_km", "total_trip_hours", "route_geojson",
+    )
+    pending = []
+    for trip in trips.iterator(chunk_size=BATCH_SIZE):
+        route_geojson = trip.route_geojson
+        # Older rows hold a JSON string inside the JSONField.
+        if isinstance(route_geojson, str):
+            route_geojson = json.loads(route_geojson)
+        geometry = (route_geojson or {}).get("geometry")
+        if not geometry:
+            continue
+        try:
+            waypoints = _waypoints(trip)
+        except (AttributeError, ValueError):
+            continue
+
+        key = lane_key(waypoints)
+        if key not in route_ids:
+            route, _ = Route.objects.get_or_create(
+                lane_key=key,
+                defaults={
+                    "waypoints": lane_waypoints(waypoints),
+                    "polyline": encode_polyline(geometry),
+                    "point_count": len(geometry),
+                    "distance_km": trip.total_distance_km,
+                    "duration_hr": trip.total_trip_hours,
+                },
+            )
+            route_ids[key] = route.id
+        trip.route_id = route_ids[key]
+        pending.append(trip)
+        if len(pending) >= BATCH_SIZE:
+            Trip.objects.bulk_update(pending, ["route"])
+            pending = []
+    if pending:
+        Trip.objects.bulk_update(pending, ["route"])
+
+
+def restore_route_geojson(apps, schema_editor):
+    Trip = apps.get_model("trips", "Trip")
+    pending = []
+    for trip in Trip.objects.exclude(route=None).select_related("route").iterator(chunk_size=BATCH_SIZE):
+        trip.route_geojson = {"geometry": decode_polyline(trip.route.polyline)}
+        pending.append(trip)
+        if len(pending) >= BATCH_SIZE:
+            Trip.objects.bulk_update(pending, ["route_geojson"])
+            pending = []
+    if pending:
+        Trip.objects.bulk_update(pending, ["route_geojson"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_alter_logsheet_options_alter_logsheet_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Route',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lane_key', models.CharField(max_length=64, unique=True)),
+                ('waypoints', models.CharField(help_text='lat,lon of current;pickup;dropoff the geometry was routed through', max_length=255)),
+                ('polyline', models.TextField(help_text='Google-encoded [lon, lat] geometry, precision 5')),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('duration_hr', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='route',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trips', to='trips.route'),
+        ),
+        # route_geojson is dropped in the next migration: on PostgreSQL the table
+        # cannot be altered in the transaction that just updated the deferred FK.
+        migrations.RunPython(move_geometry_to_routes, restore_route_geojson),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0004_trip_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LaneDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pickup_location', models.CharField(max_length=255)),
+                ('dropoff_location', models.CharField(max_length=255)),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('total_distance_km', models.FloatField(default=0.0)),
+                ('total_trip_hours', models.FloatField(default=0.0)),
+                ('total_days', models.PositiveIntegerField(default=0)),
+                ('total_cycle_used', models.FloatField(default=0.0)),
+                ('last_trip_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LaneStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pickup_location', models.CharField(max_length=255)),
+                ('dropoff_location', models.CharField(max_length=255)),
+                ('trip_count', models.PositiveIntegerField(default=0)),
+                ('total_distance_km', models.FloatField(default=0.0)),
+                ('total_trip_hours', models.FloatField(default=0.0)),
+                ('total_days', models.PositiveIntegerField(default=0)),
+                ('total_cycle_used', models.FloatField(default=0.0)),
+                ('last_trip_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_trip_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='total_days',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='lanedailystats',
+            constraint=models.UniqueConstraint(fields=('pickup_location', 'dropoff_location', 'date'), name='lane_daily_stats_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='lanestats',
+            index=models.Index(fields=['-trip_count'], name='lane_stats_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lanestats',
+            constraint=models.UniqueConstraint(fields=('pickup_location', 'dropoff_location'), name='lane_stats_lane_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_lane_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logsheet',
+            name='artifact_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='logsheet',
+            name='compact',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='logsheet',
+            name='daily_info',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='logsheet',
+            name='duty_blocks',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='logsheet',
+            name='total_sheets',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,124 @@
+import math
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+PRECISION = 5
+STEP_KM = 1.0
+EARTH_RADIUS_KM = 6371.0
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# Frozen copies of trips.utils.polyline, trips.utils.geohash and
+# trips.utils.route_index as of this migration, so later changes to the app
+# code (or its ROUTE_INDEX_* settings) cannot change what it does.
+def decode_polyline(encoded, precision=5):
+    factor = 10**precision
+    coordinates = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coordinates.append([lon / factor, lat / factor])
+    return coordinates
+
+
+def encode_geohash(lat, lon, precision=PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        coord, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def route_cells(geometry):
+    cells = {}
+    if not geometry:
+        return cells
+    position = 0.0
+    lon, lat = geometry[0][:2]
+    cells[encode_geohash(lat, lon)] = 0.0
+    for previous, point in zip(geometry, geometry[1:]):
+        (lon1, lat1), (lon2, lat2) = previous[:2], point[:2]
+        length = haversine_km(lat1, lon1, lat2, lon2)
+        steps = max(1, math.ceil(length / STEP_KM))
+        for step in range(1, steps + 1):
+            t = step / steps
+            cells.setdefault(
+                encode_geohash(lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t),
+                position + length * t,
+            )
+        position += length
+    return cells
+
+
+def index_existing_routes(apps, schema_editor):
+    Route = apps.get_model("trips", "Route")
+    RouteCell = apps.get_model("trips", "RouteCell")
+    for route in Route.objects.only("id", "polyline").iterator(chunk_size=BATCH_SIZE):
+        rows = [
+            RouteCell(route_id=route.id, cell=cell, position_km=round(position, 3))
+            for cell, position in route_cells(decode_polyline(route.polyline)).items()
+        ]
+        RouteCell.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_logsheet_artifacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('position_km', models.FloatField(help_text='Distance along the route where it enters the cell')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cells', to='trips.route')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cell', 'route'], name='route_cell_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routecell',
+            constraint=models.UniqueConstraint(fields=('route', 'cell'), name='route_cell_uniq'),
+        ),
+        migrations.RunPython(index_existing_routes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+LANE_ROLLUP = "lane_stats"
+
+
+def count_recorded_days(apps, schema_editor):
+    """days_count for what is already rolled up: trips up to the watermark with total_days set."""
+    Trip = apps.get_model("trips", "Trip")
+    LaneStats = apps.get_model("trips", "LaneStats")
+    LaneDailyStats = apps.get_model("trips", "LaneDailyStats")
+    RollupWatermark = apps.get_model("trips", "RollupWatermark")
+
+    watermark = RollupWatermark.objects.filter(name=LANE_ROLLUP).first()
+    if watermark is None:
+        return
+    lanes, days = Counter(), Counter()
+    trips = Trip.objects.filter(id__lte=watermark.last_trip_id, total_days__isnull=False).values_list(
+        "pickup_location", "dropoff_location", "created_at"
+    )
+    for pickup, dropoff, created_at in trips.iterator(chunk_size=BATCH_SIZE):
+        lanes[pickup, dropoff] += 1
+        days[pickup, dropoff, timezone.localdate(created_at)] += 1
+
+    for (pickup, dropoff), count in lanes.items():
+        LaneStats.objects.filter(pickup_location=pickup, dropoff_location=dropoff).update(days_count=count)
+    for (pickup, dropoff, date), count in days.items():
+        LaneDailyStats.objects.filter(pickup_location=pickup, dropoff_location=dropoff, date=date).update(
+            days_count=count
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0007_route_cells'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lanedailystats',
+            name='days_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lanestats',
+            name='days_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_recorded_days, migrations.RunPython.noop),
+    ]
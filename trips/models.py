@@ -1,5 +1,52 @@
 from django.db import models
 
+from .utils.polyline import decode_polyline
+
+
+class Route(models.Model):
+    """
+    Route geometry shared by every trip on the same lane, stored once as an
+    encoded polyline instead of a GeoJSON copy per trip.
+    """
+
+    lane_key = models.CharField(max_length=64, unique=True)
+    waypoints = models.CharField(
+        max_length=255, help_text="lat,lon of current;pickup;dropoff the geometry was routed through"
+    )
+    polyline = models.TextField(help_text="Google-encoded [lon, lat] geometry, precision 5")
+    point_count = models.PositiveIntegerField(default=0)
+    distance_km = models.FloatField(null=True, blank=True)
+    duration_hr = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def geometry(self):
+        return decode_polyline(self.polyline)
+
+    def __str__(self):
+        return f"Route {self.id}: {self.waypoints} ({self.point_count} points)"
+
+
+class RouteCell(models.Model):
+    """
+    Spatial index over routes: one row per geohash cell a route passes
+    through, so "routes near a point" is a lookup instead of decoding every
+    polyline. Written once when the route is stored.
+    """
+
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="cells")
+    cell = models.CharField(max_length=12)
+    position_km = models.FloatField(help_text="Distance along the route where it enters the cell")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["route", "cell"], name="route_cell_uniq"),
+        ]
+        indexes = [models.Index(fields=["cell", "route"], name="route_cell_lookup_idx")]
+
+    def __str__(self):
+        return f"Route {self.route_id} @ {self.cell}"
+
 
 class Trip(models.Model):
     current_location = models.CharField(max_length=255, blank=True, null=True)
@@ -13,9 +60,124 @@ class Trip(models.Model):
     )
     total_trip_hours = models.FloatField(null=True, blank=True)
     total_distance_km = models.FloatField(null=True, blank=True)
-    route_geojson = models.JSONField(null=True, blank=True)
+    total_days = models.PositiveSmallIntegerField(null=True, blank=True)
+    route = models.ForeignKey(
+        Route, on_delete=models.SET_NULL, null=True, blank=True, related_name="trips"
+    )
     status = models.CharField(max_length=32, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Trip history is paged newest-first on (created_at, id); each filter
+        # gets a composite index ending in the same keys so a page is an index
+        # range scan instead of a sort.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="trip_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="trip_status_created_idx"),
+            models.Index(fields=["pickup_location", "-created_at", "-id"], name="trip_pickup_created_idx"),
+            models.Index(fields=["dropoff_location", "-created_at", "-id"], name="trip_dropoff_created_idx"),
+        ]
+
     def __str__(self):
         return f"Trip {self.id}: {self.pickup_location} → {self.dropoff_location}"
+
+
+class LogSheet(models.Model):
+    """
+    One day of a trip's ELD log.
+
+    `artifact_key` is the content address of the rendered page in the ELD
+    artifact cache; `duty_blocks`, `daily_info` and `compact` are exactly what
+    it was rendered from, so an evicted page re-renders to the same key.
+    """
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="logs")
+    day_number = models.PositiveIntegerField(db_index=True)
+    hours_driven = models.FloatField(default=0.0)
+    rest_time = models.FloatField(default=0.0)
+    notes = models.TextField(blank=True, null=True)
+    sheet_image = models.ImageField(upload_to="logs/", blank=True, null=True)
+    artifact_key = models.CharField(max_length=64, blank=True, default="")
+    duty_blocks = models.JSONField(default=list)
+    daily_info = models.JSONField(default=dict)
+    total_sheets = models.PositiveIntegerField(default=1)
+    compact = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["day_number"]
+        unique_together = ("trip", "day_number")
+        indexes = [
+            models.Index(fields=["trip", "day_number"], name="trips_logsh_trip_id_389798_idx"),
+            models.Index(fields=["created_at"], name="trips_logsh_created_94ed0a_idx"),
+        ]
+        verbose_name = "Log Sheet"
+        verbose_name_plural = "Log Sheets"
+
+    def __str__(self):
+        return f"Log sheet day {self.day_number} of trip {self.trip_id}"
+
+
+class LaneStatsBase(models.Model):
+    """
+    Running sums for a lane, maintained incrementally by the lane rollup task.
+    Averages are derived on read so new trips only ever add to a row.
+    """
+
+    pickup_location = models.CharField(max_length=255)
+    dropoff_location = models.CharField(max_length=255)
+    trip_count = models.PositiveIntegerField(default=0)
+    total_distance_km = models.FloatField(default=0.0)
+    total_trip_hours = models.FloatField(default=0.0)
+    total_days = models.PositiveIntegerField(default=0)
+    # Trips from before total_days was recorded add to neither total_days nor this.
+    days_count = models.PositiveIntegerField(default=0)
+    total_cycle_used = models.FloatField(default=0.0)
+    last_trip_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def averages(self):
+        count = self.trip_count or 1
+        return {
+            "pickup_location": self.pickup_location,
+            "dropoff_location": self.dropoff_location,
+            "trip_count": self.trip_count,
+            "avg_distance_km": round(self.total_distance_km / count, 3),
+            "avg_trip_hours": round(self.total_trip_hours / count, 3),
+            "avg_days": round(self.total_days / self.days_count, 3) if self.days_count else None,
+            "avg_cycle_used": round(self.total_cycle_used / count, 3),
+            "last_trip_at": self.last_trip_at,
+        }
+
+
+class LaneStats(LaneStatsBase):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["pickup_location", "dropoff_location"], name="lane_stats_lane_uniq"),
+        ]
+        indexes = [models.Index(fields=["-trip_count"], name="lane_stats_count_idx")]
+
+
+class LaneDailyStats(LaneStatsBase):
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pickup_location", "dropoff_location", "date"], name="lane_daily_stats_uniq"
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """Highest Trip id already folded into a rollup."""
+
+    name = models.CharField(max_length=64, unique=True)
+    last_trip_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ trip {self.last_trip_id}"
@@ -0,0 +1,7 @@
+# Import task modules so Celery's autodiscover_tasks() registers them on workers.
+from .trip_creation import create_trip_task
+from .eld_generation import generate_eld_task
+from .trip_persistence import flush_trip_buffer
+from .lane_stats import rollup_lane_stats
+
+__all__ = ["create_trip_task", "generate_eld_task", "flush_trip_buffer", "rollup_lane_stats"]
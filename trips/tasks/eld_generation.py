@@ -0,0 +1,22 @@
+from celery import shared_task
+from ..utils.eld_cache import eld_cache
+from ..utils.generate_eld import eld_sheet_path, plan_eld_sheets, register_eld_bundle
+import logging
+
+
+@shared_task
+def generate_eld_task(duty_blocks, daily_info_dict=None, compact=None):
+    """Renders ELD sheets off the request path and registers the merged-PDF bundle."""
+    if not eld_cache.shared:
+        # The web processes could never serve what this worker renders locally.
+        raise RuntimeError("Async ELD jobs need ELD_CACHE_SHARED=true and a shared CACHE_URL.")
+
+    # JSON serialization turns the day-number keys into strings.
+    daily_info_dict = {int(day): info for day, info in (daily_info_dict or {}).items()}
+
+    sheets = plan_eld_sheets(duty_blocks, daily_info_dict, compact=compact)
+    eld_paths = [eld_sheet_path(sheet) for sheet in sheets]
+    artifact_id = register_eld_bundle(sheets)
+    logging.info(f"[ELD] Generated {len(eld_paths)} sheets, artifact {artifact_id}")
+
+    return {"pdf_artifact_id": artifact_id, "total_sheets": len(eld_paths)}
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from ..utils.lane_rollup import rollup_new_trips
+
+
+@shared_task(ignore_result=True)
+def rollup_lane_stats(batch_size=None, max_batches=None):
+    """Periodic incremental refresh of the lane rollups (see CELERY_BEAT_SCHEDULE)."""
+    return rollup_new_trips(batch_size=batch_size, max_batches=max_batches)
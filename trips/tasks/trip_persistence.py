@@ -0,0 +1,12 @@
+from celery import shared_task
+import logging
+
+from ..utils.trip_buffer import flush_buffer
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_trip_buffer(batch_size=None, max_batches=None):
+    """Periodic bulk writer for trips queued by buffer_trip (see CELERY_BEAT_SCHEDULE)."""
+    return flush_buffer(batch_size=batch_size, max_batches=max_batches)
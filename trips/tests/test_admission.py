@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from trips.utils.admission import AdmissionRejected, StageLimiter, gather_limited
+from trips.utils.pipeline import Stage, StageTimeout
+
+BATCH = {"trips": [{"pickup_location": "Dallas, TX", "dropoff_location": "Austin, TX"}] * 2}
+
+
+def saturated(stage):
+    """A limiter with no slots and no queue: every acquire is rejected."""
+    return StageLimiter(stage, 0, 0)
+
+
+class BatchAdmissionTests(SimpleTestCase):
+    def _post(self, url, body):
+        return self.client.post(reverse(url), json.dumps(body), content_type="application/json")
+
+    @mock.patch("trips.batch_views.geocode_place_cached")
+    def test_saturated_geocode_rejects_the_batch_with_503(self, geocode):
+        with mock.patch("trips.utils.admission.limiter_for", saturated):
+            response = self._post("calculate_trip_batch", BATCH)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(response.json()["stage"], "geocode")
+        geocode.assert_not_called()
+
+    @mock.patch("trips.batch_views.geocode_place_cached")
+    def test_streamed_batch_is_rejected_before_headers_are_sent(self, geocode):
+        with mock.patch("trips.utils.admission.limiter_for", saturated):
+            response = self._post("calculate_trip_batch", {**BATCH, "stream": True})
+
+        self.assertEqual(response.status_code, 503)
+
+    @mock.patch("trips.batch_views.route_with_cache")
+    @mock.patch("trips.batch_views.geocode_place_cached")
+    def test_saturated_route_rejects_the_batch_with_503(self, geocode, route):
+        async def coords(name):
+            return (32.7, -96.8) if "Dallas" in name else (30.3, -97.7)
+
+        geocode.side_effect = coords
+        limiters = {"route": saturated("route")}
+        with mock.patch("trips.utils.admission.limiter_for", limiters.get):
+            response = self._post("calculate_trip_batch", BATCH)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["stage"], "route")
+        route.assert_not_called()
+
+    @mock.patch("trips.matrix_views.geocode_place_cached")
+    def test_saturated_matrix_geocode_returns_503(self, geocode):
+        body = {"origins": [{"location": "Dallas, TX"}], "destinations": [{"location": "Austin, TX"}]}
+        with mock.patch("trips.utils.admission.limiter_for", saturated):
+            response = self._post("route_matrix", body)
+
+        self.assertEqual(response.status_code, 503)
+        geocode.assert_not_called()
+
+
+class StageSlotTests(SimpleTestCase):
+    def test_timed_out_pool_work_keeps_its_slot_until_the_thread_finishes(self):
+        limiter = StageLimiter("eld", 1, 0)
+        started, unblock, finished = threading.Event(), threading.Event(), threading.Event()
+
+        def render(_):
+            started.set()
+            unblock.wait(5)
+            finished.set()
+
+        stage = Stage("eld", render, executor="cpu", timeout=0.05, limiter=limiter)
+        with self.assertRaises(StageTimeout):
+            asyncio.run(stage.run({}))
+
+        self.assertTrue(started.is_set())
+        self.assertEqual(limiter.stats()["active"], 1)
+        with self.assertRaises(AdmissionRejected):
+            asyncio.run(stage.run({}))
+
+        unblock.set()
+        finished.wait(5)
+        for _ in range(100):
+            if limiter.stats()["active"] == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(limiter.stats()["active"], 0)
+
+    def test_coroutine_stages_release_when_they_finish(self):
+        limiter = StageLimiter("route", 1, 0)
+
+        async def route(_):
+            return "ok"
+
+        self.assertEqual(asyncio.run(Stage("route", route, limiter=limiter).run({})), "ok")
+        self.assertEqual(limiter.stats()["active"], 0)
+
+
+class GatherLimitedTests(SimpleTestCase):
+    def test_calls_share_the_semaphore_and_keep_their_order(self):
+        in_flight = []
+        peak = []
+
+        async def call(n):
+            in_flight.append(n)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(n)
+            if n == 2:
+                raise ValueError("no route")
+            return n * 10
+
+        async def run():
+            return await gather_limited("unlimited", call, [(n,) for n in range(5)], asyncio.Semaphore(2))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual([results[0], results[1], results[3], results[4]], [0, 10, 30, 40])
+        self.assertIsInstance(results[2], ValueError)
+
+    def test_a_rejection_fails_the_whole_gather(self):
+        async def call(n):
+            return n
+
+        async def run():
+            with mock.patch("trips.utils.admission.limiter_for", saturated):
+                return await gather_limited("geocode", call, [(1,), (2,)], asyncio.Semaphore(2))
+
+        with self.assertRaises(AdmissionRejected):
+            asyncio.run(run())
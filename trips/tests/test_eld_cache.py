@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from trips.utils.eld_cache import EldArtifactCache
+
+
+class EldArtifactCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _age(self, path, seconds):
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_overwriting_a_key_does_not_grow_tracked_size(self):
+        cache = EldArtifactCache(self.tmp.name, max_bytes=10_000)
+        cache.put("a", "png", b"x" * 100)  # first write scans the directory
+        cache.put("b", "png", b"x" * 100)
+        cache.put("b", "png", b"x" * 100)
+        cache.put("b", "png", b"x" * 40)
+
+        self.assertEqual(cache.stats()["size_bytes"], 140)
+
+    def test_eviction_drops_least_recently_used_first(self):
+        cache = EldArtifactCache(self.tmp.name, max_bytes=250)
+        old = cache.put("old", "png", b"x" * 100)
+        used = cache.put("used", "png", b"x" * 100)
+        self._age(old, 3600)
+        self._age(used, 1800)
+        cache.get("used", "png")  # touching it makes it the most recently used
+
+        cache.put("new", "png", b"x" * 100)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(used))
+        self.assertEqual(cache.stats()["size_bytes"], 200)
+
+    def test_recently_returned_paths_are_not_evicted(self):
+        cache = EldArtifactCache(self.tmp.name, max_bytes=150)
+        first = cache.put("first", "png", b"x" * 100)
+
+        second = cache.put("second", "png", b"x" * 100)
+
+        # Both are inside the in-flight window, so the store stays over budget.
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+        self.assertEqual(cache.get("first", "png"), first)
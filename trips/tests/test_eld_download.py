@@ -0,0 +1,71 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from trips.utils.duty_scheduler import generate_duty_blocks
+from trips.utils.eld_cache import EldArtifactCache
+from trips.utils.generate_eld import eld_sheet_path, plan_eld_sheets, register_eld_bundle
+
+
+class EldPdfDownloadTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(cache.clear)
+        store = EldArtifactCache(self.tmp.name, max_bytes=100 * 1024 * 1024)
+        patcher = mock.patch("trips.utils.generate_eld.eld_cache", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        duty_blocks, _ = generate_duty_blocks(50, 600, 10)
+        sheets = plan_eld_sheets(duty_blocks, compact=True)
+        for sheet in sheets:
+            eld_sheet_path(sheet)
+        self.artifact_id = register_eld_bundle(sheets)
+        self.url = reverse("download_eld_pdf", args=[self.artifact_id])
+
+    def test_download_returns_pdf_with_weak_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'W/"{self.artifact_id}"')
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_if_none_match_is_answered_without_building(self):
+        with mock.patch("trips.utils.generate_eld.build_eld_pdf") as build:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.artifact_id}"')
+
+        self.assertEqual(response.status_code, 304)
+        build.assert_not_called()
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9")
+
+        self.assertEqual(response.status_code, 206)
+        full = b"".join(self.client.get(self.url).streaming_content)
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{len(full)}")
+        self.assertEqual(b"".join(response.streaming_content), full[:10])
+
+    def test_if_range_with_weak_etag_serves_full_pdf(self):
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=f'W/"{self.artifact_id}"'
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_evicted_pages_are_rebuilt_from_the_shared_manifest(self):
+        for name in os.listdir(self.tmp.name):
+            os.remove(os.path.join(self.tmp.name, name))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_artifact_is_not_found(self):
+        response = self.client.get(reverse("download_eld_pdf", args=["0" * 64]))
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache:6379/1"}}
+
+
+class AsyncEldConfigTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_shared_eld_cache_on_a_local_memory_cache_fails_at_startup(self):
+        with mock.patch("trips.utils.eld_cache.ELD_CACHE_SHARED", True):
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config("trips").ready()
+
+    @override_settings(CACHES=REDIS)
+    def test_shared_eld_cache_on_redis_starts(self):
+        with mock.patch("trips.utils.eld_cache.ELD_CACHE_SHARED", True):
+            apps.get_app_config("trips").ready()
+
+    def test_job_status_is_not_found_without_shared_storage(self):
+        with mock.patch("trips.views.ELD_ASYNC_JOBS", False):
+            response = self.client.get(reverse("eld_job_status", args=["some-job"]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncEldFallbackLogTests(SimpleTestCase):
+    @mock.patch("trips.views._async_eld_fallback_logged", False)
+    @mock.patch("trips.views.TRIP_BROKER_FREE", False)
+    def test_fallback_is_logged_once(self):
+        from trips import views
+
+        with self.assertLogs("trips.views", "WARNING") as logs:
+            views._log_async_eld_fallback()
+            views._log_async_eld_fallback()
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("ELD_CACHE_SHARED", logs.output[0])
+
+    def test_importing_the_views_logs_nothing(self):
+        output = subprocess.run(
+            [sys.executable, "-c", "import django; django.setup(); import trips.views"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertNotIn("[ELD]", output.stdout + output.stderr)
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from trips.utils.duty_scheduler import generate_duty_blocks
+from trips.utils.eld_cache import EldArtifactCache
+from trips.utils.generate_eld import generate_multiple_eld_sheets, merge_eld_sheets
+from trips.views import _normalize_eld_compact
+
+
+class MergeEldSheetsTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = EldArtifactCache(self.tmp.name, max_bytes=100 * 1024 * 1024)
+        patcher = mock.patch("trips.utils.generate_eld.eld_cache", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.duty_blocks, _ = generate_duty_blocks(50, 1200, 10)
+
+    def _merge_uncached(self, paths):
+        key = self.store.bundle_key(paths)
+        pdf = merge_eld_sheets(paths)
+        os.remove(self.store.path_for(key, "pdf"))
+        return pdf
+
+    def test_one_page_per_sheet_for_both_raster_modes(self):
+        for compact in (True, False):
+            paths = generate_multiple_eld_sheets(self.duty_blocks, compact=compact)
+            pdf = self._merge_uncached(paths)
+
+            self.assertTrue(pdf.startswith(b"%PDF"))
+            self.assertEqual(pdf.count(b"/Type /Page\n"), len(paths))
+
+    def test_same_sheets_give_identical_bytes(self):
+        paths = generate_multiple_eld_sheets(self.duty_blocks, compact=True)
+
+        self.assertEqual(self._merge_uncached(paths), self._merge_uncached(paths))
+
+
+class EldCompactParsingTests(SimpleTestCase):
+    def test_string_false_is_false(self):
+        data = {"eld_compact": "false"}
+
+        self.assertIsNone(_normalize_eld_compact(data))
+        self.assertIs(data["eld_compact"], False)
+
+    def test_missing_value_keeps_the_default(self):
+        data = {}
+
+        self.assertIsNone(_normalize_eld_compact(data))
+        self.assertNotIn("eld_compact", data)
+
+    def test_invalid_value_is_rejected(self):
+        response = self.client.post(
+            reverse("calculate_trip"),
+            json.dumps({"pickup_location": "A", "dropoff_location": "B", "eld_compact": "maybe"}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
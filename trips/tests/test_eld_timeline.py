@@ -0,0 +1,101 @@
+from collections import defaultdict
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.test import SimpleTestCase
+
+from trips.utils import generate_eld
+from trips.utils.duty_scheduler import generate_duty_blocks
+from trips.utils.eld_timeline import (
+    ACTIVITIES,
+    build_day_timeline,
+    compute_daily_totals,
+    generate_eld_timelines,
+    iter_grid_slices,
+    plan_eld_sheets,
+    render_day_svg,
+)
+
+FULL_DAY = [
+    {"day": 1, "activity": "Off-duty (rest)", "hours": 7.25},
+    {"day": 1, "activity": "On-duty (pickup)", "hours": 1.0},
+    {"day": 1, "activity": "Driving", "hours": 11.0},
+    {"day": 1, "activity": "Sleeper berth", "hours": 4.75},
+]
+
+
+def hours_by_status(segments):
+    hours = defaultdict(float)
+    for segment in segments:
+        hours[segment["status"]] += segment["end"] - segment["start"]
+    return {status: round(hours[status], 4) for status in ACTIVITIES}
+
+
+class DayTimelineTests(SimpleTestCase):
+    def test_a_full_day_covers_24_hours_without_gaps(self):
+        segments = build_day_timeline(FULL_DAY)
+
+        self.assertEqual(segments[0]["start"], 0)
+        self.assertEqual(segments[-1]["end"], 24)
+        for previous, segment in zip(segments, segments[1:]):
+            self.assertEqual(previous["end"], segment["start"])
+        self.assertEqual(sum(hours_by_status(segments).values()), 24)
+
+    def test_per_status_hours_match_the_daily_totals(self):
+        segments = build_day_timeline(FULL_DAY)
+
+        self.assertEqual(hours_by_status(segments), compute_daily_totals(FULL_DAY))
+
+    def test_overlong_days_are_clipped_at_24_hours(self):
+        blocks = FULL_DAY + [{"day": 1, "activity": "Driving", "hours": 2.0}]
+
+        segments = build_day_timeline(blocks)
+
+        self.assertEqual(segments[-1]["end"], 24)
+        self.assertEqual(sum(hours_by_status(segments).values()), 24)
+
+    def test_segments_merge_the_grid_slices_the_raster_fills(self):
+        duty_blocks, _ = generate_duty_blocks(50, 1500, 10)
+        for day in {block["day"] for block in duty_blocks}:
+            blocks = [block for block in duty_blocks if block["day"] == day]
+            slices = defaultdict(float)
+            for _, status, _, hours in iter_grid_slices(blocks):
+                slices[status] += hours
+
+            self.assertEqual(
+                hours_by_status(build_day_timeline(blocks)),
+                {status: round(slices[status], 4) for status in ACTIVITIES},
+            )
+
+    def test_svg_draws_one_rect_per_segment(self):
+        segments = build_day_timeline(FULL_DAY)
+
+        svg = ElementTree.fromstring(render_day_svg(segments, 1, 2))
+
+        rects = svg.findall("{http://www.w3.org/2000/svg}rect")
+        self.assertEqual(len(rects), len(segments))
+        self.assertEqual(svg.find("{http://www.w3.org/2000/svg}title").text, "ELD day 1 of 2")
+
+
+class StructuredOutputTests(SimpleTestCase):
+    def test_totals_match_what_the_raster_sheet_prints(self):
+        duty_blocks, _ = generate_duty_blocks(50, 1500, 10)
+        sheets = plan_eld_sheets(duty_blocks, compact=True)
+        days = generate_eld_timelines(sheets, include_svg=True)
+
+        printed = []
+
+        def recording_totals(blocks):
+            totals = compute_daily_totals(blocks)
+            printed.append({act: round(hours, 2) for act, hours in totals.items()})
+            return totals
+
+        with mock.patch.object(generate_eld, "compute_daily_totals", recording_totals):
+            for sheet in sheets:
+                generate_eld.generate_eld_sheet(
+                    sheet["blocks"], sheet["day_number"], sheet["total_sheets"], sheet["info"], compact=True
+                )
+
+        self.assertEqual([day["totals"] for day in days], printed)
+        self.assertEqual([day["day"] for day in days], [sheet["day_number"] for sheet in sheets])
+        self.assertTrue(all(day["svg"].startswith("<svg") for day in days))
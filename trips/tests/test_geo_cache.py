@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from trips.utils import geo_cache
+from trips.utils.geo_cache import NEGATIVE, LRUTTLCache, TieredGeoCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class GeoCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(geo_cache.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class LRUTTLCacheTests(GeoCacheTestCase):
+    def test_entries_expire_after_their_ttl(self):
+        cache = LRUTTLCache(10)
+        cache.set("a", 1, ttl=60)
+
+        self.clock.now += 59
+        self.assertEqual(cache.get("a"), 1)
+        self.clock.now += 2
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUTTLCache(2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")  # now "b" is the oldest
+
+        cache.set("c", 3, ttl=60)
+
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+
+class TieredGeoCacheTests(GeoCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.l2 = LocMemCache("geo-test", {})
+        self.addCleanup(self.l2.clear)
+        patcher = mock.patch.object(TieredGeoCache, "l2", new_callable=mock.PropertyMock, return_value=self.l2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = TieredGeoCache("test_geo")
+        self.addCleanup(geo_cache._caches.pop, "test_geo", None)
+
+    def test_l1_miss_falls_through_to_l2_and_backfills_l1(self):
+        self.cache.set("geocode:waco", (31.5, -97.1), timeout=3600)
+        self.cache.clear_local()  # as seen from another process
+
+        self.assertEqual(self.cache.get("geocode:waco"), (31.5, -97.1))
+        self.assertEqual(self.cache.l1.get("geocode:waco"), (31.5, -97.1))
+
+        self.l2.clear()
+        self.assertEqual(self.cache.get("geocode:waco"), (31.5, -97.1))  # answered by L1 alone
+
+    def test_l1_ttl_is_capped_while_l2_holds_the_full_timeout(self):
+        self.cache.set("geocode:waco", (31.5, -97.1), timeout=3600)
+
+        self.clock.now += geo_cache.GEO_L1_TTL + 1
+        self.assertIsNone(self.cache.l1.get("geocode:waco"))
+        self.assertEqual(self.cache.get("geocode:waco"), (31.5, -97.1))
+
+    def test_large_values_are_compressed_in_l2(self):
+        geometry = [[-97.0 + n / 1000, 31.0] for n in range(500)]
+        self.cache.set("route:a", geometry, timeout=3600)
+
+        raw = self.l2.get("route:a")
+        self.cache.clear_local()
+
+        self.assertEqual(raw[:1], b"z")
+        self.assertEqual(self.cache.get("route:a"), geometry)
+
+    def test_negative_entries_expire_after_the_negative_ttl(self):
+        with mock.patch.object(TieredGeoCache, "l2", new_callable=mock.PropertyMock, return_value=None):
+            self.cache.set_negative("geocode:atlantis", timeout=600)
+
+            self.assertIs(self.cache.get("geocode:atlantis"), NEGATIVE)
+            self.clock.now += 601
+            self.assertIsNone(self.cache.get("geocode:atlantis"))
+
+    def test_negative_entries_are_shared_through_l2(self):
+        self.cache.set_negative("geocode:atlantis")
+        self.cache.clear_local()
+
+        self.assertIs(self.cache.get("geocode:atlantis"), NEGATIVE)
+
+    def test_l2_outage_degrades_to_a_miss(self):
+        self.l2.get_many = mock.Mock(side_effect=ConnectionError("redis down"))
+
+        self.assertEqual(self.cache.get_many(["geocode:waco"]), {})
+
+    def test_without_l2_the_l1_keeps_the_full_timeout(self):
+        with mock.patch.object(TieredGeoCache, "l2", new_callable=mock.PropertyMock, return_value=None):
+            self.cache.set("geocode:waco", (31.5, -97.1), timeout=3600)
+            self.clock.now += geo_cache.GEO_L1_TTL + 1
+
+            self.assertEqual(self.cache.get("geocode:waco"), (31.5, -97.1))
@@ -0,0 +1,25 @@
+import os
+
+from django.test import SimpleTestCase
+
+from benchmarks.import_budget import check, measure
+
+# Shared CI runners are noisy, so the budget can be raised without editing the test.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 800))
+RUNS = 3
+
+
+class ImportBudgetTests(SimpleTestCase):
+    """Cold start of a fresh interpreter, as in benchmarks/import_budget.py."""
+
+    def _check(self, broker_free):
+        runs = [measure(broker_free) for _ in range(RUNS)]
+        ready_ms, modules, _ = min(runs, key=lambda run: run[0])
+
+        self.assertEqual(check(ready_ms, modules, IMPORT_BUDGET_MS, broker_free), [])
+
+    def test_broker_free_startup_is_within_budget(self):
+        self._check(broker_free=True)
+
+    def test_startup_is_within_budget(self):
+        self._check(broker_free=False)
@@ -0,0 +1,51 @@
+import json
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .upstream import TRIP, fake_upstream
+
+
+class IncludeTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def _post(self, body, path=""):
+        return self.client.post(
+            reverse("calculate_trip") + path, json.dumps(body), content_type="application/json"
+        )
+
+    def test_only_requested_outputs_are_computed(self):
+        with fake_upstream() as upstream:
+            data = self._post({**TRIP, "include": ["stops"]}).json()
+
+        self.assertEqual(len(data["stops"]), 0)
+        self.assertNotIn("eld_files", data)
+        self.assertNotIn("geometry", data["trip_summary"])
+        upstream.daily_info.assert_not_called()
+        upstream.persist.assert_called_once()
+
+    def test_include_from_the_query_string(self):
+        with fake_upstream() as upstream:
+            data = self._post(TRIP, "?include=geometry").json()
+
+        self.assertIn("geometry", data["trip_summary"])
+        self.assertNotIn("stops", data)
+        upstream.stops.return_value.find_stops_along_route.assert_not_called()
+        upstream.daily_info.assert_not_called()
+
+    def test_omitting_include_returns_everything(self):
+        with fake_upstream() as upstream:
+            data = self._post({**TRIP, "eld_format": "json"}).json()
+
+        self.assertEqual(set(data), {"trip_summary", "duty_schedule", "stops", "eld_files", "message"})
+        upstream.daily_info.assert_called_once()
+
+    def test_unknown_option_is_rejected(self):
+        with fake_upstream() as upstream:
+            response = self._post({**TRIP, "include": "stops,weather"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("weather", response.json()["error"])
+        upstream.geocode.assert_not_called()
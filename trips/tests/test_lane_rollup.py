@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.test import TestCase
+
+from trips.models import LaneDailyStats, LaneStats, RollupWatermark, Trip
+from trips.utils.lane_rollup import LANE_ROLLUP, rollup_new_trips
+
+from .test_trip_history import make_trip
+
+DAY = 24 * 60
+
+
+def dallas_austin(minutes, **fields):
+    return make_trip(minutes, total_distance_km=300.0, total_trip_hours=5.0, current_cycle_used=10.0, **fields)
+
+
+class LaneRollupTests(TestCase):
+    def _lane(self, model=LaneStats, **key):
+        return model.objects.get(pickup_location="Dallas, TX", dropoff_location="Austin, TX", **key)
+
+    def test_new_trips_are_added_to_the_existing_rows(self):
+        dallas_austin(0, total_days=1)
+        rollup_new_trips()
+        dallas_austin(1, total_days=3)
+
+        result = rollup_new_trips()
+
+        self.assertEqual(result["processed"], 1)
+        averages = self._lane().averages()
+        self.assertEqual((averages["trip_count"], averages["avg_days"]), (2, 2.0))
+        self.assertEqual(averages["avg_distance_km"], 300.0)
+
+    def test_watermark_advances_and_reruns_change_nothing(self):
+        trips = [dallas_austin(minutes, total_days=1) for minutes in range(5)]
+
+        self.assertEqual(rollup_new_trips(batch_size=2)["batches"], 3)
+        self.assertEqual(RollupWatermark.objects.get(name=LANE_ROLLUP).last_trip_id, trips[-1].id)
+
+        self.assertEqual(rollup_new_trips(), {"processed": 0, "batches": 0})
+        self.assertEqual(self._lane().trip_count, 5)
+
+    def test_trips_still_settling_wait_for_the_next_run(self):
+        dallas_austin(0, total_days=1)
+        Trip.objects.create(pickup_location="Dallas, TX", dropoff_location="Austin, TX")
+
+        self.assertEqual(rollup_new_trips()["processed"], 1)
+
+    def test_daily_rows_split_what_the_lifetime_row_sums(self):
+        dallas_austin(0, total_days=1)
+        dallas_austin(10, total_days=2)
+        dallas_austin(2 * DAY, total_days=4)
+
+        rollup_new_trips()
+
+        self.assertEqual(self._lane().trip_count, 3)
+        self.assertEqual(self._lane(LaneDailyStats, date=date(2026, 1, 1)).trip_count, 2)
+        self.assertEqual(self._lane(LaneDailyStats, date=date(2026, 1, 3)).trip_count, 1)
+        self.assertEqual(LaneDailyStats.objects.count(), 2)
+
+    def test_trips_without_total_days_do_not_lower_avg_days(self):
+        dallas_austin(0, total_days=None)
+        dallas_austin(1, total_days=4)
+
+        rollup_new_trips()
+
+        averages = self._lane().averages()
+        self.assertEqual((averages["trip_count"], averages["avg_days"]), (2, 4.0))
+        self.assertEqual(averages["avg_trip_hours"], 5.0)
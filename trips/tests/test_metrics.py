@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from trips.utils.metrics import Counter, Histogram, Registry
+
+try:
+    import prometheus_client
+except ImportError:  # multiprocess mode is optional
+    prometheus_client = None
+
+WORKER = """
+from trips.utils.metrics import admission_rejections, stage_duration
+admission_rejections.inc(stage="eld")
+stage_duration.observe(0.2, stage="route")
+"""
+SCRAPE = "from trips.utils.metrics import registry; print(registry.render())"
+
+
+class RegistryTests(SimpleTestCase):
+    def test_renders_counters_and_histograms(self):
+        registry = Registry()
+        requests = registry.register(Counter("t_requests_total", "Requests."))
+        latency = registry.register(Histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1)))
+        requests.inc(2, cache="geo")
+        latency.observe(0.5)
+
+        text = registry.render()
+
+        self.assertIn('t_requests_total{cache="geo"} 2', text)
+        self.assertIn('t_latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('t_latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn("t_latency_seconds_count 1", text)
+
+
+@unittest.skipIf(prometheus_client is None, "prometheus_client is not installed")
+class MultiprocessMetricsTests(SimpleTestCase):
+    """Each worker is a separate interpreter, as under gunicorn."""
+
+    def _run(self, code, directory):
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+        return subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    def test_scrape_sums_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self._run(WORKER, directory)
+            self._run(WORKER, directory)
+
+            text = self._run(SCRAPE, directory)
+
+        self.assertIn('trip_admission_rejections_total{stage="eld"} 2.0', text)
+        self.assertIn('trip_stage_duration_seconds_count{stage="route"} 2.0', text)
+        self.assertIn('trip_stage_duration_seconds_bucket{le="0.25",stage="route"} 2.0', text)
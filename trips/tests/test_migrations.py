@@ -0,0 +1,44 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [("trips", "0002_alter_logsheet_options_alter_logsheet_created_at_and_more")]
+AFTER = [("trips", "0004_trip_history_indexes")]
+
+
+class RouteBackfillMigrationTests(TransactionTestCase):
+    """Runs on whatever DATABASE_URL points at; on PostgreSQL this covers the deferred FK."""
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self._migrate(executor.loader.graph.leaf_nodes("trips"))
+
+    def test_existing_trips_are_moved_onto_routes(self):
+        apps = self._migrate(BEFORE)
+        Trip = apps.get_model("trips", "Trip")
+        geometry = [[-96.797, 32.7767], [-97.7431, 30.2672]]
+        for _ in range(2):
+            Trip.objects.create(
+                pickup_location="Waco, TX",
+                dropoff_location="Austin, TX",
+                current_location_coords="32.7767,-96.797",
+                pickup_coords="31.5493,-97.1467",
+                dropoff_coords="30.2672,-97.7431",
+                route_geojson={"geometry": geometry},
+            )
+        Trip.objects.create(pickup_location="Waco, TX", dropoff_location="Austin, TX")
+
+        apps = self._migrate(AFTER)
+
+        Route = apps.get_model("trips", "Route")
+        Trip = apps.get_model("trips", "Trip")
+        route = Route.objects.get()
+        self.assertEqual(route.point_count, 2)
+        self.assertEqual(Trip.objects.filter(route=route).count(), 2)
+        self.assertEqual(Trip.objects.filter(route=None).count(), 1)
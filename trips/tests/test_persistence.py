@@ -0,0 +1,161 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from trips.models import LogSheet, Route, Trip
+from trips.utils import persistence, trip_buffer
+from trips.utils.persistence import DeferredTripWriter
+from trips.utils.pipeline import Stage, prune_stages
+
+from .test_route_store import persist_stage, stage_inputs, trip_stages
+
+PILLOW_FREE_PERSIST = """
+import sys
+from unittest import mock
+import django
+django.setup()
+from trips.tests.test_route_store import persist_stage, stage_inputs
+with mock.patch("trips.views.persist_trip"):
+    persist_stage().func(stage_inputs())
+print("PIL" in sys.modules)
+"""
+
+
+def record():
+    with mock.patch("trips.views.persist_trip"):
+        return persist_stage().func(stage_inputs())
+
+
+class DirectPersistenceTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    @mock.patch.object(persistence, "TRIP_PERSISTENCE", "direct")
+    def test_direct_mode_writes_trip_route_and_log_sheets(self):
+        trip_record = record()
+
+        persistence.persist_trip(trip_record)
+
+        trip = Trip.objects.get()
+        self.assertEqual(trip.status, "processed")
+        self.assertEqual(trip.route, Route.objects.get())
+        self.assertEqual(LogSheet.objects.filter(trip=trip).count(), len(trip_record["log_sheets"]))
+
+    @mock.patch.object(persistence, "TRIP_PERSISTENCE", "buffer")
+    def test_buffer_mode_writes_directly_when_redis_is_down(self):
+        from redis import RedisError
+
+        client = mock.Mock()
+        client.rpush.side_effect = RedisError("connection refused")
+        with mock.patch.object(trip_buffer, "get_client", return_value=client):
+            persistence.persist_trip(record())
+
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_database_stages_recycle_their_connection(self):
+        stage = Stage("persist", lambda inputs: "saved", executor="io", db=True)
+
+        with mock.patch("django.db.close_old_connections") as close_old_connections:
+            self.assertEqual(asyncio.run(stage.run({})), "saved")
+
+        self.assertEqual(close_old_connections.call_count, 2)
+
+
+class DeferredPersistenceTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def _wait_for(self, count):
+        for _ in range(200):
+            if Trip.objects.count() >= count:
+                return
+            time.sleep(0.025)
+
+    def test_background_writer_bulk_writes_queued_trips(self):
+        writer = DeferredTripWriter(interval=0.05, batch_size=10)
+        with mock.patch.object(persistence, "TRIP_PERSISTENCE", "deferred"), mock.patch.object(
+            persistence, "_deferred_writer", writer
+        ):
+            persistence.persist_trip(record())
+            persistence.persist_trip(record())
+            self._wait_for(2)
+
+        self.assertEqual(Trip.objects.count(), 2)
+        self.assertEqual(Route.objects.count(), 1)
+
+    def test_flush_writes_what_is_still_queued(self):
+        writer = DeferredTripWriter(interval=60, batch_size=10)
+        writer._queue.put(record())
+
+        writer.flush()
+
+        self.assertEqual(Trip.objects.count(), 1)
+
+
+class DailyInfoDependencyTests(SimpleTestCase):
+    def test_persist_without_eld_skips_reverse_geocoding(self):
+        stages = trip_stages(include=["stops"])
+        inputs = stage_inputs()
+        del inputs["daily_info"]
+
+        names = {stage.name for stage in prune_stages(stages.values(), ["schedule", "persist"])}
+        with mock.patch("trips.views.persist_trip"):
+            trip_record = stages["persist"].func(inputs)
+
+        self.assertNotIn("daily_info", names)
+        miles = sum(sheet["daily_info"]["total_miles_today"] for sheet in trip_record["log_sheets"])
+        self.assertAlmostEqual(miles, 290.0 * 0.621371, delta=len(trip_record["log_sheets"]))
+
+    def test_persist_reuses_remarks_when_eld_is_rendered(self):
+        self.assertIn("daily_info", trip_stages()["persist"].requires)
+
+    def test_structured_eld_carries_daily_info(self):
+        inputs = stage_inputs()
+        inputs["daily_info"] = {1: {"total_miles_today": 120, "remarks": "00:00 ON Dallas, TX"}}
+
+        for eld_format in ("json", "svg"):
+            with self.subTest(eld_format=eld_format):
+                stage = trip_stages(eld_format=eld_format)["eld"]
+                first_day = stage.func(inputs)["days"][0]
+
+                self.assertIn("daily_info", stage.requires)
+                self.assertEqual(first_day["total_miles_today"], 120)
+                self.assertEqual(first_day["remarks"], "00:00 ON Dallas, TX")
+
+
+class PersistenceModeTests(SimpleTestCase):
+    def _mode(self, **env):
+        env = {k: v for k, v in os.environ.items() if k not in ("CELERY_BROKER_URL", "TRIP_BUFFER_URL")} | env
+        return subprocess.run(
+            [sys.executable, "-c", "from trips.utils.persistence import TRIP_PERSISTENCE; print(TRIP_PERSISTENCE)"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    def test_buffers_only_when_a_broker_is_configured(self):
+        self.assertEqual(self._mode(), "direct")
+        self.assertEqual(self._mode(CELERY_BROKER_URL="redis://redis:6379/0"), "buffer")
+        self.assertEqual(self._mode(CELERY_BROKER_URL="redis://redis:6379/0", TRIP_BROKER_FREE="true"), "direct")
+
+
+class PersistImportTests(SimpleTestCase):
+    def test_persist_stage_does_not_load_pillow(self):
+        output = subprocess.run(
+            [sys.executable, "-c", PILLOW_FREE_PERSIST],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        self.assertEqual(output.strip().splitlines()[-1], "False")
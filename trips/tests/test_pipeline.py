@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from trips.utils.pipeline import Stage, StageError, StageTimeout, prune_stages, run_stages
+
+
+def collect(stages, initial=None):
+    async def run():
+        return [item async for item in run_stages(stages, initial)]
+
+    return asyncio.run(run())
+
+
+class RunStagesTests(SimpleTestCase):
+    def test_results_flow_along_dependencies(self):
+        stages = [
+            Stage("total", lambda inputs: inputs["a"] + inputs["b"], requires=["a", "b"]),
+            Stage("a", lambda inputs: 1),
+            Stage("b", lambda inputs: inputs["seed"] * 2, requires=["seed"]),
+        ]
+
+        results = collect(stages, {"seed": 5})
+
+        self.assertEqual(dict(results), {"a": 1, "b": 10, "total": 11})
+        self.assertEqual(results[-1][0], "total")
+
+    def test_independent_stages_overlap(self):
+        # Each stage waits for the other to have started, which only works if they run together.
+        async def run():
+            started = {"left": asyncio.Event(), "right": asyncio.Event()}
+
+            def waiting_for(name, other):
+                async def stage(_):
+                    started[name].set()
+                    await asyncio.wait_for(started[other].wait(), 1)
+                    return name
+
+                return stage
+
+            stages = [Stage("left", waiting_for("left", "right")), Stage("right", waiting_for("right", "left"))]
+            return [result async for _, result in run_stages(stages)]
+
+        self.assertCountEqual(asyncio.run(run()), ["left", "right"])
+
+    def test_pool_stages_overlap(self):
+        barrier = threading.Barrier(2, timeout=1)
+        stages = [Stage(name, lambda _: barrier.wait(), executor="io") for name in ("left", "right")]
+
+        self.assertEqual(len(collect(stages)), 2)
+
+    def test_timeout_surfaces_as_an_error(self):
+        async def hang(_):
+            await asyncio.sleep(30)
+
+        started = time.perf_counter()
+        with self.assertRaises(StageTimeout) as raised:
+            collect([Stage("route", hang, timeout=0.05)])
+
+        self.assertEqual(raised.exception.stage, "route")
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_failure_cancels_running_stages_and_skips_dependents(self):
+        cancelled, ran = [], []
+
+        async def slow(_):
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def fail(_):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("geocoder down")
+
+        stages = [
+            Stage("geocode", fail),
+            Stage("slow", slow),
+            Stage("route", lambda inputs: ran.append("route"), requires=["geocode"]),
+        ]
+        with self.assertRaises(StageError) as raised:
+            collect(stages)
+
+        self.assertEqual(raised.exception.stage, "geocode")
+        self.assertIsInstance(raised.exception.error, RuntimeError)
+        self.assertEqual((cancelled, ran), (["slow"], []))
+
+    def test_unknown_dependency_is_rejected(self):
+        with self.assertRaises(ValueError):
+            collect([Stage("route", lambda _: None, requires=["geocode"])])
+
+    def test_db_stages_go_through_run_with_db(self):
+        def run_with_db(func, *args):
+            return ("recycled", func(*args))
+
+        stages = [
+            Stage("persist", lambda _: "saved", executor="io", db=True),
+            Stage("stops", lambda _: "found", executor="io"),
+        ]
+        with mock.patch("trips.utils.pipeline.run_with_db", side_effect=run_with_db) as wrapper:
+            results = dict(collect(stages))
+
+        self.assertEqual(results, {"persist": ("recycled", "saved"), "stops": "found"})
+        wrapper.assert_called_once()
+
+    def test_db_stages_cannot_run_on_the_loop(self):
+        with self.assertRaises(ValueError):
+            Stage("persist", lambda _: None, db=True)
+
+
+class PruneStagesTests(SimpleTestCase):
+    def test_keeps_targets_and_their_dependencies(self):
+        stages = [
+            Stage("geocode", None),
+            Stage("route", None, requires=["geocode"]),
+            Stage("stops", None, requires=["geocode"]),
+            Stage("eld", None, requires=["route"]),
+        ]
+
+        kept = [stage.name for stage in prune_stages(stages, ["eld"])]
+
+        self.assertEqual(kept, ["geocode", "route", "eld"])
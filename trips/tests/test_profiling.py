@@ -0,0 +1,73 @@
+import asyncio
+import tempfile
+import time
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from trips.utils import profiling
+from trips.utils.pipeline import Stage
+
+
+class StartProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, value in (("PROFILING_ENABLED", True), ("PROFILING_TOKEN", None), ("PROFILE_DIR", self.tmp.name)):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _profile(self, **headers):
+        request = RequestFactory().post("/api/trip/calculate/", HTTP_X_TRIP_PROFILE="1", **headers)
+        profile = profiling.start_profile(request)
+        profile.stop(200)
+        return profile
+
+    def test_profile_id_ignores_the_client_request_id(self):
+        first = self._profile(HTTP_X_REQUEST_ID="fixed-id")
+        second = self._profile(HTTP_X_REQUEST_ID="fixed-id")
+
+        self.assertNotEqual(first.profile_id, "fixed-id")
+        self.assertNotEqual(first.profile_id, second.profile_id)
+        self.assertEqual(first.meta["request_id"], "fixed-id")
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+    def test_malformed_request_id_is_not_recorded(self):
+        profile = self._profile(HTTP_X_REQUEST_ID="../../etc/passwd")
+
+        self.assertNotIn("request_id", profile.meta)
+        self.assertIsNotNone(profiling.profile_path(profile.profile_id))
+
+
+class EventLoopProfileTests(StartProfileTests):
+    def _busy(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def test_only_tagged_pool_threads_are_sampled_on_an_event_loop(self):
+        request = RequestFactory().post("/api/trip/calculate/", HTTP_X_TRIP_PROFILE="1")
+
+        async def handle():
+            profile = profiling.start_profile(request)
+            await Stage("eld", lambda _: self._busy(0.1), executor="cpu").run({})
+            self._busy(0.05)  # another request's work on the shared loop
+            return profile
+
+        profile = asyncio.run(handle())
+        profile.stop(200)
+
+        self.assertFalse(profile.meta["event_loop_sampled"])
+        self.assertTrue(profile.samples)
+        self.assertTrue(all(stack.startswith("eld;") for stack in profile.samples))
+
+    def test_finish_saves_in_the_background(self):
+        request = RequestFactory().post("/api/trip/calculate/", HTTP_X_TRIP_PROFILE="1")
+        profile = profiling.start_profile(request)
+
+        profile.finish(200)
+        profile._sampler.join(5)
+
+        self.assertEqual(profile.path, profiling.profile_path(profile.profile_id))
+        self.assertEqual(profiling.list_profiles()[0]["status"], 200)
@@ -0,0 +1,71 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from trips.utils import result_cache
+
+from .upstream import TRIP, fake_upstream
+
+BODY = {**TRIP, "include": "eld", "eld_format": "json"}
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        upstream = fake_upstream()
+        self.upstream = upstream.__enter__()
+        self.addCleanup(upstream.__exit__, None, None, None)
+
+    def _post(self, body=BODY, **headers):
+        return self.client.post(reverse("calculate_trip"), json.dumps(body), content_type="application/json", **headers)
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self._post()
+        geocode_calls = self.upstream.geocode.call_count
+
+        second = self._post({**BODY, "pickup_location": "  Waco,   TX "})
+
+        self.assertEqual((first["X-Trip-Cache"], second["X-Trip-Cache"]), ("miss", "hit"))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(self.upstream.geocode.call_count, geocode_calls)
+
+    def test_outputs_that_change_the_body_miss(self):
+        self._post()
+
+        self.assertEqual(self._post({**BODY, "eld_format": "svg"})["X-Trip-Cache"], "miss")
+        self.assertEqual(self._post({**BODY, "include": "stops"})["X-Trip-Cache"], "miss")
+
+    def test_if_none_match_returns_304(self):
+        etag = self._post()["ETag"]
+
+        response = self._post(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_hits_still_log_the_trip(self):
+        self._post()
+        record = self.upstream.persist.call_args.args[0]
+        self.upstream.persist.reset_mock()
+
+        self._post()
+        self.upstream.persist.assert_called_once_with(record)
+
+        self.upstream.persist.reset_mock()
+        with mock.patch("trips.views.RESULT_CACHE_LOG_HITS", False):
+            self._post()
+        self.upstream.persist.assert_not_called()
+
+    def test_a_new_day_is_a_new_response(self):
+        first = self._post()
+        self.assertEqual(json.loads(first.content)["eld_files"]["days"][0]["date"], result_cache.log_date())
+
+        with mock.patch("trips.utils.result_cache.log_date", return_value="01/02/2099"):
+            second = self._post()
+
+        self.assertEqual(second["X-Trip-Cache"], "miss")
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from trips.utils import route_matrix
+from trips.utils.route import matrix_cache
+
+ORIGINS = [(32.0 + n, -97.0) for n in range(5)]
+DESTINATIONS = [(30.0, -95.0 - n) for n in range(3)]
+
+
+def distance(origin, destination):
+    return round(abs(origin[0] - destination[0]) * 100 + abs(origin[1] - destination[1]) * 100, 3)
+
+
+class FakeMatrix:
+    """Answers _matrix_sync like ORS would, recording the points of every call."""
+
+    def __init__(self, chunk_size, unroutable=()):
+        self.chunk_size = chunk_size
+        self.unroutable = set(unroutable)
+        self.calls = []
+
+    def __call__(self, locations, sources, destinations):
+        assert len(sources) <= self.chunk_size and len(destinations) <= self.chunk_size
+        self.calls.append(([locations[i] for i in sources], [locations[j] for j in destinations]))
+        distances = [
+            [None if (locations[i], locations[j]) in self.unroutable else distance(locations[i], locations[j])
+             for j in destinations]
+            for i in sources
+        ]
+        durations = [[None if d is None else d * 36 for d in row] for row in distances]
+        return distances, durations
+
+
+class MatrixTests(SimpleTestCase):
+    def setUp(self):
+        matrix_cache.clear_local()
+        self.addCleanup(matrix_cache.clear_local)
+        self.upstream = FakeMatrix(chunk_size=2)
+        for patcher in (
+            mock.patch.object(route_matrix, "MATRIX_CHUNK_SIZE", 2),
+            mock.patch.object(route_matrix, "_matrix_sync", self.upstream),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _matrix(self, origins=ORIGINS, destinations=DESTINATIONS):
+        return asyncio.run(route_matrix.matrix_with_cache(origins, destinations))
+
+    def test_chunks_are_stitched_into_the_full_matrix(self):
+        result = self._matrix()
+
+        self.assertEqual(len(self.upstream.calls), 3 * 2)  # rows in 2+2+1, columns in 2+1
+        self.assertEqual(result["distances_km"], [[distance(o, d) for d in DESTINATIONS] for o in ORIGINS])
+        self.assertAlmostEqual(result["durations_hr"][4][2], distance(ORIGINS[4], DESTINATIONS[2]) / 100)
+        self.assertEqual((result["cells"], result["cached"], result["upstream_calls"]), (15, 0, 6))
+
+    def test_known_cells_are_not_fetched_again(self):
+        self._matrix(ORIGINS[:3])
+        self.upstream.calls.clear()
+
+        result = self._matrix()
+
+        fetched_origins = {point for sources, _ in self.upstream.calls for point in sources}
+        self.assertEqual(fetched_origins, set(ORIGINS[3:]))
+        self.assertEqual((result["cached"], result["upstream_calls"]), (9, 2))
+        self.assertEqual(result["distances_km"][0][0], distance(ORIGINS[0], DESTINATIONS[0]))
+
+        self.upstream.calls.clear()
+        self.assertEqual(self._matrix()["upstream_calls"], 0)
+        self.assertEqual(self.upstream.calls, [])
+
+    def test_repeated_points_are_fetched_once(self):
+        result = self._matrix([ORIGINS[0]] * 3, [DESTINATIONS[0], DESTINATIONS[0]])
+
+        self.assertEqual((result["cells"], result["upstream_calls"]), (1, 1))
+        self.assertEqual(len(result["distances_km"]), 3)
+        self.assertEqual(len(result["distances_km"][0]), 2)
+
+    def test_unroutable_pairs_are_none(self):
+        self.upstream.unroutable = {(ORIGINS[0], DESTINATIONS[1])}
+
+        result = self._matrix(ORIGINS[:1], DESTINATIONS[:2])
+
+        self.assertEqual(result["distances_km"][0][1], None)
+        self.assertEqual(result["durations_hr"][0][1], None)
+        self.assertIsNotNone(result["distances_km"][0][0])
+
+    def test_view_keeps_unresolved_places_in_the_grid(self):
+        async def geocode(name):
+            raise ValueError(f"No results for {name}")
+
+        body = {
+            "origins": [{"id": "truck-1", "coords": ORIGINS[0]}, {"id": "truck-2", "location": "Atlantis"}],
+            "destinations": [{"id": "load-1", "coords": DESTINATIONS[0]}],
+            "arrival": True,
+        }
+        with mock.patch("trips.matrix_views.geocode_place_cached", side_effect=geocode):
+            response = self.client.post(reverse("route_matrix"), json.dumps(body), content_type="application/json")
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["distances_km"], [[distance(ORIGINS[0], DESTINATIONS[0])], [None]])
+        self.assertIn("error", data["origins"][1])
+        self.assertEqual(data["arrival"][0][0]["day"], 1)
+        self.assertIsNone(data["arrival"][1][0])
+
+    def test_view_rejects_bad_points(self):
+        for body in ({"origins": [], "destinations": ["Austin, TX"]}, {"origins": [{"coords": "x"}], "destinations": ["A"]}):
+            with self.subTest(body=body):
+                response = self.client.post(reverse("route_matrix"), json.dumps(body), content_type="application/json")
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,60 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from trips.models import Trip
+from trips.utils.route_index import routes_nearby
+from trips.utils.route_store import store_route
+
+from .test_route_store import AUSTIN, DALLAS, WACO
+
+NEAR_WACO = (31.56, -97.13)
+HOUSTON = (29.7604, -95.3698)
+
+
+def store_lane(*waypoints):
+    return store_route(waypoints, [[lon, lat] for lat, lon in waypoints], distance_km=290.0)
+
+
+class NearbyRoutesTests(TestCase):
+    def setUp(self):
+        self.southbound = store_lane(DALLAS, WACO, AUSTIN)
+        self.northbound = store_lane(AUSTIN, WACO, DALLAS)
+        Trip.objects.create(pickup_location="Waco, TX", dropoff_location="Austin, TX", route_id=self.southbound)
+        self.url = reverse("nearby_routes")
+
+    def test_routes_through_the_point_nearest_first(self):
+        routes = routes_nearby(*NEAR_WACO, radius_km=10)
+
+        self.assertEqual({r["route_id"] for r in routes}, {self.southbound, self.northbound})
+        self.assertLessEqual(routes[0]["distance_from_point_km"], routes[1]["distance_from_point_km"])
+        southbound = next(r for r in routes if r["route_id"] == self.southbound)
+        self.assertEqual((southbound["trip_count"], southbound["dropoff_location"]), (1, "Austin, TX"))
+
+    def test_radius_excludes_far_routes(self):
+        self.assertEqual(routes_nearby(*HOUSTON, radius_km=25), [])
+
+    def test_toward_keeps_routes_that_make_progress(self):
+        routes = routes_nearby(*NEAR_WACO, radius_km=10, toward=AUSTIN)
+
+        self.assertEqual([r["route_id"] for r in routes], [self.southbound])
+        self.assertGreater(routes[0]["progress_toward_km"], 0)
+
+    def test_view(self):
+        params = {"lat": NEAR_WACO[0], "lon": NEAR_WACO[1], "radius_km": 10}
+
+        response = self.client.get(self.url, {**params, "toward_lat": AUSTIN[0], "toward_lon": AUSTIN[1]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["route_id"] for r in response.json()["routes"]], [self.southbound])
+        self.assertEqual(self.client.get(self.url, params).json()["count"], 2)
+
+    def test_bad_params_are_rejected(self):
+        for params in (
+            {},
+            {"lat": "north", "lon": -97.1},
+            {"lat": 31.5, "lon": -97.1, "radius_km": 0},
+            {"lat": 31.5, "lon": -97.1, "radius_km": 10_000},
+            {"lat": 31.5, "lon": -97.1, "limit": "all"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from trips.models import Route, RouteCell, Trip
+from trips.utils import route_store
+from trips.utils.duty_scheduler import generate_duty_blocks
+from trips.utils.trip_buffer import write_trips
+from trips.views import INCLUDE_OPTIONS, _build_trip_stages
+
+DALLAS, WACO, AUSTIN = (32.7767, -96.797), (31.5493, -97.1467), (30.2672, -97.7431)
+GEOMETRY = [[lon, lat] for lat, lon in (DALLAS, WACO, AUSTIN)]
+
+
+def stage_inputs():
+    """Upstream results for the persist stage of a Dallas -> Waco -> Austin trip."""
+    blocks, _ = generate_duty_blocks(60, 110, 10)
+    return {
+        "geocode": {"current": DALLAS, "pickup": WACO, "dropoff": AUSTIN},
+        "route": {"geometry": GEOMETRY, "total_distance_km": 290.0, "duration_hr": 3.1},
+        "schedule": {"blocks": blocks},
+        "daily_info": {},
+    }
+
+
+def trip_stages(include=INCLUDE_OPTIONS, **data):
+    request = RequestFactory().post("/api/trip/calculate/")
+    data = {"pickup_location": "Waco, TX", "dropoff_location": "Austin, TX", "current_location": "Dallas, TX", **data}
+    return {stage.name: stage for stage in _build_trip_stages(request, data, set(include))}
+
+
+def persist_stage(**data):
+    return trip_stages(**data)["persist"]
+
+
+class RouteStorageTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def test_persist_stage_does_not_touch_the_database(self):
+        with mock.patch("trips.views.persist_trip") as persist_trip, self.assertNumQueries(0):
+            record = persist_stage().func(stage_inputs())
+
+        persist_trip.assert_called_once_with(record)
+        self.assertNotIn("route_id", record)
+        self.assertEqual(record["route_row"]["point_count"], 3)
+
+    def test_known_lanes_ship_only_their_route_id(self):
+        with mock.patch("trips.views.persist_trip"):
+            first = persist_stage().func(stage_inputs())
+        with self.captureOnCommitCallbacks(execute=True):
+            write_trips([first])
+
+        with mock.patch("trips.views.persist_trip"), self.assertNumQueries(0):
+            second = persist_stage().func(stage_inputs())
+
+        self.assertNotIn("route_row", second)
+        self.assertEqual(second["route_id"], Route.objects.get().id)
+        write_trips([second])
+        self.assertEqual(Trip.objects.filter(route_id=second["route_id"]).count(), 2)
+
+    def test_writer_stores_each_lane_once_and_links_its_trips(self):
+        with mock.patch("trips.views.persist_trip"):
+            first = persist_stage().func(stage_inputs())
+            second = persist_stage().func(stage_inputs())
+
+        write_trips([first])
+        cache.clear()  # the second write must find the row, not just the cached id
+        write_trips([second])
+
+        route = Route.objects.get()
+        self.assertEqual(route.geometry, GEOMETRY)
+        self.assertEqual(list(Trip.objects.values_list("route_id", flat=True)), [route.id, route.id])
+        self.assertTrue(RouteCell.objects.filter(route=route).exists())
+
+    def test_route_and_its_cells_are_stored_together(self):
+        row = route_store.route_row((DALLAS, WACO, AUSTIN), GEOMETRY)
+
+        with mock.patch.object(route_store, "index_route", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                route_store.save_route(row)
+        self.assertFalse(Route.objects.exists())
+        self.assertIsNone(cache.get(f"route_id:{row['lane_key']}"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            route_id = route_store.save_route(row)
+
+        self.assertTrue(RouteCell.objects.filter(route_id=route_id).exists())
+        self.assertEqual(cache.get(f"route_id:{row['lane_key']}"), route_id)
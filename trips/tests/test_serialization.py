@@ -0,0 +1,118 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+
+from trips.utils import serialization
+from trips.utils.serialization import JSON, MSGPACK, compress_response, negotiate_media_type
+
+from .upstream import TRIP, fake_upstream
+
+LARGE = json.dumps({"blocks": [{"day": n, "activity": "driving", "hours": 1.0} for n in range(200)]}).encode()
+
+
+def request(**headers):
+    return RequestFactory().get("/", headers=headers)
+
+
+class MediaTypeTests(SimpleTestCase):
+    @unittest.skipIf(serialization.msgpack is None, "msgpack is not installed")
+    def test_accept_selects_msgpack_or_json(self):
+        cases = {
+            "": JSON,
+            "application/json": JSON,
+            "application/msgpack": MSGPACK,
+            "application/x-msgpack, application/json;q=0.5": MSGPACK,
+            "application/json, application/msgpack;q=0.5": JSON,
+            "application/msgpack;q=0": JSON,
+        }
+        for accept, expected in cases.items():
+            with self.subTest(accept=accept):
+                self.assertEqual(negotiate_media_type(request(Accept=accept)), expected)
+
+    def test_json_without_msgpack_installed(self):
+        with mock.patch.object(serialization, "msgpack", None):
+            self.assertEqual(negotiate_media_type(request(Accept="application/msgpack")), JSON)
+
+
+class CompressionTests(SimpleTestCase):
+    def _compress(self, body=LARGE, etag='"abc"', **headers):
+        response = HttpResponse(body, content_type=JSON)
+        response["ETag"] = etag
+        return compress_response(request(**headers), response)
+
+    def test_gzip(self):
+        response = self._compress(**{"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), LARGE)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    @unittest.skipIf(serialization.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self._compress(**{"Accept-Encoding": "gzip, br"})
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(serialization.brotli.decompress(response.content), LARGE)
+
+    def test_refused_encodings_are_not_used(self):
+        response = self._compress(**{"Accept-Encoding": "br;q=0, gzip;q=0"})
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_etag_is_weakened_after_compression(self):
+        self.assertEqual(self._compress(**{"Accept-Encoding": "gzip"})["ETag"], 'W/"abc"')
+        self.assertEqual(self._compress()["ETag"], '"abc"')
+
+    def test_small_bodies_stay_uncompressed_but_vary(self):
+        response = self._compress(b"{}", **{"Accept-Encoding": "gzip"})
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+
+class NegotiatedTripResponseTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def _post(self, **headers):
+        with fake_upstream():
+            return self.client.post(
+                reverse("calculate_trip"),
+                json.dumps({**TRIP, "include": "geometry"}),
+                content_type="application/json",
+                headers=headers,
+            )
+
+    @unittest.skipIf(serialization.msgpack is None, "msgpack is not installed")
+    def test_msgpack_response_packs_geometry(self):
+        response = self._post(Accept="application/msgpack")
+
+        self.assertEqual(response["Content-Type"], MSGPACK)
+        body = serialization.msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(body["trip_summary"]["geometry"]["encoding"], "float32le-lonlat")
+        self.assertIn("Accept", response["Vary"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_json_and_msgpack_are_cached_apart(self):
+        as_json = self._post()
+        self.assertEqual(as_json["Content-Type"], JSON)
+        self.assertEqual(self._post()["X-Trip-Cache"], "hit")
+
+        if serialization.msgpack is not None:
+            self.assertEqual(self._post(Accept="application/msgpack")["X-Trip-Cache"], "miss")
+
+    @mock.patch.object(serialization, "COMPRESS_MIN_BYTES", 0)
+    def test_compressed_response_revalidates_with_its_weak_etag(self):
+        response = self._post(**{"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        again = self._post(**{"Accept-Encoding": "gzip", "If-None-Match": response["ETag"]})
+
+        self.assertEqual(again.status_code, 304)
@@ -0,0 +1,46 @@
+import json
+
+from django.test import AsyncClient, SimpleTestCase
+from django.urls import reverse
+
+from .upstream import TRIP, fake_upstream
+
+
+class StreamedTripTests(SimpleTestCase):
+    async def _lines(self, body, headers=None):
+        response = await AsyncClient().post(
+            reverse("calculate_trip"), json.dumps(body), content_type="application/json", headers=headers
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        chunks = [chunk async for chunk in response.streaming_content]
+        text = b"".join(chunks).decode("utf-8")
+        self.assertTrue(text.endswith("\n"))
+        # One JSON object per line, each sent as its own chunk.
+        lines = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(len(lines), len(chunks))
+        return lines
+
+    async def test_one_line_per_section_in_pipeline_order(self):
+        with fake_upstream():
+            lines = await self._lines({**TRIP, "stream": True, "eld_format": "json"})
+
+        sections = [line["section"] for line in lines]
+        self.assertEqual(sections[:3], ["coordinates", "route", "duty_schedule"])
+        self.assertCountEqual(sections[3:-1], ["stops", "eld_files"])
+        self.assertEqual(sections[-1], "done")
+        self.assertEqual(lines[0]["data"]["pickup"], [31.5493, -97.1467])
+
+    async def test_accept_header_selects_streaming(self):
+        with fake_upstream():
+            lines = await self._lines({**TRIP, "include": "geometry"}, {"Accept": "application/x-ndjson"})
+
+        self.assertEqual([line["section"] for line in lines], ["coordinates", "route", "duty_schedule", "done"])
+
+    async def test_failing_stage_ends_the_stream_with_an_error_line(self):
+        with fake_upstream() as upstream:
+            upstream.stops.return_value.find_stops_along_route.side_effect = RuntimeError("stops API down")
+            lines = await self._lines({**TRIP, "stream": True, "include": "stops"})
+
+        self.assertEqual([line["section"] for line in lines[:3]], ["coordinates", "route", "duty_schedule"])
+        self.assertEqual(lines[-1], {"section": "error", "error": "stops API down"})
+        self.assertNotIn("done", [line["section"] for line in lines])
@@ -0,0 +1,110 @@
+import json
+import unittest
+from unittest import mock
+
+from django.test import TestCase
+
+from trips.models import LogSheet, Trip
+from trips.utils import trip_buffer
+
+try:
+    import fakeredis
+except ImportError:  # the buffer tests need a Redis stand-in
+    fakeredis = None
+
+
+def trip_record(pickup="Dallas, TX", **extra):
+    return {
+        "pickup_location": pickup,
+        "dropoff_location": "Austin, TX",
+        "total_days": 1,
+        "log_sheets": [{"day_number": 1, "hours_driven": 3.5, "artifact_key": "a" * 64}],
+        **extra,
+    }
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TripBufferTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(trip_buffer, "get_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _lengths(self):
+        return trip_buffer.buffer_stats()
+
+    def test_flush_writes_trips_and_their_log_sheets(self):
+        trip_buffer.buffer_trip(trip_record("Dallas, TX"))
+        trip_buffer.buffer_trip(trip_record("Houston, TX"))
+
+        result = trip_buffer.flush_buffer()
+
+        self.assertEqual(result["written"], 2)
+        self.assertEqual(Trip.objects.filter(status="processed").count(), 2)
+        self.assertEqual(LogSheet.objects.count(), 2)
+        self.assertEqual(self._lengths(), {"buffered": 0, "processing": 0, "dead_letter": 0})
+
+    def test_poison_record_is_dead_lettered_after_max_attempts(self):
+        trip_buffer.buffer_trip(trip_record("Dallas, TX"))
+        trip_buffer.buffer_trip(trip_record("Nowhere", not_a_field=1))
+
+        with mock.patch.object(trip_buffer, "TRIP_FLUSH_MAX_ATTEMPTS", 2):
+            first = trip_buffer.flush_buffer()
+            self.assertEqual((first["written"], first["failed"]), (1, 1))
+            self.assertEqual(self._lengths()["buffered"], 1)
+
+            trip_buffer.flush_buffer()
+
+        self.assertEqual(self._lengths(), {"buffered": 0, "processing": 0, "dead_letter": 1})
+        dead = json.loads(self.redis.lindex(trip_buffer.TRIP_DEAD_LETTER_KEY, 0))
+        self.assertEqual(dead["attempts"], 2)
+        self.assertNotIn("_raw", dead)
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_dead_letters_can_be_requeued(self):
+        self.redis.rpush(
+            trip_buffer.TRIP_DEAD_LETTER_KEY,
+            json.dumps({"record": trip_record(), "attempts": 5}),
+            b"not json",
+        )
+
+        self.assertEqual(trip_buffer.requeue_dead_letters(), 1)
+        self.assertEqual(self._lengths(), {"buffered": 1, "processing": 0, "dead_letter": 1})
+
+    def test_trips_of_an_interrupted_flush_are_recovered(self):
+        trip_buffer.buffer_trip(trip_record("Dallas, TX"))
+        trip_buffer.buffer_trip(trip_record("Houston, TX"))
+
+        with mock.patch.object(trip_buffer, "_write_batch", side_effect=RuntimeError("worker killed")):
+            with self.assertRaises(RuntimeError):
+                trip_buffer.flush_buffer()
+        self.assertEqual(self._lengths()["processing"], 2)
+
+        result = trip_buffer.flush_buffer()
+
+        self.assertEqual((result["recovered"], result["written"]), (2, 2))
+        self.assertEqual(self._lengths(), {"buffered": 0, "processing": 0, "dead_letter": 0})
+
+    def test_only_one_flush_runs_at_a_time(self):
+        trip_buffer.buffer_trip(trip_record())
+        self.redis.set(trip_buffer.TRIP_FLUSH_LOCK_KEY, "someone-else")
+
+        result = trip_buffer.flush_buffer()
+
+        self.assertTrue(result["skipped"])
+        self.assertEqual(self._lengths()["buffered"], 1)
+        self.assertEqual(self.redis.get(trip_buffer.TRIP_FLUSH_LOCK_KEY), b"someone-else")
+
+    def test_unreachable_database_puts_the_batch_back(self):
+        from django.db import OperationalError
+
+        trip_buffer.buffer_trip(trip_record())
+
+        with mock.patch.object(trip_buffer, "write_trips", side_effect=OperationalError("down")):
+            result = trip_buffer.flush_buffer()
+
+        self.assertEqual(result["written"], 0)
+        self.assertEqual(self._lengths(), {"buffered": 1, "processing": 0, "dead_letter": 0})
+        entry = json.loads(self.redis.lindex(trip_buffer.TRIP_BUFFER_KEY, 0))
+        self.assertEqual(entry["attempts"], 0)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from trips.models import Trip
+from trips.utils.route_store import store_route
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_trip(minutes, **fields):
+    trip = Trip.objects.create(
+        pickup_location=fields.pop("pickup_location", "Dallas, TX"),
+        dropoff_location=fields.pop("dropoff_location", "Austin, TX"),
+        **fields,
+    )
+    Trip.objects.filter(id=trip.id).update(created_at=START + timedelta(minutes=minutes))
+    return trip
+
+
+class TripHistoryTests(TestCase):
+    def setUp(self):
+        # Two trips share a timestamp, so the id tiebreak is exercised.
+        self.trips = [make_trip(minutes) for minutes in (0, 1, 2, 2, 3, 4, 5)]
+        self.url = reverse("trip_history")
+
+    def _ids(self, response):
+        return [row["id"] for row in response.json()["results"]]
+
+    def _walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(self._ids(response))
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_trip_once_newest_first(self):
+        expected = list(Trip.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        self.assertEqual(self._walk(limit=2), expected)
+        self.assertEqual(len(expected), len(self.trips))
+
+    def test_new_trips_do_not_shift_later_pages(self):
+        first = self.client.get(self.url, {"limit": 3}).json()
+        make_trip(10)  # newer than everything already paged
+
+        second = self.client.get(self.url, {"limit": 3, "cursor": first["next_cursor"]}).json()
+
+        expected = list(Trip.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in second["results"]], expected[4:7])
+        self.assertIn("cursor=", second["next"])
+
+    def test_filters_apply_to_every_page(self):
+        houston = [make_trip(minutes, pickup_location="Houston, TX").id for minutes in (6, 7, 8)]
+
+        ids = self._walk(limit=2, pickup_location="Houston, TX")
+
+        self.assertEqual(ids, houston[::-1])
+
+    def test_created_range(self):
+        ids = self._walk(
+            created_after=(START + timedelta(minutes=2)).isoformat(),
+            created_before=(START + timedelta(minutes=4)).isoformat(),
+        )
+
+        self.assertEqual(sorted(ids), sorted(t.id for t in self.trips[2:5]))
+
+    def test_geometry_is_only_joined_on_request(self):
+        route_id = store_route([(32.7, -96.8), (31.5, -97.1), (30.3, -97.7)], [[-96.8, 32.7], [-97.7, 30.3]])
+        Trip.objects.filter(id=self.trips[-1].id).update(route_id=route_id)
+
+        plain = self.client.get(self.url, {"limit": 1}).json()["results"][0]
+        with_geometry = self.client.get(self.url, {"limit": 1, "include": "geometry"}).json()["results"][0]
+
+        self.assertNotIn("geometry", plain)
+        self.assertEqual(with_geometry["geometry"], [[-96.8, 32.7], [-97.7, 30.3]])
+
+    def test_bad_cursor_and_bounds_are_rejected(self):
+        for params in ({"cursor": "not-a-cursor"}, {"created_after": "yesterday"}, {"limit": "ten"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
@@ -0,0 +1,81 @@
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from trips.models import LogSheet, Trip
+from trips.utils.eld_cache import EldArtifactCache
+from trips.utils.trip_buffer import write_trips
+
+from .test_route_store import persist_stage, stage_inputs
+
+
+class TripLogTests(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        with mock.patch("trips.views.persist_trip"):
+            write_trips([persist_stage().func(stage_inputs())])
+        self.trip = Trip.objects.get()
+        self.sheets = LogSheet.objects.filter(trip=self.trip)
+        self.logs_url = reverse("trip_logs", args=[self.trip.id])
+        self.sheet_url = reverse("trip_log_sheet", args=[self.trip.id, 1])
+
+    def _last_modified(self, sheets):
+        return http_date(max(sheet.created_at for sheet in sheets).timestamp())
+
+    def test_logs_carry_validators(self):
+        response = self.client.get(self.logs_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["logs"]), self.sheets.count())
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertEqual(response["Last-Modified"], self._last_modified(self.sheets))
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.logs_url)["ETag"]
+
+        response = self.client.get(self.logs_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.logs_url)["Last-Modified"]
+        earlier = http_date((max(s.created_at for s in self.sheets) - timedelta(hours=1)).timestamp())
+
+        self.assertEqual(self.client.get(self.logs_url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.logs_url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_if_none_match_takes_precedence(self):
+        last_modified = self.client.get(self.logs_url)["Last-Modified"]
+
+        response = self.client.get(
+            self.logs_url, HTTP_IF_NONE_MATCH='"something-else"', HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_sheet_json_and_png_have_their_own_etags(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            "trips.utils.generate_eld.eld_cache", EldArtifactCache(directory, max_bytes=50 * 1024 * 1024)
+        ):
+            png = self.client.get(self.sheet_url)
+            self.assertEqual(png["Content-Type"], "image/png")
+            self.assertTrue(b"".join(png.streaming_content).startswith(b"\x89PNG"))
+            png.close()
+
+        as_json = self.client.get(self.sheet_url, {"format": "json"})
+
+        self.assertEqual(as_json.json()["day"], 1)
+        self.assertNotEqual(png["ETag"], as_json["ETag"])
+        again = self.client.get(self.sheet_url, {"format": "json"}, HTTP_IF_NONE_MATCH=as_json["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["Last-Modified"], as_json["Last-Modified"])
+
+    def test_unknown_day_or_trip_is_404(self):
+        self.assertEqual(self.client.get(reverse("trip_log_sheet", args=[self.trip.id, 99])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("trip_logs", args=[self.trip.id + 1])).status_code, 404)
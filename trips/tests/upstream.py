@@ -0,0 +1,37 @@
+"""Stand-ins for the ORS/Nominatim calls, so calculate_trip runs end to end offline."""
+import contextlib
+from unittest import mock
+
+from trips.utils.daily_info import local_daily_info
+
+from .test_route_store import AUSTIN, DALLAS, WACO
+
+PLACES = {"dallas": DALLAS, "waco": WACO, "austin": AUSTIN}
+TRIP = {"current_location": "Dallas, TX", "pickup_location": "Waco, TX", "dropoff_location": "Austin, TX"}
+
+
+async def geocode(name):
+    return PLACES[name.split(",")[0].strip().lower()]
+
+
+async def route(start, end):
+    distance_km = abs(start[0] - end[0]) * 111.0
+    return [[start[1], start[0]], [end[1], end[0]]], distance_km, distance_km / 90.0
+
+
+async def daily_info(duty_blocks, geometry, total_distance_km):
+    return local_daily_info(duty_blocks, total_distance_km)
+
+
+@contextlib.contextmanager
+def fake_upstream():
+    """Patch geocoding, routing, reverse geocoding, truck stops and the DB write; yields the mocks."""
+    with mock.patch("trips.views.geocode_place_cached", side_effect=geocode) as geocode_mock, mock.patch(
+        "trips.views.route_with_cache", side_effect=route
+    ) as route_mock, mock.patch("trips.views.build_daily_info", side_effect=daily_info) as daily_mock, mock.patch(
+        "trips.views.get_truck_stops_api"
+    ) as stops_api, mock.patch("trips.views.persist_trip") as persist_mock:
+        stops_api.return_value.find_stops_along_route.return_value = {"stops": [], "total_stops": 0}
+        yield mock.Mock(
+            geocode=geocode_mock, route=route_mock, daily_info=daily_mock, stops=stops_api, persist=persist_mock
+        )
@@ -1,6 +1,33 @@
 from django.urls import path
-from .views import calculate_trip
+from .views import (
+    calculate_trip,
+    eld_cache_stats,
+    download_eld_pdf,
+    eld_job_status,
+    trip_profiles,
+    trip_profile,
+)
+from .batch_views import calculate_trip_batch
+from .matrix_views import route_matrix
+from .history_views import trip_history, lane_stats, nearby_routes
+from .log_views import trip_logs, trip_log_sheet
 
 urlpatterns = [
     path("calculate/", calculate_trip, name="calculate_trip"),
+    path("calculate/batch/", calculate_trip_batch, name="calculate_trip_batch"),
+    path("matrix/", route_matrix, name="route_matrix"),
+    path("eld/cache/stats/", eld_cache_stats, name="eld_cache_stats"),
+    path(
+        "eld/pdf/<str:artifact_id>/",
+        download_eld_pdf,
+        name="download_eld_pdf",
+    ),
+    path("eld/jobs/<str:job_id>/", eld_job_status, name="eld_job_status"),
+    path("trips/", trip_history, name="trip_history"),
+    path("trips/<int:trip_id>/logs/", trip_logs, name="trip_logs"),
+    path("trips/<int:trip_id>/logs/<int:day_number>/", trip_log_sheet, name="trip_log_sheet"),
+    path("lanes/stats/", lane_stats, name="lane_stats"),
+    path("routes/nearby/", nearby_routes, name="nearby_routes"),
+    path("profiles/", trip_profiles, name="trip_profiles"),
+    path("profiles/<str:profile_id>/", trip_profile, name="trip_profile"),
 ]
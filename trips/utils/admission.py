@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Tuple
+
+from django.http import JsonResponse
+
+from .metrics import admission_rejections, register_gauge
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_limits(raw: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "eld=2:4,route=8:16" into {"eld": (2, 4), "route": (8, 16)}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        name, _, spec = part.partition("=")
+        concurrency, _, queue = spec.partition(":")
+        limits[name.strip()] = (int(concurrency), int(queue or 0))
+    return limits
+
+
+# stage -> (max concurrent, max waiting). Stages without an entry are unlimited.
+STAGE_LIMITS = {
+    "geocode": (16, 32),
+    "route": (8, 16),
+    "stops": (8, 16),
+    "eld": (2, 4),
+    "matrix": (4, 8),
+    **_parse_limits(os.getenv("TRIP_STAGE_LIMITS", "")),
+}
+ADMISSION_WAIT_TIMEOUT = float(os.getenv("TRIP_ADMISSION_WAIT_TIMEOUT", 5))
+RETRY_AFTER_SECONDS = int(os.getenv("TRIP_RETRY_AFTER_SECONDS", 2))
+
+
+class AdmissionRejected(Exception):
+    """The stage is saturated: all slots busy and the wait queue is full (or timed out)."""
+
+    def __init__(self, stage: str, reason: str):
+        self.stage = stage
+        self.retry_after = RETRY_AFTER_SECONDS
+        admission_rejections.inc(stage=stage)
+        super().__init__(f"Server busy ({stage} {reason}), retry later")
+
+
+class StageLimiter:
+    """
+    Concurrency limit with a bounded wait queue for one pipeline stage.
+
+    Thread-based rather than an asyncio.Semaphore because under WSGI every
+    request runs its own event loop; the limit has to hold across all of them
+    in the process.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _try_enter(self) -> bool:
+        """Take a slot now, join the queue, or raise if the queue is full."""
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise AdmissionRejected(self.name, "queue full")
+            self.waiting += 1
+            return False
+
+    def _wait_for_slot(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected(self.name, "queue wait timed out")
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def _abandon(self, future):
+        """The waiting request went away: give back whatever the waiter thread got."""
+        if future.cancelled():
+            with self._cond:
+                self.waiting -= 1
+        elif future.exception() is None:
+            self.release()
+
+    async def enter(self, timeout: float = None):
+        """Take a slot, queueing up to `timeout`; the caller must `release()` it."""
+        timeout = ADMISSION_WAIT_TIMEOUT if timeout is None else timeout
+        if not self._try_enter():
+            future = _waiter_executor.submit(self._wait_for_slot, timeout)
+            try:
+                await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                future.add_done_callback(self._abandon)
+                raise
+
+    @asynccontextmanager
+    async def acquire(self, timeout: float = None):
+        await self.enter(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+                "max_concurrent": self.max_concurrent,
+                "max_waiting": self.max_waiting,
+            }
+
+
+limiters = {name: StageLimiter(name, *limit) for name, limit in STAGE_LIMITS.items()}
+
+# One blocked thread per queued request, so the queues can never exhaust the pool.
+_waiter_executor = ThreadPoolExecutor(
+    max_workers=max(1, sum(limit[1] for limit in STAGE_LIMITS.values())),
+    thread_name_prefix="trip-admission",
+)
+
+
+register_gauge(
+    "trip_admission_active",
+    "Requests currently inside each admission-controlled stage.",
+    lambda: {(("stage", name),): l.active for name, l in limiters.items()},
+)
+register_gauge(
+    "trip_admission_waiting",
+    "Requests queued for each admission-controlled stage.",
+    lambda: {(("stage", name),): l.waiting for name, l in limiters.items()},
+)
+
+
+def limiter_for(stage: str):
+    return limiters.get(stage)
+
+
+def admission_rejection(error):
+    """The AdmissionRejected behind `error` (possibly wrapped in a StageError), if any."""
+    if isinstance(error, AdmissionRejected):
+        return error
+    if isinstance(getattr(error, "error", None), AdmissionRejected):
+        return error.error
+    return None
+
+
+def busy_response(rejection):
+    response = JsonResponse({"error": str(rejection), "stage": rejection.stage}, status=503)
+    response["Retry-After"] = str(rejection.retry_after)
+    return response
+
+
+async def limited(stage, func, *args):
+    """Await func(*args) inside the stage's admission limit, as pipeline stages do."""
+    limiter = limiter_for(stage)
+    if limiter is None:
+        return await func(*args)
+    async with limiter.acquire():
+        return await func(*args)
+
+
+async def gather_limited(stage, func, calls: Iterable[Tuple], semaphore):
+    """
+    Await func(*args) for every args in `calls`, at most `semaphore` at a time
+    and each inside the stage's admission limit.
+
+    Returns results or exceptions in call order, except that an admission
+    rejection is raised so a saturated stage fails the whole request.
+    """
+
+    async def bounded(args):
+        async with semaphore:
+            return await limited(stage, func, *args)
+
+    results = await asyncio.gather(*(bounded(args) for args in calls), return_exceptions=True)
+    rejection = next((r for r in results if isinstance(r, AdmissionRejected)), None)
+    if rejection is not None:
+        raise rejection
+    return results
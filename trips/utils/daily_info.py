@@ -0,0 +1,205 @@
+import asyncio
+import bisect
+import logging
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .eld_timeline import map_activity_to_status
+from .geo_cache import TieredGeoCache
+from .geohash import decode_geohash, encode_geohash
+from .metrics import record_cache
+from .route import ORS_API_KEY, executor
+
+logger = logging.getLogger(__name__)
+
+REVERSE_GEOCODE_URL = os.getenv(
+    "REVERSE_GEOCODE_URL", "https://api.openrouteservice.org/geocode/reverse"
+)
+# Duty changes are resolved per geohash tile (precision 5 is ~5 km), so trips
+# along the same corridor share lookups.
+REVERSE_GEOCODE_PRECISION = int(os.getenv("REVERSE_GEOCODE_PRECISION", 5))
+REVERSE_GEOCODE_MAX_LOOKUPS = int(os.getenv("REVERSE_GEOCODE_MAX_LOOKUPS", 8))  # uncached tiles per trip
+REVERSE_GEOCODE_TIMEOUT = float(os.getenv("REVERSE_GEOCODE_TIMEOUT", 5))
+PLACE_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days; towns don't move
+
+EARTH_RADIUS_KM = 6371.0
+KM_TO_MILES = 0.621371
+
+place_cache = TieredGeoCache("reverse_geocode")
+
+STATUS_CODES = {"off_duty": "OFF", "sleeper_berth": "SB", "driving": "D", "on_duty": "ON"}
+
+
+def _reverse_geocode_sync(lat: float, lon: float) -> str:
+    """Sync reverse geocode helper for executor: "City, ST" for a point."""
+    import requests
+
+    params = {"api_key": ORS_API_KEY, "point.lat": lat, "point.lon": lon, "size": 1}
+    try:
+        res = requests.get(REVERSE_GEOCODE_URL, params=params, timeout=REVERSE_GEOCODE_TIMEOUT)
+        res.raise_for_status()
+        data = res.json()
+    except requests.RequestException as e:
+        raise ValueError(f"Request error while reverse geocoding {lat},{lon}: {e}")
+
+    if not data.get("features"):
+        raise ValueError(f"Could not reverse geocode: {lat},{lon}")
+    properties = data["features"][0]["properties"]
+    city = properties.get("locality") or properties.get("county") or properties.get("name")
+    region = properties.get("region_a") or properties.get("region")
+    if city and region:
+        return f"{city}, {region}"
+    return properties.get("label") or city or f"{lat:.2f},{lon:.2f}"
+
+
+def _haversine_km(a: Sequence[float], b: Sequence[float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[1], a[0], b[1], b[0]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def _cumulative_km(geometry: List[List[float]]) -> List[float]:
+    distances = [0.0]
+    for previous, point in zip(geometry, geometry[1:]):
+        distances.append(distances[-1] + _haversine_km(previous, point))
+    return distances
+
+
+def _point_at(geometry: List[List[float]], cumulative: List[float], target_km: float) -> Tuple[float, float]:
+    """(lat, lon) `target_km` along a [lon, lat] polyline."""
+    index = bisect.bisect_left(cumulative, target_km)
+    if index <= 0:
+        return geometry[0][1], geometry[0][0]
+    if index >= len(geometry):
+        return geometry[-1][1], geometry[-1][0]
+    span = cumulative[index] - cumulative[index - 1]
+    t = (target_km - cumulative[index - 1]) / span if span else 0.0
+    (lon1, lat1), (lon2, lat2) = geometry[index - 1][:2], geometry[index][:2]
+    return lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t
+
+
+def plan_duty_changes(duty_blocks: List[Dict], total_miles: float):
+    """
+    Walk the schedule once: miles driven per day, and every change of duty
+    status as (day, start_hour, status, miles_from_start). Driving blocks split
+    the route distance in proportion to their hours. Each day also starts with
+    an entry so every sheet says where it begins.
+    """
+    driving_hours = sum(
+        block["hours"] for block in duty_blocks if map_activity_to_status(block["activity"]) == "driving"
+    )
+    mph = total_miles / driving_hours if driving_hours else 0.0
+
+    miles_per_day = defaultdict(float)
+    changes = []
+    miles = hour = 0.0
+    day = previous_status = None
+    for block in duty_blocks:
+        status = map_activity_to_status(block["activity"])
+        if block["day"] != day:
+            day, hour, previous_status = block["day"], 0.0, None
+        if status != previous_status:
+            changes.append((int(day), hour, status, miles))
+            previous_status = status
+        if status == "driving":
+            miles += block["hours"] * mph
+            miles_per_day[int(day)] += block["hours"] * mph
+        hour += block["hours"]
+    return dict(miles_per_day), changes
+
+
+async def resolve_tiles(tiles: Iterable[str]) -> Dict[str, str]:
+    """
+    Place label for each geohash tile: cached tiles locally, then at most
+    REVERSE_GEOCODE_MAX_LOOKUPS upstream calls. Tiles left over (or whose
+    lookup failed) are labelled with their centre coordinates.
+    """
+    tiles = list(dict.fromkeys(tiles))
+    found = place_cache.get_many([f"revgeo:{tile}" for tile in tiles])
+    labels = {tile: found[f"revgeo:{tile}"] for tile in tiles if f"revgeo:{tile}" in found}
+    missing = [tile for tile in tiles if tile not in labels]
+    record_cache("reverse_geocode", hit=True, count=len(labels))
+    record_cache("reverse_geocode", hit=False, count=len(missing))
+
+    to_fetch = missing[:REVERSE_GEOCODE_MAX_LOOKUPS]
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(
+                loop.run_in_executor(executor, _reverse_geocode_sync, *decode_geohash(tile)),
+                REVERSE_GEOCODE_TIMEOUT,
+            )
+            for tile in to_fetch
+        ),
+        return_exceptions=True,
+    )
+    fetched = {}
+    for tile, result in zip(to_fetch, results):
+        if isinstance(result, Exception):
+            logger.warning(f"[REVERSE GEOCODE] Tile {tile} failed: {result}")
+        else:
+            fetched[f"revgeo:{tile}"] = labels[tile] = result
+    if fetched:
+        place_cache.set_many(fetched, PLACE_CACHE_TIMEOUT)
+        logger.info(f"[REVERSE GEOCODE] Resolved {len(fetched)} tiles, {len(tiles) - len(missing)} cached")
+
+    for tile in missing:
+        if tile not in labels:
+            lat, lon = decode_geohash(tile)
+            labels[tile] = f"{lat:.2f},{lon:.2f}"
+    return labels
+
+
+def _clock(hour: float) -> str:
+    minutes = int(round(hour * 60))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def local_daily_info(duty_blocks: List[Dict], total_distance_km: float) -> Dict[int, Dict]:
+    """
+    Per-day "total_miles_today" from the schedule alone, with empty remarks:
+    the sheet data that needs no reverse geocoding.
+    """
+    miles_per_day, _ = plan_duty_changes(duty_blocks, total_distance_km * KM_TO_MILES)
+    days = sorted({int(block["day"]) for block in duty_blocks})
+    return {
+        day: {"total_miles_today": int(round(miles_per_day.get(day, 0.0))), "remarks": ""}
+        for day in days
+    }
+
+
+async def build_daily_info(
+    duty_blocks: List[Dict], geometry: List[List[float]], total_distance_km: float
+) -> Dict[int, Dict]:
+    """
+    Per-day "total_miles_today" and "remarks" for the ELD sheets: the time,
+    status and nearest town of every duty status change, e.g.
+    "00:00 ON Chicago, IL; 01:00 D Chicago, IL; 11:57 OFF Joplin, MO".
+    """
+    total_miles = total_distance_km * KM_TO_MILES
+    miles_per_day, changes = plan_duty_changes(duty_blocks, total_miles)
+
+    tiles = []
+    if geometry and changes:
+        cumulative = _cumulative_km(geometry)
+        # The drawn geometry and the routed distance differ slightly; positions are by fraction.
+        scale = cumulative[-1] / total_miles if total_miles else 0.0
+        for _, _, _, miles in changes:
+            lat, lon = _point_at(geometry, cumulative, miles * scale)
+            tiles.append(encode_geohash(lat, lon, REVERSE_GEOCODE_PRECISION))
+    labels = await resolve_tiles(tiles) if tiles else {}
+
+    remarks = defaultdict(list)
+    for (day, hour, status, _), tile in zip(changes, tiles):
+        remarks[day].append(f"{_clock(hour)} {STATUS_CODES[status]} {labels[tile]}")
+
+    days = sorted({int(block["day"]) for block in duty_blocks})
+    return {
+        day: {
+            "total_miles_today": int(round(miles_per_day.get(day, 0.0))),
+            "remarks": "; ".join(remarks[day]),
+        }
+        for day in days
+    }
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+ELD_CACHE_DIR = os.getenv("ELD_CACHE_DIR", "/tmp/eld_cache")
+ELD_CACHE_MAX_BYTES = int(os.getenv("ELD_CACHE_MAX_BYTES", 256 * 1024 * 1024))  # 256 MB
+ELD_CACHE_SHARED = os.getenv("ELD_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+ELD_CACHE_SHARED_TIMEOUT = 60 * 60 * 24  # 24 hours
+# Artifacts used within this window are never evicted: their paths may have
+# just been handed to a caller that is still reading or merging them.
+ELD_CACHE_MIN_AGE = int(os.getenv("ELD_CACHE_MIN_AGE_SECONDS", 60))
+
+# Bump whenever the sheet layout in generate_eld.py changes so old artifacts stop matching.
+ELD_SHEET_VERSION = 1
+
+
+def _digest(payload) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class EldArtifactCache:
+    """
+    Content-addressed store for rendered ELD pages and merged PDFs.
+
+    Artifacts live on local disk under `root` and are evicted least-recently-used
+    once the directory grows past `max_bytes`. When `shared` is enabled, every
+    artifact is also written to the Django cache so other processes/instances
+    can serve it without re-rendering.
+    """
+
+    def __init__(self, root: str, max_bytes: int, shared: bool = False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._size = None
+        self._stats = defaultdict(lambda: {"hits": 0, "shared_hits": 0, "misses": 0})
+
+    # ------------------------------------------------------------------ keys
+
+    def sheet_key(
+        self,
+        duty_blocks: List[Dict],
+        day_number: int,
+        total_sheets: int,
+        daily_info: Dict,
+        compact: bool = False,
+    ) -> str:
+        """Key for a single day's page: its blocks, page position and sheet metadata."""
+        return _digest(
+            {
+                "v": ELD_SHEET_VERSION,
+                "compact": compact,
+                "blocks": duty_blocks,
+                "day": day_number,
+                "total": total_sheets,
+                "info": daily_info,
+            }
+        )
+
+    def bundle_key(self, sheet_paths: List[str]) -> str:
+        """Key for a merged PDF, derived from the content keys of its pages."""
+        parts = []
+        for path in sheet_paths:
+            if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root):
+                parts.append(os.path.splitext(os.path.basename(path))[0])
+            else:
+                with open(path, "rb") as fh:
+                    parts.append(hashlib.sha256(fh.read()).hexdigest())
+        return self.pages_key(parts)
+
+    def pages_key(self, page_keys: List[str]) -> str:
+        return _digest({"v": ELD_SHEET_VERSION, "pages": list(page_keys)})
+
+    def path_for(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    # ------------------------------------------------------------- get / put
+
+    def get(self, key: str, ext: str, kind: str = None) -> Optional[str]:
+        """Return the local path of a cached artifact, or None on a miss."""
+        kind = kind or ext
+        path = self.path_for(key, ext)
+
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # mark as recently used for LRU eviction
+            except OSError:
+                pass
+            self._record(kind, "hits")
+            logger.debug(f"[ELD CACHE HIT] {kind} {key}")
+            return path
+
+        if self.shared:
+            data = self._shared_cache().get(f"eld:{key}.{ext}")
+            if data is not None:
+                self._write(path, data)
+                self._record(kind, "shared_hits")
+                logger.debug(f"[ELD CACHE SHARED HIT] {kind} {key}")
+                return path
+
+        self._record(kind, "misses")
+        logger.debug(f"[ELD CACHE MISS] {kind} {key}")
+        return None
+
+    def put(self, key: str, ext: str, data: bytes) -> str:
+        """Store an artifact and return its local path."""
+        path = self.path_for(key, ext)
+        self._write(path, data)
+        if self.shared:
+            try:
+                self._shared_cache().set(f"eld:{key}.{ext}", data, ELD_CACHE_SHARED_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"[ELD CACHE] Shared write failed for {key}.{ext}: {e}")
+        return path
+
+    def read(self, key: str, ext: str, kind: str = None) -> Optional[bytes]:
+        path = self.get(key, ext, kind)
+        if path is None:
+            return None
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def put_manifest(self, key: str, data: bytes) -> str:
+        """
+        Store a bundle manifest. Manifests are small and let any process rebuild
+        the PDF, so they always go to the Django cache as well, shared or not.
+        """
+        path = self.put(key, "json", data)
+        if not self.shared:
+            try:
+                self._shared_cache().set(f"eld:{key}.json", data, ELD_CACHE_SHARED_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"[ELD CACHE] Manifest write failed for {key}: {e}")
+        return path
+
+    def read_manifest(self, key: str) -> Optional[bytes]:
+        data = self.read(key, "json", kind="manifest")
+        if data is None and not self.shared:
+            data = self._shared_cache().get(f"eld:{key}.json")
+            if data is not None:
+                self._write(self.path_for(key, "json"), data)
+        return data
+
+    # ----------------------------------------------------------------- stats
+
+    def stats(self) -> Dict:
+        with self._lock:
+            kinds = {}
+            for kind, counts in self._stats.items():
+                lookups = counts["hits"] + counts["shared_hits"] + counts["misses"]
+                kinds[kind] = {
+                    **counts,
+                    "lookups": lookups,
+                    "hit_rate": round((counts["hits"] + counts["shared_hits"]) / lookups, 4)
+                    if lookups
+                    else 0.0,
+                }
+            return {
+                "root": self.root,
+                "size_bytes": self._size or 0,
+                "max_bytes": self.max_bytes,
+                "shared": self.shared,
+                "kinds": kinds,
+            }
+
+    def _record(self, kind: str, outcome: str):
+        with self._lock:
+            self._stats[kind][outcome] += 1
+        record_cache(f"eld_{kind}", hit=outcome != "misses")
+
+    # -------------------------------------------------------------- internal
+
+    def _shared_cache(self):
+        from django.core.cache import cache
+
+        return cache
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            previous_size = os.path.getsize(path)  # overwriting a key replaces its bytes
+        except OSError:
+            previous_size = 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - previous_size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _scan_size(self) -> int:
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        """
+        Drop least-recently-used artifacts until the store is back under budget.
+        Artifacts touched within ELD_CACHE_MIN_AGE are kept even if that leaves
+        the store over budget until the next write.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+
+            size = sum(e[1] for e in entries)
+            target = int(self.max_bytes * 0.9)  # leave headroom so we don't evict on every write
+            in_flight_after = time.time() - ELD_CACHE_MIN_AGE
+            removed = 0
+            for mtime, entry_size, entry_path in entries:
+                if size <= target or mtime > in_flight_after:
+                    break
+                try:
+                    os.remove(entry_path)
+                    size -= entry_size
+                    removed += 1
+                except OSError:
+                    pass
+            self._size = size
+
+        if removed:
+            logger.info(f"[ELD CACHE] Evicted {removed} artifacts, size now {size} bytes")
+
+
+eld_cache = EldArtifactCache(ELD_CACHE_DIR, ELD_CACHE_MAX_BYTES, shared=ELD_CACHE_SHARED)
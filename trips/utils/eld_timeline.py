@@ -0,0 +1,214 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from .eld_cache import eld_cache
+
+HOURS_PER_DAY = 24
+
+# Render raster sheets as palette images (see generate_eld.COMPACT_PALETTE).
+ELD_COMPACT_RASTER = os.getenv("ELD_COMPACT_RASTER", "false").lower() in ("1", "true", "yes")
+
+ACTIVITY_LABELS = ["Off Duty", "Sleeper Berth", "Driving", "On Duty (not driving)"]
+ACTIVITIES = ["off_duty", "sleeper_berth", "driving", "on_duty"]
+
+ACTIVITY_COLORS = {
+    "off_duty": "#90EE90",
+    "sleeper_berth": "#ADD8E6",
+    "driving": "#FF6347",
+    "on_duty": "#FFD700",
+}
+
+
+def log_date() -> str:
+    """The date printed on sheets that have none of their own (today, server local time)."""
+    return datetime.now().strftime("%m/%d/%Y")
+
+
+def map_activity_to_status(activity_str: str) -> str:
+    """Map a scheduler activity label onto one of the four ELD grid rows."""
+    activity_lower = activity_str.lower()
+    if "off-duty" in activity_lower or "rest" in activity_lower:
+        return "off_duty"
+    elif "sleeper" in activity_lower:
+        return "sleeper_berth"
+    elif "driving" in activity_lower:
+        return "driving"
+    elif (
+        "on-duty" in activity_lower
+        or "pickup" in activity_lower
+        or "dropoff" in activity_lower
+        or "fuel" in activity_lower
+    ):
+        return "on_duty"
+    else:
+        return "off_duty"
+
+
+def iter_grid_slices(duty_blocks: List[Dict]) -> Iterator[Tuple[int, str, float, float]]:
+    """
+    Walk a single day's duty blocks the way the ELD grid is filled.
+
+    Yields (block_idx, status, start_hour, hours) slices, split at every hour
+    boundary and clipped to the 24-hour day. Block indexes start at 1.
+    """
+    current_hour = 0.0
+    for block_idx, block in enumerate(duty_blocks, start=1):
+        activity_status = map_activity_to_status(block["activity"])
+        hours_needed = block["hours"]
+
+        if activity_status not in ACTIVITIES:
+            continue
+
+        while hours_needed > 0 and current_hour < HOURS_PER_DAY:
+            hours_to_fill = min(hours_needed, 1.0 - (current_hour % 1.0))
+            if hours_to_fill <= 0:
+                hours_to_fill = min(hours_needed, 1.0)
+
+            yield block_idx, activity_status, current_hour, hours_to_fill
+
+            hours_needed -= hours_to_fill
+            current_hour += hours_to_fill
+
+
+def compute_daily_totals(duty_blocks: List[Dict]) -> Dict[str, float]:
+    """Total scheduled hours per grid row (not clipped to 24h, matching the sheet summary)."""
+    daily_hours = defaultdict(float)
+    for block in duty_blocks:
+        activity_status = map_activity_to_status(block["activity"])
+        if activity_status in ACTIVITIES:
+            daily_hours[activity_status] += block["hours"]
+    return {act: daily_hours.get(act, 0.0) for act in ACTIVITIES}
+
+
+def build_day_timeline(duty_blocks: List[Dict]) -> List[Dict]:
+    """Collapse the grid slices into one status-change segment per duty block."""
+    segments = []
+    for block_idx, status, start, hours in iter_grid_slices(duty_blocks):
+        end = start + hours
+        if segments and segments[-1]["block"] == block_idx:
+            segments[-1]["end"] = round(end, 4)
+            continue
+        segments.append(
+            {
+                "block": block_idx,
+                "status": status,
+                "activity": duty_blocks[block_idx - 1]["activity"],
+                "start": round(start, 4),
+                "end": round(end, 4),
+            }
+        )
+    return segments
+
+
+def render_day_svg(segments: List[Dict], day_number: int, total_sheets: int) -> str:
+    """Small SVG of the 24-hour status grid for one day, no raster rendering."""
+    label_width, col_width, row_height, header = 110, 30, 24, 18
+    width = label_width + HOURS_PER_DAY * col_width + 1
+    height = header + len(ACTIVITIES) * row_height + 1
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="9">',
+        f"<title>ELD day {day_number} of {total_sheets}</title>",
+    ]
+
+    for row_idx, label in enumerate(ACTIVITY_LABELS):
+        y = header + row_idx * row_height
+        parts.append(f'<text x="2" y="{y + 15}">{label}</text>')
+
+    for h in range(HOURS_PER_DAY):
+        x = label_width + h * col_width
+        parts.append(f'<text x="{x + 2}" y="12">{h:02d}</text>')
+
+    for seg in segments:
+        row_idx = ACTIVITIES.index(seg["status"])
+        x = label_width + seg["start"] * col_width
+        w = (seg["end"] - seg["start"]) * col_width
+        y = header + row_idx * row_height
+        parts.append(
+            f'<rect x="{x:.2f}" y="{y}" width="{w:.2f}" height="{row_height}" '
+            f'fill="{ACTIVITY_COLORS[seg["status"]]}"/>'
+        )
+
+    grid = []
+    for h in range(HOURS_PER_DAY + 1):
+        x = label_width + h * col_width
+        grid.append(f"M{x} {header}V{height - 1}")
+    for row_idx in range(len(ACTIVITIES) + 1):
+        y = header + row_idx * row_height
+        grid.append(f"M{label_width} {y}H{width - 1}")
+    parts.append(f'<path d="{"".join(grid)}" stroke="black" stroke-width="1" fill="none"/>')
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def generate_eld_timelines(sheets: List[Dict], include_svg: bool = False) -> List[Dict]:
+    """
+    Structured per-day ELD output: the grid's status-change timeline plus totals.
+
+    Takes the pages from `plan_eld_sheets`, the same ones the raster path
+    draws, but without PIL, for clients that draw the grid themselves.
+    """
+    days = []
+    for sheet in sheets:
+        day_num, total_sheets, info = sheet["day_number"], sheet["total_sheets"], sheet["info"]
+        segments = build_day_timeline(sheet["blocks"])
+        day = {
+            "day": day_num,
+            "total_sheets": total_sheets,
+            "date": info["date"],
+            "total_miles_today": info.get("total_miles_today", 0),
+            "remarks": info.get("remarks", ""),
+            "segments": segments,
+            "totals": {
+                act: round(hours, 2) for act, hours in compute_daily_totals(sheet["blocks"]).items()
+            },
+        }
+        if include_svg:
+            day["svg"] = render_day_svg(segments, day_num, total_sheets)
+        days.append(day)
+
+    return days
+
+
+def plan_eld_sheets(
+    duty_blocks: List[Dict], daily_info_dict: Dict = None, compact: bool = None
+) -> List[Dict]:
+    """
+    Work out the pages of a trip's logs without drawing them.
+
+    Returns one dict per day with everything needed to render the page later
+    ("day_number", "blocks", "total_sheets", "info", "compact") and its
+    content-addressed cache "key".
+    """
+    daily_info_dict = daily_info_dict or {}
+    compact = ELD_COMPACT_RASTER if compact is None else compact
+    day_blocks = defaultdict(list)
+    for block in duty_blocks:
+        day_num = int(block["day"])
+        day_blocks[day_num].append(block)
+
+    total_sheets = len(day_blocks)
+    today = log_date()
+    sheets = []
+
+    for day_num in sorted(day_blocks.keys()):
+        blocks_for_day = day_blocks[day_num]
+        # Resolve the default date up front so the cache key matches what gets drawn.
+        info_for_day = {"date": today, **daily_info_dict.get(day_num, {})}
+        sheets.append(
+            {
+                "day_number": day_num,
+                "blocks": blocks_for_day,
+                "total_sheets": total_sheets,
+                "info": info_for_day,
+                "compact": compact,
+                "key": eld_cache.sheet_key(
+                    blocks_for_day, day_num, total_sheets, info_for_day, compact=compact
+                ),
+            }
+        )
+    return sheets
@@ -1,13 +1,38 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
 from datetime import datetime
 from typing import Dict, List
-from collections import defaultdict
 from io import BytesIO
+import json
 import os
 
+from .eld_cache import eld_cache
+from .eld_timeline import (
+    ACTIVITIES,
+    ACTIVITY_COLORS,
+    ACTIVITY_LABELS,
+    HOURS_PER_DAY,
+    compute_daily_totals,
+    iter_grid_slices,
+    plan_eld_sheets,
+)
+
+# Compact mode renders into an 8-colour palette image instead of 24-bit RGB,
+# which Pillow writes as much smaller 4-bit indexed PNGs.
+COMPACT_PALETTE = [
+    channel
+    for color in ["white", "black", "gray", "lightgray", *ACTIVITY_COLORS.values()]
+    for channel in ImageColor.getrgb(color)
+]
+
 
 def generate_eld_sheet(
-    duty_blocks: List[Dict], day_number: int, total_sheets: int, daily_info: Dict = None
+    duty_blocks: List[Dict],
+    day_number: int,
+    total_sheets: int,
+    daily_info: Dict = None,
+    compact: bool = False,
 ) -> Image.Image:
     """
     Generate a professional ELD sheet from duty blocks for a single day with:
@@ -18,11 +43,17 @@ def generate_eld_sheet(
     - Vehicle info & driver signature
     - Activity summary
     - Automatic number scaling for small fractions
+
+    With `compact=True` the sheet is drawn into a palette ("P") image.
     """
     daily_info = daily_info or {}
 
     width, height = 1500, 1800
-    img = Image.new("RGB", (width, height), color="white")
+    if compact:
+        img = Image.new("P", (width, height), 0)
+        img.putpalette(COMPACT_PALETTE)
+    else:
+        img = Image.new("RGB", (width, height), color="white")
     draw = ImageDraw.Draw(img)
 
     try:
@@ -116,17 +147,11 @@ def generate_eld_sheet(
     grid_y_start = y_pos
     col_width = 40
     row_height = 35
-    hours_per_day = 24
-
-    activity_labels = ["Off Duty", "Sleeper Berth", "Driving", "On Duty (not driving)"]
-    activities = ["off_duty", "sleeper_berth", "driving", "on_duty"]
+    hours_per_day = HOURS_PER_DAY
 
-    activity_colors = {
-        "off_duty": "#90EE90",
-        "sleeper_berth": "#ADD8E6",
-        "driving": "#FF6347",
-        "on_duty": "#FFD700",
-    }
+    activity_labels = ACTIVITY_LABELS
+    activities = ACTIVITIES
+    activity_colors = ACTIVITY_COLORS
 
     for row_idx, label in enumerate(activity_labels):
         row_y = grid_y_start + row_idx * row_height
@@ -164,82 +189,47 @@ def generate_eld_sheet(
                 width=1,
             )
 
-    def map_activity_to_status(activity_str):
-        activity_lower = activity_str.lower()
-        if "off-duty" in activity_lower or "rest" in activity_lower:
-            return "off_duty"
-        elif "sleeper" in activity_lower:
-            return "sleeper_berth"
-        elif "driving" in activity_lower:
-            return "driving"
-        elif (
-            "on-duty" in activity_lower
-            or "pickup" in activity_lower
-            or "dropoff" in activity_lower
-            or "fuel" in activity_lower
-        ):
-            return "on_duty"
-        else:
-            return "off_duty"  
-
-    current_hour = 0.0
-    for block_idx, block in enumerate(duty_blocks, start=1):
-        activity_status = map_activity_to_status(block["activity"])
-        hours_needed = block["hours"]
-
-        if activity_status not in activities:
-            continue
-
+    for block_idx, activity_status, current_hour, hours_to_fill in iter_grid_slices(
+        duty_blocks
+    ):
         row_idx = activities.index(activity_status)
         color = activity_colors.get(activity_status, "lightgray")
 
-        while hours_needed > 0 and current_hour < hours_per_day:
-            hours_to_fill = min(hours_needed, 1.0 - (current_hour % 1.0))
-            if hours_to_fill <= 0:
-                hours_to_fill = min(hours_needed, 1.0)
-
-            start_col = int(current_hour)
-            start_fraction = current_hour - start_col
-            col_x1 = grid_x_start + start_col * col_width + (start_fraction * col_width)
-            col_x2 = col_x1 + (hours_to_fill * col_width)
+        start_col = int(current_hour)
+        start_fraction = current_hour - start_col
+        col_x1 = grid_x_start + start_col * col_width + (start_fraction * col_width)
+        col_x2 = col_x1 + (hours_to_fill * col_width)
 
-            row_y1 = grid_y_start + row_idx * row_height
-            row_y2 = row_y1 + row_height
+        row_y1 = grid_y_start + row_idx * row_height
+        row_y2 = row_y1 + row_height
 
-            draw.rectangle(
-                [(col_x1, row_y1), (col_x2, row_y2)],
-                fill=color,
-                outline="black",
-            )
+        draw.rectangle(
+            [(col_x1, row_y1), (col_x2, row_y2)],
+            fill=color,
+            outline="black",
+        )
 
-            if (
-                hours_to_fill >= 0.25
-            ):  
-                try:
-                    scale_font_size = max(6, int(10 * hours_to_fill))
-                    block_font = ImageFont.truetype(
-                        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                        scale_font_size,
-                    )
-                except:
-                    block_font = small_font
-
-                text = str(block_idx)
-                bbox = block_font.getbbox(text)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-                text_x = col_x1 + ((col_x2 - col_x1) - text_width) / 2
-                text_y = row_y1 + (row_height - text_height) / 2
-                draw.text((text_x, text_y), text, font=block_font, fill="black")
-
-            hours_needed -= hours_to_fill
-            current_hour += hours_to_fill
-
-    daily_hours = defaultdict(float)
-    for block in duty_blocks:
-        activity_status = map_activity_to_status(block["activity"])
-        if activity_status in activities:
-            daily_hours[activity_status] += block["hours"]
+        if (
+            hours_to_fill >= 0.25
+        ):  
+            try:
+                scale_font_size = max(6, int(10 * hours_to_fill))
+                block_font = ImageFont.truetype(
+                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                    scale_font_size,
+                )
+            except:
+                block_font = small_font
+
+            text = str(block_idx)
+            bbox = block_font.getbbox(text)
+            text_width = bbox[2] - bbox[0]
+            text_height = bbox[3] - bbox[1]
+            text_x = col_x1 + ((col_x2 - col_x1) - text_width) / 2
+            text_y = row_y1 + (row_height - text_height) / 2
+            draw.text((text_x, text_y), text, font=block_font, fill="black")
+
+    daily_hours = compute_daily_totals(duty_blocks)
 
     y_pos = grid_y_start + len(activity_labels) * row_height + 20
     draw.rectangle([(50, y_pos), (1150, y_pos + 100)], outline="black", width=2)
@@ -292,8 +282,25 @@ def generate_eld_sheet(
     return img
 
 
+def eld_sheet_path(sheet: Dict) -> str:
+    """Cached path of a planned page, rendering it only if it isn't cached yet."""
+    filepath = eld_cache.get(sheet["key"], "png", kind="sheet")
+    if filepath is None:
+        sheet_image = generate_eld_sheet(
+            sheet["blocks"],
+            sheet["day_number"],
+            sheet["total_sheets"],
+            sheet["info"],
+            compact=sheet["compact"],
+        )
+        buffer = BytesIO()
+        sheet_image.save(buffer, format="PNG", optimize=sheet["compact"])
+        filepath = eld_cache.put(sheet["key"], "png", buffer.getvalue())
+    return filepath
+
+
 def generate_multiple_eld_sheets(
-    duty_blocks: List[Dict], daily_info_dict: Dict = None
+    duty_blocks: List[Dict], daily_info_dict: Dict = None, compact: bool = None
 ) -> List[str]:
     """
     Generate all ELD sheets needed for the trip, grouped by day.
@@ -301,46 +308,87 @@ def generate_multiple_eld_sheets(
     Args:
         duty_blocks: List of all duty blocks for the trip
         daily_info_dict: Optional dict mapping day_number -> info dict (mileage, carrier, etc.)
+        compact: Render palette images (defaults to ELD_COMPACT_RASTER)
 
     Returns:
-        List of file paths to generated ELD sheet images
+        List of file paths to generated ELD sheet images. Sheets are served from
+        the content-addressed ELD cache when the same day was rendered before.
     """
-
-    daily_info_dict = daily_info_dict or {}
-    day_blocks = defaultdict(list)
-    for block in duty_blocks:
-        day_num = int(block["day"])
-        day_blocks[day_num].append(block)
-
-    generated_files = []
-    total_sheets = len(day_blocks)
-
-    for day_num in sorted(day_blocks.keys()):
-        blocks_for_day = day_blocks[day_num]
-        info_for_day = daily_info_dict.get(day_num, {})
-        sheet_image = generate_eld_sheet(
-            blocks_for_day, day_num, total_sheets, info_for_day
-        )
-
-        filename = f"ELD_Sheet_Day_{day_num}_of_{total_sheets}.png"
-        filepath = os.path.join("/tmp", filename)
-        sheet_image.save(filepath)
-        generated_files.append(filepath)
-
-    return generated_files
+    return [
+        eld_sheet_path(sheet) for sheet in plan_eld_sheets(duty_blocks, daily_info_dict, compact)
+    ]
 
 
 def merge_eld_sheets(sheet_paths: List[str]) -> bytes:
     """
     Merge multiple ELD sheet images into a single PDF and return its binary content.
+    The merged PDF is cached under a key derived from its pages.
     """
     if not sheet_paths:
         raise ValueError("No sheet paths provided to merge.")
 
-    images = [Image.open(p).convert("RGB") for p in sheet_paths]
+    key = eld_cache.bundle_key(sheet_paths)
+    cached_pdf = eld_cache.read(key, "pdf", kind="pdf")
+    if cached_pdf is not None:
+        return cached_pdf
 
+    # One page per sheet, sized to the image so nothing is rescaled. reportlab
+    # embeds the pixels with Flate, so pages stay lossless; invariant=True keeps
+    # the output byte-identical for the same sheets.
     pdf_buffer = BytesIO()
-    images[0].save(pdf_buffer, format="PDF", save_all=True, append_images=images[1:])
-    pdf_buffer.seek(0)
+    pdf = canvas.Canvas(pdf_buffer, invariant=True, pageCompression=1)
+    for path in sheet_paths:
+        image = ImageReader(path)
+        width, height = image.getSize()
+        pdf.setPageSize((width, height))
+        pdf.drawImage(image, 0, 0, width=width, height=height)
+        pdf.showPage()
+    pdf.save()
+    pdf_bytes = pdf_buffer.getvalue()
+
+    eld_cache.put(key, "pdf", pdf_bytes)
+    return pdf_bytes
+
+
+def register_eld_bundle(sheets: List[Dict]) -> str:
+    """
+    Record which pages make up a merged PDF without building it.
+
+    `sheets` are the planned pages from `plan_eld_sheets`. Returns the artifact
+    id the PDF can later be fetched by; the PDF itself is only merged when
+    someone asks for it (see `build_eld_pdf`). The manifest keeps each page's
+    inputs, so pages evicted from the local cache are re-rendered on demand.
+    """
+    if not sheets:
+        raise ValueError("No sheets provided to merge.")
+
+    artifact_id = eld_cache.pages_key([sheet["key"] for sheet in sheets])
+    eld_cache.put_manifest(artifact_id, json.dumps(sheets).encode("utf-8"))
+    return artifact_id
+
+
+def build_eld_pdf(artifact_id: str):
+    """
+    Return the local path of the merged PDF for `artifact_id`, merging it from
+    its pages on first access. Returns None if the bundle is unknown or expired.
+    """
+    pdf_path = eld_cache.path_for(artifact_id, "pdf")
+    if os.path.exists(pdf_path):
+        return eld_cache.get(artifact_id, "pdf", kind="pdf")
+
+    manifest = eld_cache.read_manifest(artifact_id)
+    if manifest is None:
+        return None
+
+    page_paths = []
+    for sheet in json.loads(manifest):
+        if isinstance(sheet, str):
+            # Manifests written before they carried page inputs hold only the keys.
+            page_paths.append(eld_cache.get(sheet, "png", kind="sheet"))
+        else:
+            page_paths.append(eld_sheet_path(sheet))
+    if any(path is None for path in page_paths):
+        return None
 
-    return pdf_buffer.getvalue()
+    merge_eld_sheets(page_paths)
+    return pdf_path
@@ -0,0 +1,203 @@
+import logging
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable
+
+from .metrics import Counter, register_gauge, registry
+
+logger = logging.getLogger(__name__)
+
+# L1 entries live at most this long, so values rewritten in Redis by another
+# process are picked up within GEO_L1_TTL seconds.
+GEO_L1_TTL = int(os.getenv("GEO_L1_TTL", 300))
+GEO_L1_MAX_ENTRIES = int(os.getenv("GEO_L1_MAX_ENTRIES", 10000))
+GEO_L1_MAX_ROUTES = int(os.getenv("GEO_L1_MAX_ROUTES", 256))  # route geometries are ~100 KB each
+GEO_NEGATIVE_TTL = int(os.getenv("GEO_NEGATIVE_TTL", 600))
+GEO_COMPRESS_MIN_BYTES = int(os.getenv("GEO_COMPRESS_MIN_BYTES", 1024))
+GEO_COMPRESSION_LEVEL = int(os.getenv("GEO_COMPRESSION_LEVEL", 6))
+
+geo_cache_requests = registry.register(
+    Counter(
+        "trip_geo_cache_requests_total",
+        "Geo cache lookups by cache, tier (l1/l2) and result (hit/miss/negative).",
+    )
+)
+
+
+class _Negative:
+    """Marker for a cached "this lookup has no answer" (e.g. an unknown place)."""
+
+    def __repr__(self):
+        return "NEGATIVE"
+
+
+NEGATIVE = _Negative()
+
+# One-byte headers on L2 payloads.
+_RAW, _ZLIB, _NEG = b"p", b"z", b"n"
+
+
+class LRUTTLCache:
+    """Bounded, thread-safe in-process cache; least recently used entries go first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredGeoCache:
+    """
+    L1 (this process, LRU + TTL) in front of L2 (the shared Django cache).
+
+    L2 values are pickled and zlib-compressed above GEO_COMPRESS_MIN_BYTES;
+    `pack`/`unpack` can swap in a more compact form first (routes store their
+    geometry as an encoded polyline). L1 keeps the ready-to-use object, so hot
+    keys cost a dict lookup. Without a shared cache (no CACHE_URL) L2 would
+    just be another in-process copy, so L1 is used alone with the full timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = GEO_L1_MAX_ENTRIES,
+        pack: Callable[[Any], Any] = None,
+        unpack: Callable[[Any], Any] = None,
+    ):
+        self.name = name
+        self.l1 = LRUTTLCache(max_entries)
+        self.pack = pack
+        self.unpack = unpack
+        _caches[name] = self
+
+    @property
+    def l2(self):
+        from django.core.cache import caches
+        from django.core.cache.backends.locmem import LocMemCache
+
+        backend = caches["default"]
+        return None if isinstance(backend, LocMemCache) else backend
+
+    def _l1_ttl(self, timeout: float) -> float:
+        return min(timeout, GEO_L1_TTL) if self.l2 is not None else timeout
+
+    def _dumps(self, value) -> bytes:
+        if value is NEGATIVE:
+            return _NEG
+        payload = pickle.dumps(self.pack(value) if self.pack else value, protocol=5)
+        if len(payload) >= GEO_COMPRESS_MIN_BYTES:
+            return _ZLIB + zlib.compress(payload, GEO_COMPRESSION_LEVEL)
+        return _RAW + payload
+
+    def _loads(self, raw: bytes):
+        header, payload = raw[:1], raw[1:]
+        if header == _NEG:
+            return NEGATIVE
+        if header == _ZLIB:
+            payload = zlib.decompress(payload)
+        value = pickle.loads(payload)
+        return self.unpack(value) if self.unpack else value
+
+    def _count(self, tier: str, result: str, count: int = 1):
+        if count:
+            geo_cache_requests.inc(count, cache=self.name, tier=tier, result=result)
+
+    def get(self, key: str):
+        """The cached value, NEGATIVE for a cached miss, or None if unknown."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.l1.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._count("l1", "hit", sum(1 for v in found.values() if v is not NEGATIVE))
+        self._count("l1", "negative", sum(1 for v in found.values() if v is NEGATIVE))
+        self._count("l1", "miss", len(missing))
+
+        l2 = self.l2
+        if not missing or l2 is None:
+            return found
+        try:
+            raw_values = l2.get_many(missing)
+        except Exception as e:
+            # A shared-cache outage degrades to upstream calls, never to errors.
+            logger.warning(f"[GEO CACHE] {self.name} L2 read failed: {e}")
+            raw_values = {}
+        for key, raw in raw_values.items():
+            try:
+                value = self._loads(raw)
+            except Exception as e:
+                logger.warning(f"[GEO CACHE] Dropping unreadable {self.name} entry {key}: {e}")
+                continue
+            found[key] = value
+            self.l1.set(key, value, GEO_L1_TTL)
+        self._count("l2", "hit", sum(1 for k in raw_values if found.get(k) not in (None, NEGATIVE)))
+        self._count("l2", "negative", sum(1 for k in raw_values if found.get(k) is NEGATIVE))
+        self._count("l2", "miss", len(missing) - len(raw_values))
+        return found
+
+    def set(self, key: str, value, timeout: float):
+        self.set_many({key: value}, timeout)
+
+    def set_many(self, values: Dict[str, Any], timeout: float):
+        l1_ttl = self._l1_ttl(timeout)
+        for key, value in values.items():
+            self.l1.set(key, value, l1_ttl)
+        l2 = self.l2
+        if l2 is None:
+            return
+        try:
+            l2.set_many({key: self._dumps(value) for key, value in values.items()}, timeout)
+        except Exception as e:
+            logger.warning(f"[GEO CACHE] {self.name} L2 write failed: {e}")
+
+    def set_negative(self, key: str, timeout: float = GEO_NEGATIVE_TTL):
+        self.set(key, NEGATIVE, timeout)
+
+    def clear_local(self):
+        self.l1.clear()
+
+
+_caches: Dict[str, TieredGeoCache] = {}
+
+
+register_gauge(
+    "trip_geo_cache_l1_entries",
+    "Entries held in each in-process (L1) geo cache.",
+    lambda: {(("cache", name),): len(c.l1) for name, c in _caches.items()},
+)
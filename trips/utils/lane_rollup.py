@@ -0,0 +1,150 @@
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LANE_ROLLUP = "lane_stats"
+ROLLUP_BATCH_SIZE = int(os.getenv("LANE_ROLLUP_BATCH_SIZE", 1000))
+ROLLUP_MAX_BATCHES = int(os.getenv("LANE_ROLLUP_MAX_BATCHES", 50))  # per run
+# Trips younger than this are left for the next run, so rows from transactions
+# that commit slightly out of id order are not skipped by the watermark.
+ROLLUP_SETTLE_SECONDS = int(os.getenv("LANE_ROLLUP_SETTLE_SECONDS", 60))
+
+LANE_FIELDS = ("pickup_location", "dropoff_location")
+SUM_FIELDS = ("total_distance_km", "total_trip_hours", "total_days", "current_cycle_used")
+
+
+def _empty_delta():
+    return {
+        "trip_count": 0,
+        "total_distance_km": 0.0,
+        "total_trip_hours": 0.0,
+        "total_days": 0,
+        "days_count": 0,
+        "total_cycle_used": 0.0,
+        "last_trip_at": None,
+    }
+
+
+def _add(delta: Dict, trip: Dict):
+    delta["trip_count"] += 1
+    delta["total_distance_km"] += trip["total_distance_km"] or 0.0
+    delta["total_trip_hours"] += trip["total_trip_hours"] or 0.0
+    # total_days is NULL on trips created before it was recorded; leave them out of avg_days.
+    if trip["total_days"] is not None:
+        delta["total_days"] += trip["total_days"]
+        delta["days_count"] += 1
+    delta["total_cycle_used"] += trip["current_cycle_used"] or 0.0
+    if delta["last_trip_at"] is None or trip["created_at"] > delta["last_trip_at"]:
+        delta["last_trip_at"] = trip["created_at"]
+
+
+def _apply(model, key: Dict, delta: Dict):
+    updated = model.objects.filter(**key).update(
+        trip_count=F("trip_count") + delta["trip_count"],
+        total_distance_km=F("total_distance_km") + delta["total_distance_km"],
+        total_trip_hours=F("total_trip_hours") + delta["total_trip_hours"],
+        total_days=F("total_days") + delta["total_days"],
+        days_count=F("days_count") + delta["days_count"],
+        total_cycle_used=F("total_cycle_used") + delta["total_cycle_used"],
+        last_trip_at=delta["last_trip_at"],
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        model.objects.create(**key, **delta)
+
+
+def _settled(rows: List[Dict], cutoff) -> List[Dict]:
+    """Rows up to (not including) the first one that is still too new."""
+    for index, row in enumerate(rows):
+        if row["created_at"] > cutoff:
+            return rows[:index]
+    return rows
+
+
+def _rollup_batch(batch_size: int) -> int:
+    from ..models import LaneDailyStats, LaneStats, RollupWatermark, Trip
+
+    with transaction.atomic():
+        # The row lock keeps two workers from folding the same trips in twice.
+        RollupWatermark.objects.get_or_create(name=LANE_ROLLUP)
+        watermark = RollupWatermark.objects.select_for_update().get(name=LANE_ROLLUP)
+
+        rows = list(
+            Trip.objects.filter(id__gt=watermark.last_trip_id)
+            .order_by("id")
+            .values("id", "created_at", *LANE_FIELDS, *SUM_FIELDS)[:batch_size]
+        )
+        rows = _settled(rows, timezone.now() - timedelta(seconds=ROLLUP_SETTLE_SECONDS))
+        if not rows:
+            return 0
+
+        lanes = defaultdict(_empty_delta)
+        days = defaultdict(_empty_delta)
+        for row in rows:
+            lane = (row["pickup_location"], row["dropoff_location"])
+            _add(lanes[lane], row)
+            _add(days[lane + (timezone.localdate(row["created_at"]),)], row)
+
+        for (pickup, dropoff), delta in lanes.items():
+            _apply(LaneStats, {"pickup_location": pickup, "dropoff_location": dropoff}, delta)
+        for (pickup, dropoff, date), delta in days.items():
+            _apply(
+                LaneDailyStats,
+                {"pickup_location": pickup, "dropoff_location": dropoff, "date": date},
+                delta,
+            )
+
+        watermark.last_trip_id = rows[-1]["id"]
+        watermark.save(update_fields=["last_trip_id", "updated_at"])
+    return len(rows)
+
+
+def rollup_new_trips(batch_size: int = None, max_batches: int = None) -> Dict:
+    """Fold trips created since the watermark into LaneStats / LaneDailyStats."""
+    batch_size = batch_size or ROLLUP_BATCH_SIZE
+    max_batches = max_batches or ROLLUP_MAX_BATCHES
+    processed = batches = 0
+    while batches < max_batches:
+        count = _rollup_batch(batch_size)
+        if not count:
+            break
+        processed += count
+        batches += 1
+        if count < batch_size:
+            break
+    if processed:
+        logger.info(f"[LANE ROLLUP] Folded {processed} trips in {batches} batches")
+    return {"processed": processed, "batches": batches}
+
+
+def lane_summary(pickup: str, dropoff: str, days: int = 30) -> Optional[Dict]:
+    from ..models import LaneDailyStats, LaneStats
+
+    lane = LaneStats.objects.filter(pickup_location=pickup, dropoff_location=dropoff).first()
+    if lane is None:
+        return None
+    since = timezone.localdate() - timedelta(days=days - 1)
+    daily = LaneDailyStats.objects.filter(
+        pickup_location=pickup, dropoff_location=dropoff, date__gte=since
+    ).order_by("date")
+    return {
+        **lane.averages(),
+        "daily": [
+            {"date": day.date, **{k: v for k, v in day.averages().items() if k not in LANE_FIELDS}}
+            for day in daily
+        ],
+    }
+
+
+def top_lanes(limit: int = 50) -> List[Dict]:
+    from ..models import LaneStats
+
+    return [lane.averages() for lane in LaneStats.objects.order_by("-trip_count")[:limit]]
@@ -0,0 +1,251 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Every gunicorn worker is its own process with its own metrics. With
+# PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py), counters and histograms
+# are also written through prometheus_client's multiprocess mode, callback
+# gauges are sampled into it, and /metrics reports the sum over all workers.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+GAUGE_SAMPLE_INTERVAL = float(os.getenv("METRICS_GAUGE_SAMPLE_INTERVAL", 5))
+
+prometheus_client = None
+if PROMETHEUS_MULTIPROC_DIR:
+    try:
+        import prometheus_client
+        import prometheus_client.multiprocess
+    except ImportError:
+        logger.warning(
+            "[METRICS] PROMETHEUS_MULTIPROC_DIR is set but prometheus_client is not installed; "
+            "/metrics only covers the process that answers it."
+        )
+
+# Per-request list of (name, seconds) used for the Server-Timing header.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = (
+    contextvars.ContextVar("trip_request_timings", default=None)
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+_shared_lock = threading.Lock()
+
+
+def _shared(metric, factory, labels: Dict, **kwargs):
+    """The prometheus_client twin of `metric`, created on first use with its label names."""
+    if metric._shared is None:
+        with _shared_lock:
+            if metric._shared is None:
+                metric._shared = factory(
+                    metric.name, metric.help, sorted(labels), registry=None, **kwargs
+                )
+    return metric._shared.labels(**labels) if labels else metric._shared
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        self._shared = None
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+        if prometheus_client is not None:
+            _shared(self, prometheus_client.Counter, labels).inc(amount)
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[tuple, float]]):
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+        self._shared = None
+
+    def sample(self):
+        """Copy the current values into the multiprocess store, summed over live workers."""
+        for labels, value in self.collect().items():
+            _shared(self, prometheus_client.Gauge, dict(labels), multiprocess_mode="livesum").set(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = self.collect()
+        except Exception as e:
+            logger.warning(f"[METRICS] Gauge {self.name} failed to collect: {e}")
+            samples = {}
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._shared = None
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+        if prometheus_client is not None:
+            _shared(self, prometheus_client.Histogram, labels, buckets=self.buckets).observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    bucket_labels = labels + (("le", str(bound)),)
+                    lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {count}")
+                inf_labels = labels + (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_format_labels(inf_labels)} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._sampler = None
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        if prometheus_client is not None and isinstance(metric, Gauge) and self._sampler is None:
+            # Gauges are read from callbacks, so each worker has to push its own values.
+            self._sampler = threading.Thread(
+                target=self._sample_forever, name="trip-metrics-sampler", daemon=True
+            )
+            self._sampler.start()
+        return metric
+
+    def sample_gauges(self):
+        for metric in self._metrics:
+            if isinstance(metric, Gauge):
+                try:
+                    metric.sample()
+                except Exception as e:
+                    logger.warning(f"[METRICS] Gauge {metric.name} failed to sample: {e}")
+
+    def _sample_forever(self):
+        while True:
+            time.sleep(GAUGE_SAMPLE_INTERVAL)
+            self.sample_gauges()
+
+    def render(self) -> str:
+        if prometheus_client is not None:
+            self.sample_gauges()
+            collected = prometheus_client.CollectorRegistry()
+            prometheus_client.multiprocess.MultiProcessCollector(collected)
+            return prometheus_client.generate_latest(collected).decode("utf-8")
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_duration = registry.register(
+    Histogram("trip_stage_duration_seconds", "Time spent in each trip pipeline stage.")
+)
+cache_requests = registry.register(
+    Counter("trip_cache_requests_total", "Cache lookups by cache and result (hit/miss).")
+)
+admission_rejections = registry.register(
+    Counter("trip_admission_rejections_total", "Requests rejected by stage admission control.")
+)
+
+
+def record_cache(cache_name: str, hit: bool, count: int = 1):
+    if count:
+        cache_requests.inc(count, cache=cache_name, result="hit" if hit else "miss")
+
+
+def register_gauge(name: str, help_text: str, collect: Callable[[], Dict[tuple, float]]):
+    return registry.register(Gauge(name, help_text, collect))
+
+
+_executors = {}
+
+
+def register_executor(name: str, executor):
+    """Expose a ThreadPoolExecutor's backlog as trip_executor_queue_depth{executor=name}."""
+    _executors[name] = executor
+
+
+register_gauge(
+    "trip_executor_queue_depth",
+    "Work items waiting for a free executor thread.",
+    lambda: {(("executor", name),): ex._work_queue.qsize() for name, ex in _executors.items()},
+)
+
+
+@contextmanager
+def timed(name: str):
+    """Time a block into the stage histogram and the current request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_duration.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Begin collecting Server-Timing entries for the current request context."""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in timings)
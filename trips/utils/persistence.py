@@ -0,0 +1,108 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# No Celery/Redis at all: set for serverless deployments (see vercel.json).
+TRIP_BROKER_FREE = os.getenv("TRIP_BROKER_FREE", "false").lower() in ("1", "true", "yes")
+# buffer   - Redis list drained by the flush_trip_buffer Celery beat task
+# direct   - write in the request's persist stage
+# deferred - in-process background writer, bulk-flushed every few seconds
+# Buffering only by default when a broker is configured: without a beat process
+# draining it, buffered trips would never reach the database.
+BROKER_CONFIGURED = bool(os.getenv("TRIP_BUFFER_URL") or os.getenv("CELERY_BROKER_URL"))
+TRIP_PERSISTENCE = os.getenv(
+    "TRIP_PERSISTENCE", "buffer" if BROKER_CONFIGURED and not TRIP_BROKER_FREE else "direct"
+)
+DEFERRED_FLUSH_SECONDS = float(os.getenv("TRIP_DEFERRED_FLUSH_SECONDS", 2))
+DEFERRED_BATCH_SIZE = int(os.getenv("TRIP_DEFERRED_BATCH_SIZE", 200))
+
+if TRIP_PERSISTENCE not in ("buffer", "direct", "deferred"):
+    raise ValueError(f"TRIP_PERSISTENCE must be buffer, direct or deferred, not {TRIP_PERSISTENCE!r}")
+
+
+class DeferredTripWriter:
+    """
+    Collects trip records in memory and bulk-writes them from a daemon thread.
+
+    Trades durability for request latency: records still queued when the
+    process dies are lost, which is why it flushes on a short interval and at
+    interpreter exit. Serverless platforms may freeze the process after the
+    response, so prefer "direct" there.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, record: Dict):
+        self._ensure_started()
+        self._queue.put(record)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trip-deferred-writer", daemon=True
+                    )
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            self._write([first] + self._drain(self.batch_size - 1))
+
+    def _drain(self, limit: int):
+        records = []
+        while len(records) < limit:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def _write(self, records):
+        from .trip_buffer import write_trips
+
+        try:
+            write_trips(records)
+        except Exception as e:
+            logger.error(f"[PERSIST] Deferred write of {len(records)} trips failed: {e}")
+        finally:
+            from django.db import connection
+
+            # This thread outlives any request, so close its connection between batches.
+            connection.close()
+
+    def flush(self):
+        while records := self._drain(self.batch_size):
+            self._write(records)
+
+
+_deferred_writer = DeferredTripWriter(DEFERRED_FLUSH_SECONDS, DEFERRED_BATCH_SIZE)
+
+
+def persist_trip(trip_record: Dict):
+    """Hand a trip record to whichever persistence path TRIP_PERSISTENCE selects."""
+    if TRIP_PERSISTENCE == "direct":
+        from .trip_buffer import write_trips
+
+        write_trips([trip_record])
+    elif TRIP_PERSISTENCE == "deferred":
+        _deferred_writer.put(trip_record)
+    else:
+        from .trip_buffer import buffer_trip
+
+        buffer_trip(trip_record)
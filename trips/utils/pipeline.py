@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from .metrics import register_executor, timed
+from .profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+# Blocking network calls (Nominatim, broker publishes) and CPU-bound work
+# (PIL rendering, PDF merging) get separate pools so a burst of one cannot
+# starve the other.
+io_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="trip-io")
+cpu_executor = ThreadPoolExecutor(
+    max_workers=max(2, os.cpu_count() or 1), thread_name_prefix="trip-cpu"
+)
+
+EXECUTORS = {"io": io_executor, "cpu": cpu_executor}
+
+register_executor("io", io_executor)
+register_executor("cpu", cpu_executor)
+
+
+def run_with_db(func, *args):
+    """
+    Run ORM work on a pool thread. Django only recycles connections at request
+    boundaries, which pool threads never see, so stale or broken connections
+    are dropped before and after the work (as DeferredTripWriter does).
+    """
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails; keeps the original error as __cause__."""
+
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+        super().__init__(str(error) or error.__class__.__name__)
+
+
+class StageTimeout(StageError):
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(stage, TimeoutError(f"Stage '{stage}' timed out after {timeout}s"))
+
+
+class Stage:
+    """
+    One step of the trip pipeline.
+
+    `func` receives a dict with the results of the stages named in `requires`.
+    Coroutine functions run on the event loop; plain functions run on the loop
+    when `executor` is "inline", otherwise on the "io" or "cpu" pool. An
+    optional `limiter` (see trips.utils.admission) gates entry to the stage;
+    the timeout only covers the work itself, not the admission wait. A thread
+    cannot be stopped, so pool work keeps its slot until it really finishes,
+    even after the stage has timed out or been cancelled. Pool stages that use
+    the ORM set `db` so their thread's connection is recycled (`run_with_db`).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        requires: Iterable[str] = (),
+        executor: str = "inline",
+        timeout: Optional[float] = None,
+        limiter=None,
+        db: bool = False,
+    ):
+        if executor not in ("inline", *EXECUTORS):
+            raise ValueError(f"Unknown executor '{executor}' for stage '{name}'")
+        if db and executor == "inline":
+            raise ValueError(f"Stage '{name}' uses the database and must run on the io or cpu pool")
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.executor = executor
+        self.timeout = timeout
+        self.limiter = limiter
+        self.db = db
+
+    async def run(self, inputs: Dict[str, Any]):
+        if self.limiter is not None:
+            await self.limiter.enter()
+        release = self.limiter.release if self.limiter is not None else None
+        try:
+            with timed(self.name):
+                if asyncio.iscoroutinefunction(self.func):
+                    coro = self.func(inputs)
+                elif self.executor == "inline":
+                    return self.func(inputs)
+                else:
+                    # Carry the request context (Server-Timing collection, profiling) into the thread.
+                    context = contextvars.copy_context()
+                    func = functools.partial(run_with_db, self.func) if self.db else self.func
+                    future = EXECUTORS[self.executor].submit(
+                        functools.partial(context.run, run_profiled, self.name, func, inputs)
+                    )
+                    if release is not None:
+                        # The pool thread owns the slot from here on.
+                        future.add_done_callback(lambda _: self.limiter.release())
+                        release = None
+                    coro = asyncio.wrap_future(future)
+
+                if self.timeout is None:
+                    return await coro
+                try:
+                    return await asyncio.wait_for(coro, self.timeout)
+                except asyncio.TimeoutError:
+                    raise StageTimeout(self.name, self.timeout)
+        finally:
+            if release is not None:
+                release()
+
+
+def prune_stages(stages: Iterable[Stage], targets: Iterable[str]) -> list:
+    """Keep only the target stages and everything they (transitively) depend on."""
+    by_name = {stage.name: stage for stage in stages}
+    needed = set()
+    pending = [name for name in targets if name in by_name]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(by_name[name].requires)
+    return [stage for stage in by_name.values() if stage.name in needed]
+
+
+async def run_stages(
+    stages: Iterable[Stage], initial: Dict[str, Any] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run stages as a dependency graph, starting each one as soon as its inputs
+    are ready, and yield (stage_name, result) in completion order.
+
+    The first failing stage cancels everything still running and is re-raised
+    as StageError.
+    """
+    results = dict(initial or {})
+    waiting = {stage.name: stage for stage in stages}
+    running = {}
+
+    for stage in waiting.values():
+        unknown = [dep for dep in stage.requires if dep not in waiting and dep not in results]
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' requires unknown stages: {unknown}")
+
+    def start_ready():
+        for name in [n for n, s in waiting.items() if all(d in results for d in s.requires)]:
+            stage = waiting.pop(name)
+            inputs = {dep: results[dep] for dep in stage.requires}
+            task = asyncio.ensure_future(stage.run(inputs))
+            running[task] = stage
+
+    try:
+        start_ready()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                try:
+                    results[stage.name] = task.result()
+                except StageError:
+                    raise
+                except Exception as e:
+                    raise StageError(stage.name, e) from e
+                logger.debug(f"[PIPELINE] Stage '{stage.name}' finished")
+                yield stage.name, results[stage.name]
+            start_ready()
+
+        if waiting:
+            raise ValueError(f"Stages with unsatisfiable dependencies: {list(waiting)}")
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,50 @@
+from typing import List, Sequence
+
+# ORS returns geometries at 5 decimal places (~1 m), so this is lossless for them.
+POLYLINE_PRECISION = 5
+
+
+def encode_polyline(coordinates: Sequence[Sequence[float]], precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode [lon, lat] pairs (GeoJSON order, as our route geometries are stored)
+    with the Google polyline algorithm. Consecutive points become small deltas,
+    typically 4-8 bytes per point instead of ~40 as JSON.
+    """
+    factor = 10**precision
+    output = []
+    prev_lat = prev_lon = 0
+    for point in coordinates:
+        lat = int(round(point[1] * factor))
+        lon = int(round(point[0] * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = lat, lon
+    return "".join(output)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[List[float]]:
+    """Inverse of encode_polyline; returns [lon, lat] pairs."""
+    factor = 10**precision
+    coordinates = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coordinates.append([lon / factor, lat / factor])
+    return coordinates
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("TRIP_PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_SAMPLE_RATE = float(os.getenv("TRIP_PROFILING_SAMPLE_RATE", 0))
+# When set, the X-Trip-Profile header must carry this value to trigger a profile.
+PROFILING_TOKEN = os.getenv("TRIP_PROFILING_TOKEN")
+PROFILING_INTERVAL = float(os.getenv("TRIP_PROFILING_INTERVAL_MS", 5)) / 1000
+PROFILE_DIR = os.getenv("TRIP_PROFILE_DIR", "/tmp/trip_profiles")
+PROFILE_RETENTION = int(os.getenv("TRIP_PROFILE_RETENTION", 50))
+
+PROFILE_HEADER = "X-Trip-Profile"
+PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("trip_profile", default=None)
+
+
+class RequestProfile:
+    """
+    Stack-sampling profiler for one request.
+
+    cProfile only sees the thread that enabled it (and on 3.12+ only one can be
+    active per process), while a trip spends most of its time on the io/cpu
+    executor threads. Instead, a sampler thread periodically records the stacks
+    of every thread currently doing work for this request and writes them in
+    the collapsed-stack format that flamegraph.pl / speedscope read directly.
+
+    Under ASGI the request runs on the event loop thread, which every request
+    in flight shares, so only the pool threads tagged for this request (see
+    `run_profiled`) are sampled there; coroutine time on the loop is not in
+    the profile. A synchronous request thread is sampled as "request".
+    """
+
+    def __init__(self, profile_id: str, meta: Dict, sample_request_thread: bool = True):
+        self.profile_id = profile_id
+        self.meta = meta
+        self.samples = Counter()
+        self.path = None
+        self._threads = {threading.get_ident(): "request"} if sample_request_thread else {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(
+            target=self._run, name=f"trip-profile-{profile_id}", daemon=True
+        )
+
+    def start(self):
+        self._sampler.start()
+
+    def add_thread(self, label: str):
+        with self._lock:
+            self._threads[threading.get_ident()] = label
+
+    def remove_thread(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while not self._stop.wait(PROFILING_INTERVAL):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, label in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapse(frame, label)] += 1
+        # Saved from the sampler thread, so finish() never blocks the caller on file I/O.
+        self.meta.update({"samples": sum(self.samples.values()), "interval_ms": PROFILING_INTERVAL * 1000})
+        try:
+            self.path = _save_profile(self.profile_id, self.samples, self.meta)
+        except OSError as e:
+            logger.warning(f"[PROFILE] Failed to save profile {self.profile_id}: {e}")
+
+    def finish(self, status: int = None):
+        """Stop sampling; the profile is saved in the background. Safe to call on an event loop."""
+        if not self._stop.is_set():
+            self.meta.update(
+                {"duration_ms": round((time.perf_counter() - self._started) * 1000, 1), "status": status}
+            )
+            self._stop.set()
+
+    def stop(self, status: int = None) -> Optional[str]:
+        """Stop sampling and wait for the profile to be saved; returns the collapsed-stack path."""
+        self.finish(status)
+        self._sampler.join()
+        return self.path
+
+
+def _collapse(frame, label: str) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    parts.append(label)
+    return ";".join(reversed(parts))
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def should_profile(request) -> bool:
+    if not PROFILING_ENABLED:
+        return False
+    header = request.headers.get(PROFILE_HEADER)
+    if header is not None:
+        return PROFILING_TOKEN is None or header == PROFILING_TOKEN
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def start_profile(request) -> Optional[RequestProfile]:
+    """Begin profiling this request if the setting plus header/sampling allow it."""
+    if not should_profile(request):
+        return None
+    # Ids are always generated here: a client-chosen id could overwrite or guess
+    # another request's profile. X-Request-ID is only kept for correlation.
+    profile_id = uuid.uuid4().hex
+    meta = {
+        "id": profile_id,
+        "path": request.path,
+        "started_at": time.time(),
+        "trigger": "header" if PROFILE_HEADER in request.headers else "sample",
+    }
+    request_id = request.headers.get("X-Request-ID", "")
+    if PROFILE_ID_RE.match(request_id):
+        meta["request_id"] = request_id
+    on_event_loop = _on_event_loop()
+    meta["event_loop_sampled"] = not on_event_loop
+    profile = RequestProfile(profile_id, meta, sample_request_thread=not on_event_loop)
+    _active_profile.set(profile)
+    profile.start()
+    logger.info(f"[PROFILE] Profiling request {profile_id}")
+    return profile
+
+
+def run_profiled(label: str, func, *args):
+    """Run func on the current (executor) thread, sampling it if its request is profiled."""
+    profile = _active_profile.get()
+    if profile is None:
+        return func(*args)
+    profile.add_thread(label)
+    try:
+        return func(*args)
+    finally:
+        profile.remove_thread()
+
+
+# ------------------------------------------------------------------ storage
+
+
+def _save_profile(profile_id: str, samples: Counter, meta: Dict) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.collapsed")
+    with open(path, "w") as fh:
+        for stack, count in samples.most_common():
+            fh.write(f"{stack} {count}\n")
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as fh:
+        json.dump(meta, fh)
+    _enforce_retention()
+    logger.info(f"[PROFILE] Saved {meta['samples']} samples to {path}")
+    return path
+
+
+def _enforce_retention():
+    profiles = list_profiles()
+    for meta in profiles[PROFILE_RETENTION:]:
+        delete_profile(meta["id"])
+
+
+def list_profiles() -> List[Dict]:
+    """Saved profile metadata, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda meta: meta.get("started_at", 0), reverse=True)
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.collapsed")
+    return path if os.path.exists(path) else None
+
+
+def delete_profile(profile_id: str):
+    for ext in ("collapsed", "json"):
+        try:
+            os.remove(os.path.join(PROFILE_DIR, f"{profile_id}.{ext}"))
+        except OSError:
+            pass
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+
+from .eld_timeline import log_date
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_TIMEOUT = int(os.getenv("TRIP_RESULT_CACHE_TIMEOUT", 60 * 15))  # 15 minutes
+# Still queue the Trip DB record when a response is served from cache.
+RESULT_CACHE_LOG_HITS = os.getenv("TRIP_RESULT_CACHE_LOG_HITS", "true").lower() in ("1", "true", "yes")
+
+# Request fields that change the response body; anything else is ignored.
+RESULT_KEY_FIELDS = (
+    "pickup_location",
+    "dropoff_location",
+    "current_location",
+    "current_cycle_used",
+    "eld_format",
+    "eld_compact",
+    "include_pdf_base64",
+)
+
+
+def _normalize_place(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def result_cache_key(data: Dict, include: Iterable[str], host: str, media_type: str = "application/json") -> str:
+    """Canonical hash of the normalized request body, requested outputs, host and response format."""
+    canonical = {field: data.get(field) for field in RESULT_KEY_FIELDS}
+    for field in ("pickup_location", "dropoff_location", "current_location"):
+        canonical[field] = _normalize_place(canonical[field])
+    canonical["current_cycle_used"] = float(canonical["current_cycle_used"] or 0)
+    canonical["eld_format"] = canonical["eld_format"] or "png"
+    canonical["include_pdf_base64"] = bool(canonical["include_pdf_base64"])
+    canonical["include"] = sorted(include)
+    # Artifact URLs in the body are absolute, so they depend on the host.
+    canonical["host"] = host
+    canonical["media_type"] = media_type
+    # ELD sheets are stamped with today's date, so yesterday's response is not reused.
+    canonical["log_date"] = log_date()
+
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return "trip-result:" + hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def get_cached_result(key: str) -> Optional[Dict]:
+    """Return {"etag", "body", "trip_record"} for a cached response, or None."""
+    entry = cache.get(key)
+    record_cache("trip_result", hit=entry is not None)
+    if entry is not None:
+        logger.info(f"[CACHE HIT] Trip result {key}")
+    return entry
+
+
+def set_cached_result(key: str, body: bytes, trip_record: Optional[Dict]) -> str:
+    etag = body_etag(body)
+    cache.set(
+        key,
+        {"etag": etag, "body": body, "trip_record": trip_record},
+        RESULT_CACHE_TIMEOUT,
+    )
+    logger.info(f"[CACHE MISS] Trip result cached {key}")
+    return etag
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(request, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so compressed (W/) variants still match."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    return if_none_match.strip() == "*" or _opaque(etag) in [
+        _opaque(t.strip()) for t in if_none_match.split(",")
+    ]
@@ -1,12 +1,13 @@
 import asyncio
 import os
 import logging
-import requests
-import openrouteservice
-from django.core.cache import cache
 from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from .geo_cache import GEO_L1_MAX_ROUTES, NEGATIVE, TieredGeoCache
+from .metrics import record_cache, register_executor
+from .polyline import decode_polyline, encode_polyline
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -18,9 +19,35 @@ ROUTE_URL = os.getenv("ROUTE_URL")
 executor = ThreadPoolExecutor(max_workers=10)
 CACHE_TIMEOUT = 60 * 60 * 5  # 5 hours
 
+register_executor("geo", executor)
+
+
+class GeocodeNotFound(ValueError):
+    """The geocoder answered but knows no such place; cached so typos don't re-hit ORS."""
+
+
+def _pack_route(route):
+    geometry, distance_km, duration_hr = route
+    return encode_polyline(geometry), distance_km, duration_hr
+
+
+def _unpack_route(packed):
+    polyline, distance_km, duration_hr = packed
+    return decode_polyline(polyline), distance_km, duration_hr
+
+
+geocode_cache = TieredGeoCache("geocode")
+# Geometries dominate memory, so far fewer routes than points are kept in-process.
+route_cache = TieredGeoCache(
+    "route", max_entries=GEO_L1_MAX_ROUTES, pack=_pack_route, unpack=_unpack_route
+)
+matrix_cache = TieredGeoCache("matrix")
+
 
 def _geocode_sync(place_name: str):
     """Sync geocode helper for executor."""
+    import requests
+
     logger.info(f"[GEOCODE] Attempting geocode for: {place_name}")
     params = {"api_key": ORS_API_KEY, "text": place_name, "size": 1}
 
@@ -36,7 +63,7 @@ def _geocode_sync(place_name: str):
 
     if not data.get("features"):
         logger.error(f"[GEOCODE] No features found for {place_name}. Full response: {data}")
-        raise ValueError(f"Could not geocode: {place_name}")
+        raise GeocodeNotFound(f"Could not geocode: {place_name}")
 
     lon, lat = data["features"][0]["geometry"]["coordinates"]
     logger.info(f"[GEOCODE] {place_name} → lat={lat}, lon={lon}")
@@ -49,16 +76,27 @@ async def geocode_place_cached(place_name: str):
     safe_key = f"geocode:{place_name.lower().replace(' ', '_').replace(':', '_')}"
     logger.debug(f"[CACHE] Using key: {safe_key}")
 
-    if coords := cache.get(safe_key):
+    coords = geocode_cache.get(safe_key)
+    if coords is NEGATIVE:
+        record_cache("geocode", hit=True)
+        raise GeocodeNotFound(f"Could not geocode: {place_name}")
+    if coords:
+        record_cache("geocode", hit=True)
         logger.info(f"[CACHE HIT] Geocode {place_name} → {coords}")
         return coords
 
+    record_cache("geocode", hit=False)
     loop = asyncio.get_running_loop()
     try:
         coords = await loop.run_in_executor(executor, _geocode_sync, place_name)
-        cache.set(safe_key, coords, CACHE_TIMEOUT)
+        geocode_cache.set(safe_key, coords, CACHE_TIMEOUT)
         logger.info(f"[CACHE MISS] Geocode {place_name} cached → {coords}")
         return coords
+    except GeocodeNotFound:
+        # Network errors are not cached; an unknown place is, briefly.
+        geocode_cache.set_negative(safe_key)
+        logger.warning(f"[GEOCODE] No match for {place_name}, cached as negative")
+        raise
     except Exception as e:
         logger.exception(f"[ERROR] Geocoding failed for {place_name}: {e}")
         raise
@@ -66,6 +104,8 @@ async def geocode_place_cached(place_name: str):
 
 def _route_sync(start_coords, end_coords):
     """Sync route fetcher for executor."""
+    import requests
+
     logger.info(f"[ROUTE] Fetching route between {start_coords} → {end_coords}")
     body = {
         "coordinates": [
@@ -95,7 +135,8 @@ def _route_sync(start_coords, end_coords):
     summary = route["summary"]
     distance_km = summary["distance"] / 1000
     duration_hr = summary["duration"] / 3600
-    geometry = openrouteservice.convert.decode_polyline(route["geometry"])["coordinates"]
+    # Same [lon, lat] output as openrouteservice.convert.decode_polyline, without importing the SDK.
+    geometry = decode_polyline(route["geometry"])
 
     logger.info(
         f"[ROUTE] Route summary: distance={distance_km:.2f} km, duration={duration_hr:.2f} hr"
@@ -104,19 +145,28 @@ def _route_sync(start_coords, end_coords):
     return geometry, distance_km, duration_hr
 
 
+def matrix_cell_key(start_coords, end_coords) -> str:
+    """Cache key of one (distance_km, duration_hr) cell, shared by trips and matrices."""
+    return "matrix:{:.5f},{:.5f}:{:.5f},{:.5f}".format(*start_coords, *end_coords)
+
+
 async def route_with_cache(start_coords, end_coords):
     """Async + cached routing."""
     cache_key = f"route:{start_coords}:{end_coords}".replace(" ", "_")
     logger.debug(f"[CACHE] Using key: {cache_key}")
 
-    if data := cache.get(cache_key):
+    if data := route_cache.get(cache_key):
+        record_cache("route", hit=True)
         logger.info(f"[CACHE HIT] Route {start_coords} → {end_coords}")
         return data
 
+    record_cache("route", hit=False)
     loop = asyncio.get_running_loop()
     try:
         result = await loop.run_in_executor(executor, _route_sync, start_coords, end_coords)
-        cache.set(cache_key, result, CACHE_TIMEOUT)
+        route_cache.set(cache_key, result, CACHE_TIMEOUT)
+        # Lets the matrix endpoint reuse this leg's distance without another call.
+        matrix_cache.set(matrix_cell_key(start_coords, end_coords), result[1:], CACHE_TIMEOUT)
         logger.info(f"[CACHE MISS] Route cached for {start_coords} → {end_coords}")
         return result
     except Exception as e:
@@ -0,0 +1,186 @@
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from .geohash import encode_geohash, geohash_bounds, geohash_cell_size
+
+logger = logging.getLogger(__name__)
+
+# Routes are indexed by the geohash cells they pass through; precision 5 cells
+# are about 4.9 x 4.9 km, which is also the accuracy of a nearby match.
+ROUTE_INDEX_PRECISION = int(os.getenv("ROUTE_INDEX_PRECISION", 5))
+# Long straight segments have few points, so the geometry is sampled at this
+# step to not skip over cells.
+ROUTE_INDEX_STEP_KM = float(os.getenv("ROUTE_INDEX_STEP_KM", 1.0))
+ROUTE_INDEX_MAX_CELLS = int(os.getenv("ROUTE_INDEX_MAX_CELLS", 1000))  # cells looked up per query
+ROUTE_NEARBY_MAX_RADIUS_KM = float(os.getenv("ROUTE_NEARBY_MAX_RADIUS_KM", 50))
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+Coords = Tuple[float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def route_cells(geometry: List[List[float]], precision: int = ROUTE_INDEX_PRECISION) -> Dict[str, float]:
+    """{cell: km along the route where it first enters the cell} for a [lon, lat] polyline."""
+    cells = {}
+    if not geometry:
+        return cells
+    position = 0.0
+    lon, lat = geometry[0][:2]
+    cells[encode_geohash(lat, lon, precision)] = 0.0
+    for previous, point in zip(geometry, geometry[1:]):
+        (lon1, lat1), (lon2, lat2) = previous[:2], point[:2]
+        length = haversine_km(lat1, lon1, lat2, lon2)
+        steps = max(1, math.ceil(length / ROUTE_INDEX_STEP_KM))
+        for step in range(1, steps + 1):
+            t = step / steps
+            cells.setdefault(
+                encode_geohash(lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t, precision),
+                position + length * t,
+            )
+        position += length
+    return cells
+
+
+def index_route(route_id: int, geometry: List[List[float]]) -> int:
+    """Write the RouteCell rows of a route."""
+    from ..models import RouteCell
+
+    rows = [
+        RouteCell(route_id=route_id, cell=cell, position_km=round(position, 3))
+        for cell, position in route_cells(geometry).items()
+    ]
+    RouteCell.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def _distance_to_cell_km(lat: float, lon: float, cell: str) -> float:
+    lat_min, lat_max, lon_min, lon_max = geohash_bounds(cell)
+    return haversine_km(lat, lon, min(max(lat, lat_min), lat_max), min(max(lon, lon_min), lon_max))
+
+
+def cells_within(lat: float, lon: float, radius_km: float, precision: int = ROUTE_INDEX_PRECISION) -> Set[str]:
+    """
+    Cells at `precision` with any part within `radius_km` of the point.
+    Raises ValueError if that is more than ROUTE_INDEX_MAX_CELLS.
+    """
+    height, width = geohash_cell_size(precision)
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    rows = math.ceil((2 * dlat) / height) + 1
+    cols = math.ceil((2 * dlon) / width) + 1
+    if rows * cols > ROUTE_INDEX_MAX_CELLS:
+        raise ValueError(f"radius_km={radius_km} covers too many index cells at this latitude.")
+
+    cells = set()
+    for row in range(rows):
+        cell_lat = max(-90.0, min(90.0, lat - dlat + row * height))
+        for col in range(cols):
+            cell_lon = (lon - dlon + col * width + 180.0) % 360.0 - 180.0
+            cell = encode_geohash(cell_lat, cell_lon, precision)
+            if cell not in cells and _distance_to_cell_km(lat, lon, cell) <= radius_km:
+                cells.add(cell)
+    return cells
+
+
+def _nearest(rows, lat: float, lon: float) -> Dict[int, Tuple[float, float]]:
+    """{route_id: (distance_km to P, position_km)} for the closest matched cell of each route."""
+    nearest = {}
+    for route_id, cell, position in rows:
+        distance = _distance_to_cell_km(lat, lon, cell)
+        if route_id not in nearest or distance < nearest[route_id][0]:
+            nearest[route_id] = (distance, position)
+    return nearest
+
+
+def _lane_end(waypoints: str) -> Optional[Coords]:
+    try:
+        lat, lon = waypoints.rsplit(";", 1)[-1].split(",")
+        return float(lat), float(lon)
+    except ValueError:
+        return None
+
+
+def routes_nearby(
+    lat: float,
+    lon: float,
+    radius_km: float,
+    toward: Optional[Coords] = None,
+    limit: int = 50,
+) -> List[Dict]:
+    """
+    Stored routes passing within `radius_km` of (lat, lon), answered from
+    RouteCell: one indexed lookup for the covering cells, then small queries
+    for the matched routes and the trips that used them.
+
+    With `toward`, only routes whose remaining part (from the point of closest
+    approach to the dropoff) ends closer to `toward` than (lat, lon) is are
+    kept, best progress first; otherwise nearest first.
+    """
+    from django.db.models import Count, Max
+
+    from ..models import Route, RouteCell, Trip
+
+    cells = cells_within(lat, lon, radius_km)
+    rows = RouteCell.objects.filter(cell__in=cells).values_list("route_id", "cell", "position_km")
+    nearest = _nearest(rows, lat, lon)
+    if not nearest:
+        return []
+
+    routes = Route.objects.filter(id__in=nearest).only("id", "waypoints", "distance_km", "duration_hr")
+    matches = []
+    for route in routes:
+        distance, position = nearest[route.id]
+        match = {
+            "route_id": route.id,
+            "waypoints": route.waypoints,
+            "distance_from_point_km": round(distance, 2),
+            "km_along_route": round(position, 1),
+            "route_distance_km": route.distance_km,
+            "route_duration_hr": route.duration_hr,
+        }
+        if toward is not None:
+            end = _lane_end(route.waypoints)
+            if end is None:
+                continue
+            progress = haversine_km(lat, lon, *toward) - haversine_km(*end, *toward)
+            if progress <= 0:
+                continue
+            match["progress_toward_km"] = round(progress, 1)
+        matches.append(match)
+
+    if toward is not None:
+        matches.sort(key=lambda m: -m["progress_toward_km"])
+    else:
+        matches.sort(key=lambda m: m["distance_from_point_km"])
+    matches = matches[:limit]
+
+    # Lane names and volume from the trips that used each route.
+    trips = (
+        Trip.objects.filter(route_id__in=[m["route_id"] for m in matches])
+        .values("route_id")
+        .annotate(trip_count=Count("id"), last_trip_id=Max("id"))
+    )
+    by_route = {row["route_id"]: row for row in trips}
+    lanes = {
+        trip["id"]: trip
+        for trip in Trip.objects.filter(id__in=[row["last_trip_id"] for row in by_route.values()]).values(
+            "id", "pickup_location", "dropoff_location", "created_at"
+        )
+    }
+    for match in matches:
+        row = by_route.get(match["route_id"])
+        lane = lanes.get(row["last_trip_id"]) if row else None
+        match["trip_count"] = row["trip_count"] if row else 0
+        match["pickup_location"] = lane["pickup_location"] if lane else None
+        match["dropoff_location"] = lane["dropoff_location"] if lane else None
+        match["last_trip_at"] = lane["created_at"] if lane else None
+    return matches
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .duty_scheduler import generate_duty_blocks
+from .metrics import record_cache
+from .route import CACHE_TIMEOUT, ORS_API_KEY, executor, matrix_cache, matrix_cell_key
+
+logger = logging.getLogger(__name__)
+
+MATRIX_URL = os.getenv("MATRIX_URL", "https://api.openrouteservice.org/v2/matrix/driving-car")
+# Sources x destinations per upstream call; the public ORS plan allows 2500-3500 cells.
+MATRIX_CHUNK_SIZE = int(os.getenv("MATRIX_CHUNK_SIZE", 50))
+MATRIX_CONCURRENCY = int(os.getenv("MATRIX_CONCURRENCY", 4))  # chunk calls in flight per request
+
+Coords = Tuple[float, float]
+
+
+def _matrix_sync(locations: List[Coords], sources: List[int], destinations: List[int]):
+    """One ORS matrix call; returns (distances_km, durations_s) rows for `sources`."""
+    import requests
+
+    logger.info(f"[MATRIX] Fetching {len(sources)}x{len(destinations)} cells")
+    body = {
+        "locations": [[lon, lat] for lat, lon in locations],
+        "sources": sources,
+        "destinations": destinations,
+        "metrics": ["distance", "duration"],
+        "units": "km",
+    }
+    headers = {"Authorization": ORS_API_KEY, "Content-Type": "application/json"}
+
+    try:
+        response = requests.post(MATRIX_URL, headers=headers, json=body, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+    except requests.RequestException as e:
+        logger.error(f"[MATRIX] Request failed: {e}")
+        raise ValueError(f"Failed to retrieve matrix data: {e}")
+
+    if "distances" not in data or "durations" not in data:
+        logger.error(f"[MATRIX] Missing distances/durations. Full response: {data}")
+        raise ValueError("Failed to retrieve matrix data from ORS")
+    return data["distances"], data["durations"]
+
+
+def _chunks(indexes: List[int], size: int):
+    for start in range(0, len(indexes), size):
+        yield indexes[start : start + size]
+
+
+async def matrix_with_cache(origins: Sequence[Coords], destinations: Sequence[Coords]) -> Dict:
+    """
+    Distance (km) and duration (hr) from every origin to every destination.
+
+    Each cell is cached on its own under the same key route_with_cache writes,
+    so cells already known from earlier matrices or trips cost nothing. The
+    missing cells are fetched in MATRIX_CHUNK_SIZE x MATRIX_CHUNK_SIZE blocks,
+    each block asking only for the rows and columns that still have gaps.
+    Unroutable pairs come back as None.
+    """
+    # Repeated points (several loads at one shipper) are looked up and fetched once.
+    unique_origins = list(dict.fromkeys(tuple(point) for point in origins))
+    unique_destinations = list(dict.fromkeys(tuple(point) for point in destinations))
+    keys = {
+        (i, j): matrix_cell_key(origin, destination)
+        for i, origin in enumerate(unique_origins)
+        for j, destination in enumerate(unique_destinations)
+    }
+    found = matrix_cache.get_many(list(keys.values()))
+    cells = {pair: tuple(found[key]) for pair, key in keys.items() if key in found}
+    missing = [pair for pair in keys if pair not in cells]
+    record_cache("matrix", hit=True, count=len(cells))
+    record_cache("matrix", hit=False, count=len(missing))
+
+    blocks = []
+    missing_rows = sorted({i for i, _ in missing})
+    missing_cols = sorted({j for _, j in missing})
+    missing_set = set(missing)
+    for rows in _chunks(missing_rows, MATRIX_CHUNK_SIZE):
+        for cols in _chunks(missing_cols, MATRIX_CHUNK_SIZE):
+            block = [(i, j) for i in rows for j in cols if (i, j) in missing_set]
+            if block:
+                blocks.append((sorted({i for i, _ in block}), sorted({j for _, j in block})))
+
+    semaphore = asyncio.Semaphore(MATRIX_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def fetch(rows, cols):
+        # Identical points are sent once; sources/destinations index into `locations`.
+        locations = list(
+            dict.fromkeys([unique_origins[i] for i in rows] + [unique_destinations[j] for j in cols])
+        )
+        index = {point: n for n, point in enumerate(locations)}
+        async with semaphore:
+            distances, durations = await loop.run_in_executor(
+                executor,
+                _matrix_sync,
+                locations,
+                [index[unique_origins[i]] for i in rows],
+                [index[unique_destinations[j]] for j in cols],
+            )
+        fetched = {}
+        for r, i in enumerate(rows):
+            for c, j in enumerate(cols):
+                distance_km, duration_s = distances[r][c], durations[r][c]
+                fetched[keys[(i, j)]] = (
+                    (None, None)
+                    if distance_km is None or duration_s is None
+                    else (distance_km, duration_s / 3600)
+                )
+                cells[(i, j)] = fetched[keys[(i, j)]]
+        matrix_cache.set_many(fetched, CACHE_TIMEOUT)
+
+    await asyncio.gather(*(fetch(rows, cols) for rows, cols in blocks))
+    if blocks:
+        logger.info(
+            f"[MATRIX] {len(missing)} cells fetched in {len(blocks)} calls, {len(cells) - len(missing)} cached"
+        )
+
+    row_of = {point: i for i, point in enumerate(unique_origins)}
+    col_of = {point: j for j, point in enumerate(unique_destinations)}
+    grid = [
+        [cells[(row_of[tuple(origin)], col_of[tuple(destination)])] for destination in destinations]
+        for origin in origins
+    ]
+    return {
+        "distances_km": [[cell[0] for cell in row] for row in grid],
+        "durations_hr": [[cell[1] for cell in row] for row in grid],
+        "cells": len(keys),
+        "cached": len(keys) - len(missing),
+        "upstream_calls": len(blocks),
+    }
+
+
+@lru_cache(maxsize=4096)
+def _arrival(miles_tenths: int, cycle_tenths: int) -> Optional[Tuple[int, float]]:
+    try:
+        duty_blocks, _ = generate_duty_blocks(
+            current_to_pickup_miles=miles_tenths / 10,
+            pickup_to_dropoff_miles=0,
+            current_cycle_used=cycle_tenths / 10,
+        )
+    except ValueError:
+        return None
+    elapsed = 0.0
+    for block in duty_blocks:
+        if block["activity"] == "on-duty (pickup)":
+            return int(block["day"]), round(elapsed, 2)
+        elapsed += block["hours"]
+    return None
+
+
+def arrival_at_pickup(distance_km: Optional[float], current_cycle_used: float) -> Optional[Dict]:
+    """
+    Day (1-based) on which an HOS-compliant driver reaches the pickup, and the
+    hours elapsed until then including mandated rests. None when unroutable or
+    the driver is already out of cycle hours.
+    """
+    if distance_km is None:
+        return None
+    # Rounded to 0.1 mi / 0.1 h so a large matrix reuses schedules across similar cells.
+    arrival = _arrival(round(distance_km * 0.621371 * 10), round(current_cycle_used * 10))
+    if arrival is None:
+        return None
+    return {"day": arrival[0], "hours_until_pickup": arrival[1]}
@@ -2,9 +2,14 @@ import requests
 import logging
 import os
 from typing import List, Dict, Tuple
+from django.core.cache import cache
+
+from .metrics import record_cache
 
 logger = logging.getLogger(__name__)
 
+STOPS_CACHE_TIMEOUT = 60 * 60 * 5  # 5 hours
+
 
 class SimpleStopsAPI:
     def __init__(self):
@@ -61,6 +66,14 @@ class SimpleStopsAPI:
     def _search_nominatim(self, coords: Tuple, radius: int = 5000) -> List[Dict]:
         """Return top 10 restaurants near the given coordinates using Nominatim."""
         lat, lon = coords
+        # ~100 m grid so nearby lookups on the same corridor share an entry.
+        cache_key = f"stops:{round(lat, 3)}:{round(lon, 3)}:{radius}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            record_cache("stops", hit=True)
+            return cached
+        record_cache("stops", hit=False)
+
         params = {
             "q": "restaurant",
             "format": "json",
@@ -84,6 +97,7 @@ class SimpleStopsAPI:
                         "address": place.get("display_name", ""),
                     }
                     restaurants.append(restaurant)
+                cache.set(cache_key, restaurants, STOPS_CACHE_TIMEOUT)
                 return restaurants
             else:
                 logger.warning(f"Nominatim returned status {response.status_code}")
@@ -0,0 +1,88 @@
+import hashlib
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .polyline import decode_polyline, encode_polyline
+from .route_index import index_route
+
+logger = logging.getLogger(__name__)
+
+ROUTE_ID_CACHE_TIMEOUT = 60 * 60 * 24  # 24 hours
+
+
+def lane_waypoints(waypoints: Sequence[Tuple[float, float]]) -> str:
+    """Canonical "lat,lon;lat,lon;..." form of a lane, rounded to polyline precision."""
+    return ";".join(f"{float(lat):.5f},{float(lon):.5f}" for lat, lon in waypoints)
+
+
+def lane_key(waypoints: Sequence[Tuple[float, float]]) -> str:
+    return hashlib.sha256(lane_waypoints(waypoints).encode("utf-8")).hexdigest()
+
+
+def route_row(
+    waypoints: Sequence[Tuple[float, float]],
+    geometry: List[List[float]],
+    distance_km: float = None,
+    duration_hr: float = None,
+) -> Dict:
+    """
+    The Route row for a lane, carried on the trip record as "route_row" so the
+    request never touches the database; the trip writer stores it.
+    """
+    return {
+        "lane_key": lane_key(waypoints),
+        "waypoints": lane_waypoints(waypoints),
+        "polyline": encode_polyline(geometry),
+        "point_count": len(geometry),
+        "distance_km": distance_km,
+        "duration_hr": duration_hr,
+    }
+
+
+def route_fields(
+    waypoints: Sequence[Tuple[float, float]],
+    geometry: List[List[float]],
+    distance_km: float = None,
+    duration_hr: float = None,
+) -> Dict:
+    """
+    The trip record's route: {"route_id": ...} once the lane's row id is
+    cached, otherwise {"route_row": ...} with the encoded polyline, so the
+    buffered record only carries geometry the first time a lane is seen.
+    """
+    if route_id := cache.get(f"route_id:{lane_key(waypoints)}"):
+        return {"route_id": route_id}
+    return {"route_row": route_row(waypoints, geometry, distance_km, duration_hr)}
+
+
+def save_route(row: Dict) -> int:
+    """Return the id of the Route row for a `route_row`, creating it on first use."""
+    from ..models import Route
+
+    cache_key = f"route_id:{row['lane_key']}"
+    if route_id := cache.get(cache_key):
+        return route_id
+
+    defaults = {field: value for field, value in row.items() if field != "lane_key"}
+    # A Route row is never visible without its RouteCell index, and the id is only
+    # cached once both are committed.
+    with transaction.atomic():
+        route, created = Route.objects.get_or_create(lane_key=row["lane_key"], defaults=defaults)
+        if created:
+            cells = index_route(route.id, decode_polyline(route.polyline))
+            logger.info(f"[ROUTE STORE] Stored lane {route.waypoints} ({route.point_count} points, {cells} cells)")
+        transaction.on_commit(lambda: cache.set(cache_key, route.id, ROUTE_ID_CACHE_TIMEOUT))
+    return route.id
+
+
+def store_route(
+    waypoints: Sequence[Tuple[float, float]],
+    geometry: List[List[float]],
+    distance_km: float = None,
+    duration_hr: float = None,
+) -> int:
+    """Return the id of the Route row for this lane, creating it on first use."""
+    return save_route(route_row(waypoints, geometry, distance_km, duration_hr))
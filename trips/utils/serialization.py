@@ -0,0 +1,155 @@
+import base64
+import gzip
+import json
+import os
+import sys
+from array import array
+from decimal import Decimal
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import Promise
+
+# All three are optional accelerators: without them responses fall back to the
+# stdlib encoder, JSON only, and gzip.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+COMPRESS_MIN_BYTES = int(os.getenv("TRIP_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("TRIP_GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("TRIP_BROTLI_QUALITY", 4))  # 4-5 is gzip-speed with smaller output
+
+
+def _orjson_default(value):
+    if isinstance(value, (Decimal, Promise)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, cls=DjangoJSONEncoder).encode("utf-8")
+
+
+def _pack_geometry(geometry: List[List[float]]) -> Dict:
+    # float32 keeps ~1 m at continental longitudes, the precision ORS returns,
+    # at 8 bytes per point; array() converts in C, unlike a per-value round().
+    values = array("f", chain.from_iterable(geometry))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return {"encoding": "float32le-lonlat", "data": values.tobytes()}
+
+
+def _pack_trip(document: Dict) -> Dict:
+    """Binary-friendly trip document: packed geometry and raw PDF bytes instead of base64."""
+    document = dict(document)
+    summary = document.get("trip_summary")
+    if summary and isinstance(summary.get("geometry"), list):
+        document["trip_summary"] = {**summary, "geometry": _pack_geometry(summary["geometry"])}
+    eld_files = document.get("eld_files")
+    if eld_files and "merged_pdf_base64" in eld_files:
+        eld_files = dict(eld_files)
+        eld_files["merged_pdf"] = base64.b64decode(eld_files.pop("merged_pdf_base64"))
+        document["eld_files"] = eld_files
+    if isinstance(document.get("results"), list):
+        document["results"] = [
+            {**item, "result": _pack_trip(item["result"])} if "result" in item else item
+            for item in document["results"]
+        ]
+    return document
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(_pack_trip(payload), use_bin_type=True, default=_orjson_default)
+
+
+def encode_body(payload, media_type: str) -> bytes:
+    return dumps_msgpack(payload) if media_type == MSGPACK else dumps_json(payload)
+
+
+def _parse_header(value: str) -> List[Tuple[str, float]]:
+    """[(token, q)] from an Accept / Accept-Encoding header."""
+    parsed = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        token, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        parsed.append((token.lower(), q))
+    return parsed
+
+
+def negotiate_media_type(request) -> str:
+    """MessagePack when the client asks for it at least as strongly as JSON."""
+    if msgpack is None:
+        return JSON
+    accept = _parse_header(request.headers.get("Accept", ""))
+    msgpack_q = max((q for token, q in accept if token in MSGPACK_TYPES), default=0.0)
+    json_q = max((q for token, q in accept if token == JSON), default=0.0)
+    return MSGPACK if msgpack_q > 0 and msgpack_q >= json_q else JSON
+
+
+def negotiate_encoding(request) -> Optional[str]:
+    accepted = {token: q for token, q in _parse_header(request.headers.get("Accept-Encoding", ""))}
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(request, response):
+    """
+    gzip/brotli-encode a buffered response body above COMPRESS_MIN_BYTES.
+
+    The ETag is weakened as it then describes the uncompressed representation
+    (If-None-Match uses weak comparison, so revalidation still works).
+    """
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if (
+        response.streaming
+        or response.status_code != 200
+        or response.has_header("Content-Encoding")
+        or len(response.content) < COMPRESS_MIN_BYTES
+    ):
+        return response
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+    if len(compressed) >= len(response.content):
+        return response
+
+    response.content = compressed
+    response["Content-Length"] = str(len(compressed))
+    response["Content-Encoding"] = encoding
+    etag = response.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response["ETag"] = "W/" + etag
+    return response
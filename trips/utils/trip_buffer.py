@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List
+
+from django.db import InterfaceError, OperationalError, transaction
+
+from .route_store import save_route, store_route
+
+logger = logging.getLogger(__name__)
+
+TRIP_BUFFER_URL = os.getenv(
+    "TRIP_BUFFER_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+)
+TRIP_BUFFER_KEY = os.getenv("TRIP_BUFFER_KEY", "trips:buffer")
+TRIP_DEAD_LETTER_KEY = os.getenv("TRIP_DEAD_LETTER_KEY", "trips:dead_letter")
+# Entries being written by a flush; they only leave it once committed (or
+# requeued), so a crashed flush leaves them here to be recovered.
+TRIP_PROCESSING_KEY = os.getenv("TRIP_PROCESSING_KEY", "trips:processing")
+TRIP_FLUSH_LOCK_KEY = os.getenv("TRIP_FLUSH_LOCK_KEY", "trips:flush_lock")
+TRIP_FLUSH_LOCK_TIMEOUT = int(os.getenv("TRIP_FLUSH_LOCK_TIMEOUT", 300))  # longer than any flush
+TRIP_FLUSH_BATCH_SIZE = int(os.getenv("TRIP_FLUSH_BATCH_SIZE", 500))
+TRIP_FLUSH_MAX_BATCHES = int(os.getenv("TRIP_FLUSH_MAX_BATCHES", 20))  # per flush run
+TRIP_FLUSH_MAX_ATTEMPTS = int(os.getenv("TRIP_FLUSH_MAX_ATTEMPTS", 5))
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(TRIP_BUFFER_URL, socket_timeout=5)
+    return _client
+
+
+def buffer_trip(trip_record: Dict):
+    """
+    Queue a trip record for the next bulk flush.
+
+    If the buffer is unreachable the record is written straight to the
+    database instead, so a Redis outage costs latency rather than data.
+    """
+    from redis import RedisError
+
+    entry = json.dumps({"record": trip_record, "attempts": 0})
+    try:
+        get_client().rpush(TRIP_BUFFER_KEY, entry)
+    except RedisError as e:
+        logger.warning(f"[TRIP BUFFER] Buffer unavailable ({e}), writing trip directly")
+        write_trips([trip_record])
+
+
+def _pop_batch(client, size: int) -> List[bytes]:
+    """Move up to `size` entries from the head of the buffer onto the processing list."""
+    with client.pipeline(transaction=False) as pipe:
+        for _ in range(size):
+            pipe.lmove(TRIP_BUFFER_KEY, TRIP_PROCESSING_KEY, "LEFT", "RIGHT")
+        return [raw for raw in pipe.execute() if raw is not None]
+
+
+def _ack(pipe, raw_entries: List[bytes]):
+    for raw in raw_entries:
+        pipe.lrem(TRIP_PROCESSING_KEY, 1, raw)
+
+
+def _recover_processing(client) -> int:
+    """
+    Put entries a crashed flush left on the processing list back at the head of
+    the buffer. Only safe while holding the flush lock.
+    """
+    recovered = 0
+    while client.lmove(TRIP_PROCESSING_KEY, TRIP_BUFFER_KEY, "RIGHT", "LEFT") is not None:
+        recovered += 1
+    if recovered:
+        logger.warning(f"[TRIP BUFFER] Recovered {recovered} trips from an interrupted flush")
+    return recovered
+
+
+def _acquire_flush_lock(client):
+    token = uuid.uuid4().hex
+    if client.set(TRIP_FLUSH_LOCK_KEY, token, nx=True, ex=TRIP_FLUSH_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release_flush_lock(client, token: str):
+    """Delete the lock only if it is still ours (it may have expired and been re-taken)."""
+    from redis import WatchError
+
+    with client.pipeline() as pipe:
+        try:
+            pipe.watch(TRIP_FLUSH_LOCK_KEY)
+            if pipe.get(TRIP_FLUSH_LOCK_KEY) == token.encode():
+                pipe.multi()
+                pipe.delete(TRIP_FLUSH_LOCK_KEY)
+                pipe.execute()
+        except WatchError:
+            pass
+
+
+def _upgrade_record(record: Dict) -> Dict:
+    """
+    Resolve the record's "route_row" to a Route id. Records queued before
+    routes were deduplicated still carry route_geojson instead.
+    """
+    record = dict(record)
+    if "route_row" in record:
+        record["route_id"] = save_route(record.pop("route_row"))
+    if "route_geojson" not in record:
+        return record
+    route_geojson = record.pop("route_geojson")
+    if isinstance(route_geojson, str):
+        route_geojson = json.loads(route_geojson)
+    geometry = (route_geojson or {}).get("geometry")
+    if geometry:
+        waypoints = [
+            tuple(map(float, record[field].split(",")))
+            for field in ("current_location_coords", "pickup_coords", "dropoff_coords")
+        ]
+        record["route_id"] = store_route(
+            waypoints, geometry, record.get("total_distance_km"), record.get("total_trip_hours")
+        )
+    return record
+
+
+def write_trips(records: List[Dict]) -> int:
+    from ..models import LogSheet, Trip
+
+    trips, sheets_per_trip = [], []
+    for record in records:
+        record = _upgrade_record(record)
+        sheets_per_trip.append(record.pop("log_sheets", None) or [])
+        trips.append(Trip(status="processed", **record))
+
+    with transaction.atomic():
+        Trip.objects.bulk_create(trips, batch_size=TRIP_FLUSH_BATCH_SIZE)
+        # bulk_create fills in primary keys on PostgreSQL and SQLite.
+        log_sheets = [
+            LogSheet(trip_id=trip.pk, **sheet)
+            for trip, sheets in zip(trips, sheets_per_trip)
+            for sheet in sheets
+        ]
+        LogSheet.objects.bulk_create(log_sheets, batch_size=TRIP_FLUSH_BATCH_SIZE)
+    return len(trips)
+
+
+def _requeue(client, failures: List[tuple]):
+    """Put failed entries back on the buffer, or dead-letter them after too many attempts."""
+    retry, dead, raws = [], [], []
+    for entry, error in failures:
+        raws.append(entry.pop("_raw"))
+        entry["attempts"] += 1
+        entry["error"] = str(error)
+        if entry["attempts"] >= TRIP_FLUSH_MAX_ATTEMPTS:
+            entry["failed_at"] = time.time()
+            dead.append(json.dumps(entry))
+        else:
+            retry.append(json.dumps(entry))
+    # Moved off the processing list in the same transaction, so an entry is
+    # never lost or duplicated between the two lists.
+    with client.pipeline(transaction=True) as pipe:
+        if retry:
+            pipe.rpush(TRIP_BUFFER_KEY, *retry)
+        if dead:
+            pipe.rpush(TRIP_DEAD_LETTER_KEY, *dead)
+        _ack(pipe, raws)
+        pipe.execute()
+    if dead:
+        logger.error(f"[TRIP BUFFER] Dead-lettered {len(dead)} trips, last error: {failures[-1][1]}")
+
+
+def _write_batch(entries: List[Dict], failures: List[tuple]) -> int:
+    """Bulk-write entries; records that can't be written are appended to `failures`."""
+    try:
+        return write_trips([entry["record"] for entry in entries])
+    except (OperationalError, InterfaceError):
+        raise
+    except Exception as e:
+        if len(entries) == 1:
+            failures.append((entries[0], e))
+            return 0
+        logger.warning(f"[TRIP BUFFER] Bulk write of {len(entries)} trips failed ({e}), retrying row by row")
+
+    # Isolate the bad record(s) so one poison entry doesn't hold back the batch.
+    return sum(_write_batch([entry], failures) for entry in entries)
+
+
+def flush_buffer(batch_size: int = None, max_batches: int = None) -> Dict:
+    """
+    Drain the buffer into the database in bulk batches.
+
+    Entries stay on the processing list until their batch has committed, and
+    a flush starts by requeueing whatever an interrupted one left there, so
+    delivery is at-least-once. Only one flush runs at a time.
+    """
+    batch_size = batch_size or TRIP_FLUSH_BATCH_SIZE
+    max_batches = max_batches or TRIP_FLUSH_MAX_BATCHES
+    client = get_client()
+    written = batches = 0
+    failures = []
+
+    token = _acquire_flush_lock(client)
+    if token is None:
+        logger.info("[TRIP BUFFER] Another flush is running, skipping")
+        return {"written": 0, "failed": 0, "batches": 0, "skipped": True}
+
+    try:
+        recovered = _recover_processing(client)
+
+        while batches < max_batches:
+            raw_entries = _pop_batch(client, batch_size)
+            if not raw_entries:
+                break
+            batches += 1
+
+            entries, unreadable = [], []
+            for raw in raw_entries:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    unreadable.append(raw)
+                    logger.error(f"[TRIP BUFFER] Dead-lettered unreadable entry: {raw[:200]!r}")
+                    continue
+                entry["_raw"] = raw
+                entries.append(entry)
+            if unreadable:
+                with client.pipeline(transaction=True) as pipe:
+                    pipe.rpush(TRIP_DEAD_LETTER_KEY, *unreadable)
+                    _ack(pipe, unreadable)
+                    pipe.execute()
+
+            batch_failures = []
+            try:
+                written += _write_batch(entries, batch_failures) if entries else 0
+            except (OperationalError, InterfaceError) as e:
+                # Database unreachable: not the records' fault, so put the batch back
+                # without counting an attempt and wait for the next flush.
+                raws = [entry["_raw"] for entry in entries]
+                with client.pipeline(transaction=True) as pipe:
+                    pipe.rpush(TRIP_BUFFER_KEY, *raws)
+                    _ack(pipe, raws)
+                    pipe.execute()
+                logger.warning(f"[TRIP BUFFER] Database unavailable, {len(entries)} trips requeued: {e}")
+                break
+
+            # Committed: drop them from the processing list. Failed entries stay
+            # there until they are requeued below.
+            failed = {id(entry) for entry, _ in batch_failures}
+            with client.pipeline(transaction=False) as pipe:
+                _ack(pipe, [entry["_raw"] for entry in entries if id(entry) not in failed])
+                pipe.execute()
+            failures.extend(batch_failures)
+            if len(raw_entries) < batch_size:
+                break
+
+        # Requeue only after draining, so a failing record is retried on the next
+        # flush rather than several times within this one.
+        if failures:
+            _requeue(client, failures)
+    finally:
+        _release_flush_lock(client, token)
+
+    if written or failures:
+        logger.info(f"[TRIP BUFFER] Flushed {written} trips in {batches} batches ({len(failures)} failed)")
+    return {"written": written, "failed": len(failures), "batches": batches, "recovered": recovered}
+
+
+def buffer_stats() -> Dict:
+    client = get_client()
+    return {
+        "buffered": client.llen(TRIP_BUFFER_KEY),
+        "processing": client.llen(TRIP_PROCESSING_KEY),
+        "dead_letter": client.llen(TRIP_DEAD_LETTER_KEY),
+    }
+
+
+def requeue_dead_letters(limit: int = None) -> int:
+    """Move dead-lettered trips back onto the buffer with a fresh attempt count."""
+    client = get_client()
+    moved = 0
+    for _ in range(client.llen(TRIP_DEAD_LETTER_KEY)):
+        if limit is not None and moved >= limit:
+            break
+        raw = client.lpop(TRIP_DEAD_LETTER_KEY)
+        if raw is None:
+            break
+        try:
+            record = json.loads(raw)["record"]
+        except (ValueError, KeyError, TypeError):
+            # Not a record we can retry; keep it for manual inspection.
+            client.rpush(TRIP_DEAD_LETTER_KEY, raw)
+            continue
+        client.rpush(TRIP_BUFFER_KEY, json.dumps({"record": record, "attempts": 0}))
+        moved += 1
+    return moved
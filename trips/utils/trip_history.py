@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+
+# Columns a history row needs; the route (and its geometry) is only joined on request.
+HISTORY_FIELDS = (
+    "id",
+    "created_at",
+    "status",
+    "current_location",
+    "pickup_location",
+    "dropoff_location",
+    "current_cycle_used",
+    "total_trip_hours",
+    "total_distance_km",
+    "route_id",
+)
+
+
+def encode_cursor(created_at: datetime, trip_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), trip_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, trip_id = json.loads(base64.urlsafe_b64decode(padded))
+        parsed = parse_datetime(created_at)
+        if parsed is None:
+            raise ValueError
+        return parsed, int(trip_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def _parse_bound(name: str, value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be an ISO 8601 datetime.")
+    return parsed
+
+
+def _serialize(trip, include_geometry: bool) -> Dict:
+    row = {field: getattr(trip, field) for field in HISTORY_FIELDS}
+    if include_geometry:
+        row["geometry"] = trip.route.geometry if trip.route_id else None
+    return row
+
+
+def query_trips(
+    filters: Dict[str, str],
+    cursor: str = None,
+    limit: int = HISTORY_DEFAULT_LIMIT,
+    include_geometry: bool = False,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of trips, newest first, and the cursor for the next page.
+
+    Keyset pagination on (created_at, id): each page continues strictly after
+    the last row of the previous one, so page N costs the same as page 1 and
+    rows inserted meanwhile never shift or duplicate results.
+    """
+    from ..models import Trip
+
+    limit = max(1, min(int(limit), HISTORY_MAX_LIMIT))
+    queryset = Trip.objects.all()
+
+    created_after = _parse_bound("created_after", filters.get("created_after"))
+    created_before = _parse_bound("created_before", filters.get("created_before"))
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    for field in ("status", "pickup_location", "dropoff_location"):
+        if filters.get(field):
+            queryset = queryset.filter(**{field: filters[field]})
+
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=last_created_at) | Q(created_at=last_created_at, id__lt=last_id)
+        )
+
+    if include_geometry:
+        queryset = queryset.select_related("route").only(
+            *HISTORY_FIELDS, "route__polyline"
+        )
+    else:
+        queryset = queryset.only(*HISTORY_FIELDS)
+
+    # Fetch one extra row to know whether another page exists.
+    trips = list(queryset.order_by("-created_at", "-id")[: limit + 1])
+    next_cursor = None
+    if len(trips) > limit:
+        trips = trips[:limit]
+        next_cursor = encode_cursor(trips[-1].created_at, trips[-1].id)
+    return [_serialize(trip, include_geometry) for trip in trips], next_cursor
@@ -2,39 +2,209 @@
 import json
 import logging
 import asyncio
-from django.http import JsonResponse
+import os
+import re
+import time
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.urls import reverse
 
-from .utils.route_stops import SimpleStopsAPI
 from .utils.duty_scheduler import generate_duty_blocks
-from .utils.generate_eld import generate_multiple_eld_sheets, merge_eld_sheets
-from .utils.route_stops import SimpleStopsAPI
+from .utils.eld_cache import eld_cache
+from .utils.eld_timeline import (
+    compute_daily_totals,
+    generate_eld_timelines,
+    plan_eld_sheets,
+)
 from .utils.route import geocode_place_cached, route_with_cache
-from .tasks.trip_creation import create_trip_task
+from .utils.pipeline import Stage, io_executor, prune_stages, run_stages, run_with_db
+from .utils.admission import admission_rejection, busy_response, limiter_for
+from .utils.metrics import registry, server_timing_header, start_request_timings, timed
+from .utils.profiling import list_profiles, profile_path, start_profile
+from .utils.result_cache import (
+    RESULT_CACHE_LOG_HITS,
+    etag_matches,
+    get_cached_result,
+    result_cache_key,
+    set_cached_result,
+)
+from .constants.pipeline_constants import (
+    GEOCODE_TIMEOUT,
+    ROUTE_TIMEOUT,
+    STOPS_TIMEOUT,
+    DAILY_INFO_TIMEOUT,
+    ELD_TIMEOUT,
+    PERSIST_TIMEOUT,
+)
+from .utils.persistence import TRIP_BROKER_FREE, persist_trip
+from .utils.route_store import route_fields
+from .utils.daily_info import build_daily_info, local_daily_info
+from .utils.serialization import (
+    JSON,
+    compress_response,
+    dumps_json,
+    encode_body,
+    negotiate_media_type,
+)
 from django.views.decorators.csrf import csrf_exempt
+from django.contrib.admin.views.decorators import staff_member_required
 import json
 import base64
+from django.utils.cache import patch_vary_headers
 
 
 
 logger = logging.getLogger(__name__)
-truck_stops_api = SimpleStopsAPI()
+_truck_stops_api = None
 
 
-@csrf_exempt
-async def calculate_trip(request):
-    """Main async trip calculation API (parallel geocoding + caching + celery for DB)."""
-    if request.method != "POST":
-        return JsonResponse({"error": "Only POST allowed"}, status=405)
-    try:
-        data = json.loads(request.body.decode("utf-8"))
-        pickup_location = data.get("pickup_location")
-        dropoff_location = data.get("dropoff_location")
-        current_location = data.get("current_location", "")
-        current_cycle_used = float(data.get("current_cycle_used", 0))
+def get_truck_stops_api():
+    # Built on first use: it pulls in requests, which no other endpoint needs at startup.
+    global _truck_stops_api
+    if _truck_stops_api is None:
+        from .utils.route_stops import SimpleStopsAPI
 
-        if not pickup_location or not dropoff_location:
-            return JsonResponse({"error": "pickup_location and dropoff_location are required."}, status=400)
+        _truck_stops_api = SimpleStopsAPI()
+    return _truck_stops_api
+
+
+# "png" renders sheets + PDF; "json"/"svg" return the grid timeline without PIL.
+ELD_FORMATS = ("png", "json", "svg")
+
+# A worker's sheets are only reachable from the web processes through the shared
+# ELD cache, and broker-free deployments have no worker at all; otherwise
+# "async_eld" requests are rendered inline.
+ELD_ASYNC_JOBS = not TRIP_BROKER_FREE and eld_cache.shared
+_async_eld_fallback_logged = False
+
+
+def _log_async_eld_fallback():
+    """Say why async_eld is rendered inline, once per process rather than on every import."""
+    global _async_eld_fallback_logged
+    if _async_eld_fallback_logged:
+        return
+    _async_eld_fallback_logged = True
+    if TRIP_BROKER_FREE:
+        logger.info("[ELD] async_eld requested on a broker-free deployment, rendering inline.")
+    else:
+        logger.warning(
+            "[ELD] async_eld requested but jobs are disabled, rendering inline: "
+            "set ELD_CACHE_SHARED=true so workers' PDFs can be served."
+        )
+
+# Optional outputs selectable with include=; distance, duration and the duty
+# schedule are always returned. Omitting include means everything.
+INCLUDE_OPTIONS = ("geometry", "stops", "eld", "pdf")
+
+
+
+def _parse_include(request, data):
+    """Read include= from the body (list or comma string) or the query string."""
+    raw = data.get("include", request.GET.get("include"))
+    if raw is None:
+        return set(INCLUDE_OPTIONS)
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    include = {str(item).strip().lower() for item in raw if str(item).strip()}
+    unknown = include - set(INCLUDE_OPTIONS)
+    if unknown:
+        raise ValueError(
+            f"Unknown include option(s): {', '.join(sorted(unknown))}. "
+            f"Valid options: {', '.join(INCLUDE_OPTIONS)}."
+        )
+    return include
+
+
+def _wants_stream(request, data):
+    return bool(data.get("stream")) or "application/x-ndjson" in request.headers.get("Accept", "")
+
+
+def _ndjson_line(payload) -> bytes:
+    return dumps_json(payload) + b"\n"
+
+
+def _encoded_response(request, payload, status=200):
+    """Buffered JSON or MessagePack (per Accept) response, compressed when large."""
+    media_type = negotiate_media_type(request)
+    response = HttpResponse(encode_body(payload, media_type), content_type=media_type, status=status)
+    patch_vary_headers(response, ("Accept",))
+    return compress_response(request, response)
+
+
+async def _trip_sections(request, data, include, results=None, initial=None):
+    """
+    Run the trip pipeline, yielding (section, payload) as each stage completes:
+    coordinates, route, duty_schedule, stops, eld_files.
+
+    Stages form a small dependency graph (see `_build_trip_stages`), so the
+    stop search and ELD rendering run concurrently once the schedule exists.
+    Stages whose output is not in `include` are never run. Raw stage results
+    are collected into `results` when a dict is passed; stages already resolved
+    in `initial` (e.g. by the batch endpoint) are skipped.
+    """
+    targets = ["schedule", "persist"]
+    if "stops" in include:
+        targets.append("stops")
+    if "eld" in include or "pdf" in include:
+        targets.append("eld")
+
+    initial = initial or {}
+    stages = [
+        stage
+        for stage in prune_stages(_build_trip_stages(request, data, include), targets)
+        if stage.name not in initial
+    ]
+    for stage_name, result in initial.items():
+        if stage_name in TRIP_SECTIONS:
+            section, render = TRIP_SECTIONS[stage_name]
+            yield section, render(result, include)
+
+    async for stage_name, result in run_stages(stages, initial):
+        if results is not None:
+            results[stage_name] = result
+        if stage_name in TRIP_SECTIONS:
+            section, render = TRIP_SECTIONS[stage_name]
+            yield section, render(result, include)
+
+
+def _combine_legs(current_to_pickup, pickup_to_dropoff):
+    """Merge the two (geometry, distance_km, duration_hr) legs into the route stage result."""
+    current_to_pickup_geometry, current_to_pickup_distance_km, _ = current_to_pickup
+    pickup_to_dropoff_geometry, pickup_to_dropoff_distance_km, duration_hr = pickup_to_dropoff
+    return {
+        "current_to_pickup_km": current_to_pickup_distance_km,
+        "pickup_to_dropoff_km": pickup_to_dropoff_distance_km,
+        "total_distance_km": current_to_pickup_distance_km + pickup_to_dropoff_distance_km,
+        "duration_hr": duration_hr,
+        "geometry": current_to_pickup_geometry + pickup_to_dropoff_geometry,
+    }
+
+
+def _log_sheet_record(sheet):
+    totals = compute_daily_totals(sheet["blocks"])
+    return {
+        "day_number": sheet["day_number"],
+        "artifact_key": sheet["key"],
+        "duty_blocks": sheet["blocks"],
+        "daily_info": sheet["info"],
+        "total_sheets": sheet["total_sheets"],
+        "compact": sheet["compact"],
+        "hours_driven": round(totals["driving"], 3),
+        "rest_time": round(totals["off_duty"] + totals["sleeper_berth"], 3),
+    }
 
+
+def _build_trip_stages(request, data, include):
+    pickup_location = data.get("pickup_location")
+    dropoff_location = data.get("dropoff_location")
+    current_location = data.get("current_location", "")
+    current_cycle_used = float(data.get("current_cycle_used", 0))
+    eld_format = data.get("eld_format", "png")
+    # None falls back to the ELD_COMPACT_RASTER default.
+    eld_compact = data.get("eld_compact")
+    # Same rule as _trip_sections: only then is reverse geocoding run at all.
+    eld_targeted = "eld" in include or "pdf" in include
+
+    async def geocode(_):
         pickup_task = geocode_place_cached(pickup_location)
         dropoff_task = geocode_place_cached(dropoff_location)
         current_task = (
@@ -42,74 +212,550 @@ async def calculate_trip(request):
             if current_location
             else geocode_place_cached(pickup_location)
         )
-
         pickup_coords, dropoff_coords, current_coords = await asyncio.gather(
             pickup_task, dropoff_task, current_task
         )
+        return {"current": current_coords, "pickup": pickup_coords, "dropoff": dropoff_coords}
 
-        current_to_pickup_task = route_with_cache(current_coords, pickup_coords)
-        pickup_to_dropoff_task = route_with_cache(pickup_coords, dropoff_coords)
-
-        (
-            (current_to_pickup_geometry, current_to_pickup_distance_km, _),
-            (pickup_to_dropoff_geometry, pickup_to_dropoff_distance_km, duration_hr),
-        ) = await asyncio.gather(current_to_pickup_task, pickup_to_dropoff_task)
-
-        total_distance_km = current_to_pickup_distance_km + pickup_to_dropoff_distance_km
-        full_route_geometry = current_to_pickup_geometry + pickup_to_dropoff_geometry
+    async def route(inputs):
+        coords = inputs["geocode"]
+        current_to_pickup, pickup_to_dropoff = await asyncio.gather(
+            route_with_cache(coords["current"], coords["pickup"]),
+            route_with_cache(coords["pickup"], coords["dropoff"]),
+        )
+        return _combine_legs(current_to_pickup, pickup_to_dropoff)
 
+    def schedule(inputs):
+        route_data = inputs["route"]
         duty_blocks, cycle_used = generate_duty_blocks(
-            current_to_pickup_miles=current_to_pickup_distance_km * 0.621371,
-            pickup_to_dropoff_miles=pickup_to_dropoff_distance_km * 0.621371,
+            current_to_pickup_miles=route_data["current_to_pickup_km"] * 0.621371,
+            pickup_to_dropoff_miles=route_data["pickup_to_dropoff_km"] * 0.621371,
             current_cycle_used=current_cycle_used,
         )
+        return {"blocks": duty_blocks, "final_cycle_used": cycle_used}
+
+    def stops(inputs):
+        coords = inputs["geocode"]
+        return get_truck_stops_api().find_stops_along_route(
+            coords["pickup"], coords["dropoff"], inputs["schedule"]["blocks"]
+        )
 
-        loop = asyncio.get_running_loop()
-        stops_data = await loop.run_in_executor(
-            None, truck_stops_api.find_stops_along_route, pickup_coords, dropoff_coords, duty_blocks
+    async def daily_info(inputs):
+        route_data = inputs["route"]
+        return await build_daily_info(
+            inputs["schedule"]["blocks"], route_data["geometry"], route_data["total_distance_km"]
         )
 
-        eld_paths = generate_multiple_eld_sheets(duty_blocks)
-        merged_pdf_bytes = merge_eld_sheets(eld_paths)
+    def eld(inputs):
+        duty_blocks = inputs["schedule"]["blocks"]
 
-        encoded_pdf = base64.b64encode(merged_pdf_bytes).decode("utf-8")
+        if eld_format != "png":
+            sheets = plan_eld_sheets(duty_blocks, inputs["daily_info"], compact=eld_compact)
+            return {
+                "format": eld_format,
+                "days": generate_eld_timelines(sheets, include_svg=eld_format == "svg"),
+            }
 
-        create_trip_task.delay(
+        # Pillow is only imported once a request actually renders sheets.
+        from .utils.generate_eld import eld_sheet_path, merge_eld_sheets, register_eld_bundle
+
+        if data.get("async_eld") and not ELD_ASYNC_JOBS:
+            _log_async_eld_fallback()
+        elif data.get("async_eld"):
+            from .tasks.eld_generation import generate_eld_task
+
+            try:
+                eld_job = generate_eld_task.delay(
+                    duty_blocks, inputs["daily_info"], compact=eld_compact
+                )
+                return {
+                    "job_id": eld_job.id,
+                    "status": "pending",
+                    "status_url": request.build_absolute_uri(
+                        reverse("eld_job_status", args=[eld_job.id])
+                    ),
+                }
+            except Exception as e:
+                logger.warning(f"[ELD] Could not enqueue ELD job, rendering inline: {e}")
+
+        sheets = plan_eld_sheets(duty_blocks, inputs["daily_info"], compact=eld_compact)
+        eld_paths = [eld_sheet_path(sheet) for sheet in sheets]
+
+        eld_files = {}
+        if "eld" in include:
+            eld_files["individual_sheets"] = eld_paths
+        if "pdf" not in include:
+            return eld_files
+
+        pdf_artifact_id = register_eld_bundle(sheets)
+        eld_files["pdf_artifact_id"] = pdf_artifact_id
+        eld_files["pdf_url"] = request.build_absolute_uri(
+            reverse("download_eld_pdf", args=[pdf_artifact_id])
+        )
+        if data.get("include_pdf_base64"):
+            # Legacy clients that still expect the PDF inline in the JSON.
+            merged_pdf_bytes = merge_eld_sheets(eld_paths)
+            with timed("pdf_base64"):
+                eld_files["merged_pdf_base64"] = base64.b64encode(merged_pdf_bytes).decode("utf-8")
+        return eld_files
+
+    def persist(inputs):
+        coords = inputs["geocode"]
+        route_data = inputs["route"]
+        trip_record = dict(
             current_location=current_location,
-            current_location_coords=f"{current_coords[0]},{current_coords[1]}",
+            current_location_coords=f"{coords['current'][0]},{coords['current'][1]}",
             pickup_location=pickup_location,
-            pickup_coords=f"{pickup_coords[0]},{pickup_coords[1]}",
+            pickup_coords=f"{coords['pickup'][0]},{coords['pickup'][1]}",
             dropoff_location=dropoff_location,
-            dropoff_coords=f"{dropoff_coords[0]},{dropoff_coords[1]}",
+            dropoff_coords=f"{coords['dropoff'][0]},{coords['dropoff'][1]}",
             current_cycle_used=current_cycle_used,
-            total_trip_hours=round(duration_hr, 3),
-            total_distance_km=round(total_distance_km, 3),
-            route_geojson=json.dumps({"geometry": full_route_geometry}),
+            total_trip_hours=round(route_data["duration_hr"], 3),
+            total_distance_km=round(route_data["total_distance_km"], 3),
+            total_days=max((int(block["day"]) for block in inputs["schedule"]["blocks"]), default=0),
+            # Geometry is stored once per lane, by the trip writer rather than here.
+            **route_fields(
+                (coords["current"], coords["pickup"], coords["dropoff"]),
+                route_data["geometry"],
+                route_data["total_distance_km"],
+                route_data["duration_hr"],
+            ),
         )
+        # Saved as LogSheet rows with the trip, so past logs are served without re-rendering.
+        # Remarks come along when the eld stage already waits on them; otherwise the
+        # sheets get the schedule's mileage and persisting never waits on reverse geocoding.
+        blocks = inputs["schedule"]["blocks"]
+        daily = inputs.get("daily_info") or local_daily_info(blocks, route_data["total_distance_km"])
+        trip_record["log_sheets"] = [
+            _log_sheet_record(sheet) for sheet in plan_eld_sheets(blocks, daily, compact=eld_compact)
+        ]
+        persist_trip(trip_record)
+        return trip_record
 
+    return [
+        Stage("geocode", geocode, timeout=GEOCODE_TIMEOUT, limiter=limiter_for("geocode")),
+        Stage(
+            "route", route, requires=["geocode"], timeout=ROUTE_TIMEOUT, limiter=limiter_for("route")
+        ),
+        Stage("schedule", schedule, requires=["route"]),
+        Stage(
+            "stops",
+            stops,
+            requires=["geocode", "schedule"],
+            executor="io",
+            timeout=STOPS_TIMEOUT,
+            limiter=limiter_for("stops"),
+        ),
+        Stage(
+            "daily_info",
+            daily_info,
+            requires=["route", "schedule"],
+            timeout=DAILY_INFO_TIMEOUT,
+        ),
+        Stage(
+            "eld",
+            eld,
+            requires=["schedule", "daily_info"],
+            executor="cpu",
+            timeout=ELD_TIMEOUT,
+            # Structured output never touches PIL, so only raster rendering is limited.
+            limiter=limiter_for("eld") if eld_format == "png" else None,
+        ),
+        # Only queue the DB write once the schedule proved the trip is valid.
+        Stage(
+            "persist",
+            persist,
+            requires=["geocode", "route", "schedule"] + (["daily_info"] if eld_targeted else []),
+            executor="io",
+            timeout=PERSIST_TIMEOUT,
+            db=True,
+        ),
+    ]
 
 
-        response_data = {
-            "trip_summary": {
-                "pickup": pickup_location,
-                "dropoff": dropoff_location,
-                "total_distance_km": round(total_distance_km, 2),
-                "estimated_duration_hr": round(duration_hr, 2),
-                "actual_stops_count": stops_data.get("total_stops", 0),
-                "total_days": max([b["day"] for b in duty_blocks]) if duty_blocks else 1,
-                "geometry": full_route_geometry
-            },
-            "duty_schedule": {"blocks": duty_blocks, "final_cycle_used": cycle_used},
-            "stops": stops_data["stops"],
-            "eld_files": {
-                "individual_sheets": eld_paths,
-                "merged_pdf_base64": encoded_pdf
-            },
-            "message": "Trip calculated successfully (DB insertion queued)",
-        }
+# Stage name -> (response section, payload renderer taking (result, include))
+TRIP_SECTIONS = {
+    "geocode": ("coordinates", lambda coords, include: coords),
+    "route": (
+        "route",
+        lambda r, include: {
+            "total_distance_km": round(r["total_distance_km"], 2),
+            "estimated_duration_hr": round(r["duration_hr"], 2),
+            **({"geometry": r["geometry"]} if "geometry" in include else {}),
+        },
+    ),
+    "schedule": (
+        "duty_schedule",
+        lambda s, include: {
+            **s,
+            "total_days": max([b["day"] for b in s["blocks"]]) if s["blocks"] else 1,
+        },
+    ),
+    "stops": (
+        "stops",
+        lambda s, include: {"stops": s["stops"], "total_stops": s.get("total_stops", 0)},
+    ),
+    "eld": ("eld_files", lambda eld_files, include: eld_files),
+}
 
-        return JsonResponse(response_data, status=200)
 
+async def _stream_trip(request, data, include):
+    """NDJSON body: one {"section", "data"} line per stage, then a final "done" line."""
+    try:
+        async for section, payload in _trip_sections(request, data, include):
+            yield _ndjson_line({"section": section, "data": payload})
+        yield _ndjson_line(
+            {"section": "done", "message": "Trip calculated successfully (DB insertion queued)"}
+        )
     except Exception as e:
+        # Headers are already sent, so errors are reported in-band.
+        rejection = admission_rejection(e)
+        if rejection is not None:
+            yield _ndjson_line(
+                {"section": "error", "error": str(rejection), "retry_after": rejection.retry_after}
+            )
+            return
+        logger.exception(f"[ERROR] Streamed trip calculation failed: {e}")
+        yield _ndjson_line({"section": "error", "error": str(e)})
+
+
+@csrf_exempt
+async def calculate_trip(request):
+    """Trip calculation entry point; adds a Server-Timing header with per-stage durations."""
+    timings = start_request_timings()
+    profile = start_profile(request)
+    started = time.perf_counter()
+    try:
+        response = await _calculate_trip(request)
+    except BaseException:
+        if profile:
+            profile.finish()
+        raise
+
+    if profile:
+        response["X-Trip-Profile-Id"] = profile.profile_id
+    # Streamed responses have already sent their headers by the time stages finish.
+    if response.streaming:
+        if profile:
+            response.streaming_content = _profiled_stream(response.streaming_content, profile)
+        return response
+
+    timings.append(("total", time.perf_counter() - started))
+    response["Server-Timing"] = server_timing_header(timings)
+    if profile:
+        profile.finish(response.status_code)
+    return response
+
+
+async def _profiled_stream(content, profile):
+    """Keep sampling until the last streamed section has been produced."""
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        profile.finish(200)
+
+
+async def _calculate_trip(request):
+    """
+    Main async trip calculation API (parallel geocoding + caching + celery for DB).
+
+    Send "stream": true (or Accept: application/x-ndjson) to receive each section
+    as NDJSON as soon as it is ready instead of one JSON document at the end.
+    Send include= (e.g. "geometry,stops") to skip the stages for unneeded outputs.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+
+        if not data.get("pickup_location") or not data.get("dropoff_location"):
+            return JsonResponse({"error": "pickup_location and dropoff_location are required."}, status=400)
+
+        eld_format = data.get("eld_format", "png")
+        if eld_format not in ELD_FORMATS:
+            return JsonResponse(
+                {"error": f"eld_format must be one of: {', '.join(ELD_FORMATS)}."}, status=400
+            )
+        error = _normalize_eld_compact(data)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        try:
+            include = _parse_include(request, data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        if _wants_stream(request, data):
+            response = StreamingHttpResponse(
+                _stream_trip(request, data, include), content_type="application/x-ndjson"
+            )
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"  # keep nginx from buffering the stream
+            return response
+
+        media_type = negotiate_media_type(request)
+        # Job ids from async ELD runs are per request, so those are never cached.
+        cache_key = None
+        if not data.get("async_eld"):
+            cache_key = result_cache_key(data, include, request.get_host(), media_type)
+            cached = get_cached_result(cache_key)
+            if cached is not None:
+                if RESULT_CACHE_LOG_HITS and cached["trip_record"]:
+                    # May write to the DB (direct mode, buffer fallback), which needs a thread.
+                    await asyncio.get_running_loop().run_in_executor(
+                        io_executor, run_with_db, persist_trip, cached["trip_record"]
+                    )
+                return _cached_trip_response(
+                    request, cached["body"], cached["etag"], "hit", media_type
+                )
+
+        sections = {}
+        stage_results = {}
+        async for section, payload in _trip_sections(request, data, include, stage_results):
+            sections[section] = payload
+
+        response_data = _assemble_trip_response(data, sections)
+
+        if cache_key is None:
+            return _encoded_response(request, response_data)
+
+        body = encode_body(response_data, media_type)
+        etag = set_cached_result(cache_key, body, stage_results.get("persist"))
+        return _cached_trip_response(request, body, etag, "miss", media_type)
+
+    except Exception as e:
+        rejection = admission_rejection(e)
+        if rejection is not None:
+            logger.warning(f"[ADMISSION] Rejected trip calculation: {rejection}")
+            return busy_response(rejection)
         logger.exception(f"[ERROR] Trip calculation failed: {e}")
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def _assemble_trip_response(data, sections):
+    """Build the calculate_trip JSON document from the pipeline sections."""
+    route = sections["route"]
+    duty_schedule = sections["duty_schedule"]
+    trip_summary = {
+        "pickup": data["pickup_location"],
+        "dropoff": data["dropoff_location"],
+        "total_distance_km": route["total_distance_km"],
+        "estimated_duration_hr": route["estimated_duration_hr"],
+        "total_days": duty_schedule["total_days"],
+    }
+    if "stops" in sections:
+        trip_summary["actual_stops_count"] = sections["stops"]["total_stops"]
+    if "geometry" in route:
+        trip_summary["geometry"] = route["geometry"]
+
+    response_data = {
+        "trip_summary": trip_summary,
+        "duty_schedule": {
+            "blocks": duty_schedule["blocks"],
+            "final_cycle_used": duty_schedule["final_cycle_used"],
+        },
+    }
+    if "stops" in sections:
+        response_data["stops"] = sections["stops"]["stops"]
+    if "eld_files" in sections:
+        response_data["eld_files"] = sections["eld_files"]
+    response_data["message"] = "Trip calculated successfully (DB insertion queued)"
+    return response_data
+
+
+def _parse_flag(value):
+    """JSON booleans, 0/1 or "true"/"false" strings; None stays None (use the default)."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("1", "true", "yes", "0", "false", "no"):
+        return value.strip().lower() in ("1", "true", "yes")
+    raise ValueError("must be a boolean")
+
+
+def _normalize_eld_compact(data):
+    """Parse eld_compact in place so "false" does not turn compact rendering on."""
+    try:
+        if "eld_compact" in data:
+            data["eld_compact"] = _parse_flag(data["eld_compact"])
+    except ValueError:
+        return "eld_compact must be a boolean."
+    return None
+
+
+def _cached_trip_response(request, body, etag, cache_status, media_type=JSON):
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type=media_type)
+    response["ETag"] = etag
+    response["X-Trip-Cache"] = cache_status
+    patch_vary_headers(response, ("Accept",))
+    return compress_response(request, response)
+
+
+def eld_cache_stats(request):
+    """Hit/miss counters for the content-addressed ELD artifact cache."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    return JsonResponse(eld_cache.stats(), status=200)
+
+
+@staff_member_required
+def trip_profiles(request):
+    """Profiles captured by the opt-in request profiler (TRIP_PROFILING_ENABLED)."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+    profiles = [
+        {**meta, "download_url": request.build_absolute_uri(reverse("trip_profile", args=[meta["id"]]))}
+        for meta in list_profiles()
+    ]
+    return JsonResponse({"profiles": profiles}, status=200)
+
+
+@staff_member_required
+def trip_profile(request, profile_id):
+    """Download one profile as a collapsed-stack file (flamegraph.pl / speedscope)."""
+    path = profile_path(profile_id)
+    if path is None:
+        return JsonResponse({"error": "Profile not found"}, status=404)
+    return FileResponse(
+        open(path, "rb"),
+        content_type="text/plain; charset=utf-8",
+        as_attachment=True,
+        filename=f"trip-profile-{profile_id}.collapsed",
+    )
+
+
+PDF_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+ARTIFACT_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _iter_file_range(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(PDF_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def download_eld_pdf(request, artifact_id):
+    """Stream a merged ELD PDF by artifact id, with ETag and single byte-range support."""
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+
+    from .utils.generate_eld import build_eld_pdf
+
+    if not ARTIFACT_ID_RE.match(artifact_id):
+        return JsonResponse(
+            {"error": "ELD artifact not found or expired. Recalculate the trip."}, status=404
+        )
+
+    # The artifact id is derived from the content keys of the pages, so it is
+    # checked before anything is built. A rebuild on another node may not be
+    # byte-identical, so the validator is weak.
+    etag = f'W/"{artifact_id}"'
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    pdf_path = build_eld_pdf(artifact_id)
+    if pdf_path is None:
+        return JsonResponse(
+            {"error": "ELD artifact not found or expired. Recalculate the trip."}, status=404
+        )
+
+    size = os.path.getsize(pdf_path)
+    range_header = request.headers.get("Range", "")
+    match = RANGE_RE.match(range_header.strip())
+
+    # If-Range needs a strong validator; with a weak ETag it never matches, so a
+    # conditional range request gets the whole PDF.
+    if match and not request.headers.get("If-Range"):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            start, end = 0, -1
+
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(pdf_path, start, length),
+            status=206,
+            content_type="application/pdf",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+    else:
+        response = FileResponse(open(pdf_path, "rb"), content_type="application/pdf")
+
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, max-age=86400, immutable"
+    response["Content-Disposition"] = f'inline; filename="ELD_Logs_{artifact_id[:12]}.pdf"'
+    return response
+
+
+def eld_job_status(request, job_id):
+    """Report the state of an async ELD generation job and, once ready, its PDF link."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Only GET allowed"}, status=405)
+
+    if not ELD_ASYNC_JOBS:
+        return JsonResponse({"error": "Async ELD jobs are disabled in this deployment."}, status=404)
+
+    from backend.celery import app as celery_app
+
+    result = celery_app.AsyncResult(job_id)
+    state = result.state
+
+    if state == "SUCCESS":
+        artifact_id = result.result["pdf_artifact_id"]
+        return JsonResponse(
+            {
+                "job_id": job_id,
+                "status": "ready",
+                "total_sheets": result.result["total_sheets"],
+                "pdf_artifact_id": artifact_id,
+                "pdf_url": request.build_absolute_uri(
+                    reverse("download_eld_pdf", args=[artifact_id])
+                ),
+            },
+            status=200,
+        )
+    if state in ("FAILURE", "REVOKED"):
+        return JsonResponse(
+            {"job_id": job_id, "status": "failed", "error": str(result.result)}, status=200
+        )
+
+    # PENDING also covers unknown ids; Celery cannot tell the two apart.
+    return JsonResponse({"job_id": job_id, "status": "pending", "state": state}, status=200)
+
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def metrics(request):
+    """Prometheus text exposition of the trip metrics (all workers in multiprocess mode)."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )